@@ -31,6 +31,178 @@ class TempNode(TreeNode):
     def __init__(self):
         super().__init__("(temporary node)")
 
+class Const:
+    """Leaf that stands in for a literal token or a constant subexpression,
+    holding its value (see Folding.py). Also used in lowered programs."""
+    __slots__ = ("value",)
+    name = "Const"
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return "<Const:%r>" % (self.value,)
+
+class ResolvedName:
+    """Leaf that replaces the Name token at the start of a NameThing,
+    holding the slot number of its variable (see Resolution.py)."""
+    name = "Name"
+    def __init__(self, value, slot):
+        self.value = value
+        self.slot = slot
+
+    def __str__(self):
+        return "<ResolvedName:%s@%d>" % (self.value, self.slot)
+
+# Lowered program nodes (see Lowering.py). Each kind of statement and
+# expression has its own class, with its operands in named fields and none
+# of the punctuation of the parse tree, so the engines can dispatch on the
+# class of a node instead of comparing names.
+
+class Block:
+    __slots__ = ("statements",)
+    def __init__(self, statements):
+        self.statements = statements
+
+class Print:
+    __slots__ = ("items", "newline")
+    def __init__(self, items, newline):
+        self.items = items
+        self.newline = newline
+
+class Set:
+    __slots__ = ("target", "value")
+    def __init__(self, target, value):
+        self.target = target
+        self.value = value
+
+class Inc:
+    """Inc statement; <targetType> is ZInteger if the variable is expected
+    to hold an Integer (see Typing.py), and None otherwise."""
+    __slots__ = ("target", "targetType")
+    def __init__(self, target, targetType = None):
+        self.target = target
+        self.targetType = targetType
+
+class Input:
+    """Input statement; <inputType> is None if no type was given."""
+    __slots__ = ("target", "inputType")
+    def __init__(self, target, inputType):
+        self.target = target
+        self.inputType = inputType
+
+class While:
+    __slots__ = ("condition", "body")
+    def __init__(self, condition, body):
+        self.condition = condition
+        self.body = body
+
+class For:
+    """For loop; <countable> says whether the loop variable is a plain
+    variable that the body never assigns to."""
+    __slots__ = ("var", "start", "finish", "body", "countable")
+    def __init__(self, var, start, finish, body, countable = False):
+        self.var = var
+        self.start = start
+        self.finish = finish
+        self.body = body
+        self.countable = countable
+
+class If:
+    """If statement; <branches> is a tuple of (condition, body) pairs, and
+    <orelse> is the else block or None."""
+    __slots__ = ("branches", "orelse")
+    def __init__(self, branches, orelse):
+        self.branches = branches
+        self.orelse = orelse
+
+class BinOp:
+    """Binary operator; <operandType> is the class (ZInteger or ZBoolean)
+    that both operands are expected to have (see Typing.py), or None."""
+    __slots__ = ("operator", "lhs", "rhs", "operandType")
+    def __init__(self, operator, lhs, rhs, operandType = None):
+        self.operator = operator
+        self.lhs = lhs
+        self.rhs = rhs
+        self.operandType = operandType
+
+class UnaryOp:
+    """Unary operator; <operandType> is as for BinOp."""
+    __slots__ = ("operator", "operand", "operandType")
+    def __init__(self, operator, operand, operandType = None):
+        self.operator = operator
+        self.operand = operand
+        self.operandType = operandType
+
+class Name:
+    """Variable name, with the slot number of its variable (see
+    Resolution.py)."""
+    __slots__ = ("name", "slot")
+    def __init__(self, name, slot):
+        self.name = name
+        self.slot = slot
+
+class Subscript:
+    __slots__ = ("base", "index")
+    def __init__(self, base, index):
+        self.base = base
+        self.index = index
+
+class Section:
+    __slots__ = ("base", "start", "stop")
+    def __init__(self, base, start, stop):
+        self.base = base
+        self.start = start
+        self.stop = stop
+
+class Call:
+    __slots__ = ("base", "arguments")
+    def __init__(self, base, arguments):
+        self.base = base
+        self.arguments = arguments
+
+class Random:
+    __slots__ = ()
+
+class Literal:
+    """Literal token whose text isn't a valid value; converting it is left
+    to run time, where it fails."""
+    __slots__ = ("token",)
+    def __init__(self, token):
+        self.token = token
+
+# Nodes added by the optimizer (see Optimizer.py). Temps are numbered; at run
+# time they live in ProgramState.temps.
+
+class Share:
+    """Evaluates <expression> and keeps its value in temp <temp> for later
+    Reuse nodes."""
+    __slots__ = ("expression", "temp")
+    def __init__(self, expression, temp):
+        self.expression = expression
+        self.temp = temp
+
+class Reuse:
+    """The value last kept in temp <temp> by a Share node."""
+    __slots__ = ("temp",)
+    def __init__(self, temp):
+        self.temp = temp
+
+class Hoisted:
+    """Loop-invariant <expression>. The first time it is evaluated after the
+    loop is entered, its value is kept in temp <temp>; after that, the kept
+    value is used."""
+    __slots__ = ("expression", "temp")
+    def __init__(self, expression, temp):
+        self.expression = expression
+        self.temp = temp
+
+class Reset:
+    """Statement that forgets the values kept in <temps>, before a loop
+    whose Hoisted expressions use them is entered again."""
+    __slots__ = ("temps",)
+    def __init__(self, temps):
+        self.temps = temps
+
 def treeDump(rootNode):
     #treePrint(rootNode)
     dotDump(rootNode)
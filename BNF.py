@@ -1,7 +1,15 @@
 
 from Errors import ParseError, BNFError
+from Tokens import REGEX_FILENAME
+import hashlib
+import pickle
+import tempfile
 import os
 
+# Compiled grammars are cached here, relative to this code's directory
+GRAMMAR_CACHE_DIR = "__zephcache__"
+GRAMMAR_CACHE_FILENAME = "grammar.pickle"
+
 class BNFObject:
     symbols = None
     def __init__(self, value, permanent = False):
@@ -82,6 +90,12 @@ class Grammar:
         self.followSets = {}
         self.selectSets = []
         self.parseTable = {}
+        # Production numbers keyed by nonterminal name, then by token type
+        # (for terminals) or token value (for literals); see findProduction
+        self.typeTable = {}
+        self.valueTable = {}
+        # Whether each nonterminal (by name) is permanent in the parse tree
+        self.permanentNonterms = {}
         if BNF_filename is not None:
             self.loadFromFile(BNF_filename)
     
@@ -132,7 +146,27 @@ class Grammar:
             print(prod)
 
     def findProduction(self, nonterm, token):
-        """Find the correct production for the given nonterm and token."""
+        """Find the correct production for the given nonterm and token.
+        This takes one lookup on the token's type and one on its value. If
+        both succeed, the earlier production wins, just as it would in
+        findProductionByScan."""
+        byType = self.typeTable[nonterm.value].get(token.typeName)
+        byValue = self.valueTable[nonterm.value].get(token.value)
+        if byType is None:
+            if byValue is None:
+                raise ParseError("failed while parsing %s at %s" \
+                                  % (nonterm, token), token)
+            prodNum = byValue
+        elif byValue is None or byType < byValue:
+            prodNum = byType
+        else:
+            prodNum = byValue
+        return self.productions[prodNum]
+
+    def findProductionByScan(self, nonterm, token):
+        """Find the correct production for the given nonterm and token by
+        checking the token against each symbol of each select set in
+        turn."""
         for prodNum in range(*self.nontermProdNums[nonterm]):
             for symbol in self.selectSets[prodNum]:
                 if symbol.__class__ == Terminal \
@@ -155,6 +189,22 @@ class Grammar:
                                     % (prodNum, self.parseTable[key],
                                         prod.nonterm, symbol))
                 self.parseTable[key] = prodNum
+        for nonterm in self.nonterms:
+            self.permanentNonterms[nonterm.value] = nonterm.permanent
+        # Build the tables that findProduction uses; setdefault keeps the
+        # earliest production for each entry
+        for nonterm in self.nonterms:
+            self.typeTable[nonterm.value] = {}
+            self.valueTable[nonterm.value] = {}
+        for prodNum, prod in enumerate(self.productions):
+            for symbol in self.selectSets[prodNum]:
+                if symbol.__class__ == Terminal:
+                    table = self.typeTable[prod.nonterm.value]
+                elif symbol.__class__ == Literal:
+                    table = self.valueTable[prod.nonterm.value]
+                else:
+                    continue
+                table.setdefault(symbol.value, prodNum)
     
     def generateSelectSets(self):
         self.generateFirstSets()
@@ -318,15 +368,80 @@ class Grammar:
         return [ nonterm for prodNums, nonterm in pairs ]
 
     def nontermPermanent(self, nonterm):
-        for nt in self.nonterms:
-            if nt == nonterm:
-                return nt.permanent
+        return self.permanentNonterms.get(nonterm.value)
 
 def loadGrammar(BNF_filename):
     grammar = Grammar()
     grammar.loadFromFile(BNF_filename)
     return grammar
 
+def grammarHash(BNF_filename):
+    """Returns a hex digest identifying the compiled form of a grammar.
+    It covers the BNF file, the token regexes, and this module's own code,
+    since a change to any of them can change the compiled grammar."""
+    # We assume that all three files are in the same directory as this code
+    path = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for filename in (BNF_filename, REGEX_FILENAME, os.path.basename(__file__)):
+        f = open(os.path.join(path, filename), 'rb')
+        digest.update(f.read())
+        f.close()
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def writeFileAtomically(filename, data, private = False):
+    """Writes <data> (bytes) to <filename> via a temporary file in the same
+    directory, so that readers never see a partly written file. If
+    <private> is true, only the user can read and write the file."""
+    directory = os.path.dirname(filename)
+    os.makedirs(directory, exist_ok = True)
+    fd, tempName = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+    try:
+        if not private:
+            # mkstemp() makes the file private; give it the usual
+            # permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tempName, 0o666 & ~umask)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tempName, filename)
+    except BaseException:
+        try:
+            os.remove(tempName)
+        except OSError:
+            pass
+        raise
+
+def loadCachedGrammar(BNF_filename):
+    """Returns the Grammar for <BNF_filename>, loading it from the on-disk
+    cache when the cache was built from the same grammar. Otherwise, the
+    grammar is built from scratch and the cache is rewritten. Problems with
+    the cache are never fatal; they just mean building the grammar."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    cacheFilename = os.path.join(path, GRAMMAR_CACHE_DIR,
+                                 GRAMMAR_CACHE_FILENAME)
+    currentHash = grammarHash(BNF_filename)
+    try:
+        f = open(cacheFilename, 'rb')
+        try:
+            cachedHash, grammar = pickle.load(f)
+        finally:
+            f.close()
+    except Exception:
+        cachedHash = grammar = None
+    if cachedHash == currentHash:
+        return grammar
+    grammar = loadGrammar(BNF_filename)
+    try:
+        writeFileAtomically(cacheFilename,
+                            pickle.dumps((currentHash, grammar),
+                                         pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        # Read-only installation or similar; just skip caching
+        pass
+    return grammar
+
 
 if __name__ == "__main__":
     # Test code
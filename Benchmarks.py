@@ -0,0 +1,733 @@
+
+# Benchmarks for the Zephyr implementation
+# Run as "python Benchmarks.py" for all of them, or give benchmark names
+# (e.g. "python Benchmarks.py parseLookup") to run just those.
+
+from BNF import loadCachedGrammar
+from Scanner import Scanner
+from TableParser import parse
+import TableParser
+import AST
+from ParserGenerator import loadGeneratedParser
+from ProgramState import ProgramState
+from Execution import execute, applyBinaryOperator, searchBinaryOperator, \
+                      binaryDispatch
+from BuiltInClasses import ZInteger, ZFraction, ZBoolean, ZCharacter, \
+                           ZString, makeInteger, makeFraction, makeBoolean, \
+                           makeString
+import BuiltInClasses
+from ClosureCompiler import executeCompiled
+from VirtualMachine import executeBytecode
+import Transpiler
+from Folding import foldConstants
+from Lowering import lower
+from Optimizer import optimize, defaultPasses
+import io
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+def bestTime(function, repeats = 3):
+    """Returns the best wall-clock time of <repeats> calls to <function>."""
+    best = None
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def generateProgram(numStatements):
+    """Returns Zephyr code with roughly <numStatements> statements, made of
+    a mix of simple statements and loops."""
+    lines = []
+    for i in range(numStatements // 4):
+        lines.append("set x%d to (%d * 3) + 1" % (i, i))
+        lines.append("while x%d > 0" % i)
+        lines.append("    set x%d to x%d - 1" % (i, i))
+        lines.append("repeat")
+    return "\n".join(lines) + "\n"
+
+def benchParseLookup():
+    """Parse time against program length, with the table-driven production
+    lookup and with the original scan over the select sets."""
+    grammar = loadCachedGrammar("BNF.txt")
+    # The recursive parser goes several frames deep per statement
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    print("%10s %12s %12s %8s" % ("statements", "scan (ms)", "table (ms)",
+                                  "speedup"))
+    for numStatements in (100, 200, 400, 800, 1600):
+        # Lex once up front so that only parsing is timed
+        scanner = Scanner(generateProgram(numStatements))
+        times = []
+        for lookup in (grammar.findProductionByScan, grammar.findProduction):
+            lookupGrammar = LookupGrammar(grammar, lookup)
+            def run():
+                scanner.index = 0
+                scanner.fastForward()
+                parse(scanner, lookupGrammar)
+            times.append(bestTime(run))
+        print("%10d %12.1f %12.1f %7.1fx" % (numStatements,
+                                             times[0] * 1000, times[1] * 1000,
+                                             times[0] / times[1]))
+
+class LookupGrammar:
+    """Wraps a Grammar so that parsing uses the given production lookup."""
+    def __init__(self, grammar, lookup):
+        self.startSymbol = grammar.startSymbol
+        self.nontermPermanent = grammar.nontermPermanent
+        self.findProduction = lookup
+
+def benchParsers():
+    """Parse time of the table-driven parser and the generated
+    recursive-descent parser."""
+    grammar = loadCachedGrammar("BNF.txt")
+    generatedParser = loadGeneratedParser()
+    if generatedParser is None:
+        print("The generated parser is missing or out of date")
+        return
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    print("%10s %12s %14s %8s" % ("statements", "table (ms)",
+                                  "generated (ms)", "speedup"))
+    for numStatements in (100, 400, 1600):
+        scanner = Scanner(generateProgram(numStatements))
+        times = []
+        for parseFunction in (parse, generatedParser.parse):
+            def run():
+                scanner.index = 0
+                scanner.fastForward()
+                parseFunction(scanner, grammar)
+            times.append(bestTime(run))
+        print("%10d %12.1f %14.1f %7.1fx" % (numStatements,
+                                             times[0] * 1000, times[1] * 1000,
+                                             times[0] / times[1]))
+
+def benchParseAllocations():
+    """Node allocations and peak traced memory while parsing, with the
+    original TempNode tree builder and with the direct one."""
+    grammar = loadCachedGrammar("BNF.txt")
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    scanner = Scanner(generateProgram(400))
+    # Count node constructions by wrapping TreeNode.__init__
+    counts = {}
+    originalInit = AST.TreeNode.__init__
+    def countingInit(self, *args):
+        counts[self.__class__.__name__] = \
+                counts.get(self.__class__.__name__, 0) + 1
+        originalInit(self, *args)
+    print("%-12s %10s %10s %16s" % ("builder", "TreeNodes", "TempNodes",
+                                    "peak memory (KiB)"))
+    builders = (("TempNode", TableParser.parseNontermWithTempNodes),
+                ("direct", TableParser.parseNonterm))
+    AST.TreeNode.__init__ = countingInit
+    try:
+        for name, builder in builders:
+            counts.clear()
+            scanner.index = 0
+            scanner.fastForward()
+            tracemalloc.start()
+            tree = builder(grammar.startSymbol, scanner, grammar)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print("%-12s %10d %10d %16.1f" % (name, counts.get("TreeNode", 0),
+                                              counts.get("TempNode", 0),
+                                              peak / 1024))
+    finally:
+        AST.TreeNode.__init__ = originalInit
+
+def benchEngines():
+    """Run time of the tree-walking engine, the closure compiler, and the
+    bytecode VM (including compilation) on loop-heavy programs."""
+    grammar = loadCachedGrammar("BNF.txt")
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    engines = (("tree", execute), ("closure", executeCompiled),
+               ("vm", executeBytecode))
+    print("%10s" % "statements", end="")
+    for name, executor in engines:
+        print(" %12s" % ("%s (ms)" % name), end="")
+    print()
+    for numStatements in (100, 200, 400):
+        program = lower(parse(Scanner(generateProgram(numStatements)),
+                              grammar))
+        print("%10d" % numStatements, end="")
+        for name, executor in engines:
+            elapsed = bestTime(lambda: executor(program, ProgramState()))
+            print(" %12.1f" % (elapsed * 1000), end="")
+        print()
+
+def runQuietly(function, inputText):
+    """Calls <function> with <inputText> as standard input and standard
+    output thrown away. (The engines hold on to sys.stdout, so this
+    redirects the underlying file descriptor.)"""
+    sys.stdout.flush()
+    savedStdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    savedStdin = sys.stdin
+    os.dup2(devnull, 1)
+    try:
+        sys.stdin = io.StringIO(inputText)
+        function()
+        sys.stdout.flush()
+    finally:
+        sys.stdin = savedStdin
+        os.dup2(savedStdout, 1)
+        os.close(savedStdout)
+        os.close(devnull)
+
+def benchTranspiler():
+    """Run time of the tree-walking engine and of the Python translation
+    (with and without translating and compiling) on the sample programs,
+    with scripted input. Most of threeNPlusOne's time in the tree walker
+    goes to "mod", which works by repeated subtraction; the translation
+    does it natively on Integers."""
+    grammar = loadCachedGrammar("BNF.txt")
+    programs = (("eratosthenes", "Programs/eratosthenes.zeph", "3000\n10\n"),
+                ("threeNPlusOne", "Programs/threeNPlusOne.zeph",
+                 "27\nyes\n97\nno\n"))
+    print("%-14s %10s %16s %14s %8s" % ("program", "tree (ms)",
+                                        "translated (ms)", "run only (ms)",
+                                        "speedup"))
+    for name, filename, inputText in programs:
+        f = open(filename, 'r')
+        program = lower(parse(Scanner(f.read() + "\n"), grammar))
+        f.close()
+        compiled = Transpiler.compileSource(Transpiler.translate(program))
+        times = []
+        for function in (lambda: execute(program, ProgramState()),
+                         lambda: Transpiler.executeTranspiled(program,
+                                                              ProgramState()),
+                         lambda: Transpiler.runCode(compiled,
+                                                    ProgramState())):
+            times.append(bestTime(lambda: runQuietly(function, inputText)))
+        print("%-14s %10.1f %16.1f %14.1f %7.1fx" % (name, times[0] * 1000,
+                                                    times[1] * 1000,
+                                                    times[2] * 1000,
+                                                    times[0] / times[1]))
+
+def benchFolding():
+    """Tree-walker run time on the sample programs before and after folding
+    constants. (Lowering turns literals into Consts either way.)"""
+    grammar = loadCachedGrammar("BNF.txt")
+    programs = (("eratosthenes", "Programs/eratosthenes.zeph", "3000\n10\n"),
+                ("generated", None, ""))
+    print("%-14s %12s %12s %8s" % ("program", "plain (ms)", "folded (ms)",
+                                   "speedup"))
+    for name, filename, inputText in programs:
+        if filename is None:
+            code = generateProgram(200)
+        else:
+            f = open(filename, 'r')
+            code = f.read() + "\n"
+            f.close()
+        plainProgram = lower(parse(Scanner(code), grammar))
+        foldedProgram = lower(foldConstants(parse(Scanner(code), grammar)))
+        times = []
+        for program in (plainProgram, foldedProgram):
+            times.append(bestTime(lambda: runQuietly(
+                lambda: execute(program, ProgramState()), inputText)))
+        print("%-14s %12.1f %12.1f %7.1fx" % (name, times[0] * 1000,
+                                              times[1] * 1000,
+                                              times[0] / times[1]))
+
+def benchLowering():
+    """Memory taken up by the parse tree and by the lowered program, against
+    program length."""
+    grammar = loadCachedGrammar("BNF.txt")
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    print("%10s %16s %16s %8s" % ("statements", "parse tree (KiB)",
+                                  "lowered (KiB)", "ratio"))
+    for numStatements in (100, 400, 1600):
+        code = generateProgram(numStatements)
+        sizes = []
+        for build in (lambda: parse(Scanner(code), grammar),
+                      lambda: lower(parse(Scanner(code), grammar))):
+            # Measure only what the result keeps alive
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            result = build()
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            sizes.append(after - before)
+            del result
+        print("%10d %16.1f %16.1f %7.1fx" % (numStatements,
+                                             sizes[0] / 1024,
+                                             sizes[1] / 1024,
+                                             sizes[0] / sizes[1]))
+
+def benchCountedLoops():
+    """Run time of nested for loops with the loop variables counted natively
+    and with the generic increment-and-compare loop."""
+    code = ("set total to 0\n"
+            "for i from 1 to 200\n"
+            "    for j from i to 200\n"
+            "        set total to total + j\n"
+            "    next\n"
+            "next\n"
+            "print total\n")
+    grammar = loadCachedGrammar("BNF.txt")
+    print("%-8s %12s %12s %8s" % ("engine", "generic (ms)", "counted (ms)",
+                                  "speedup"))
+    for name, executor in (("tree", execute), ("closure", executeCompiled)):
+        times = []
+        for countable in (False, True):
+            program = lower(foldConstants(parse(Scanner(code), grammar)))
+            # Decide for the engine whether the loops can be counted
+            markLoops(program, countable)
+            times.append(bestTime(lambda: runQuietly(
+                lambda: executor(program, ProgramState()), "")))
+        print("%-8s %12.1f %12.1f %7.1fx" % (name, times[0] * 1000,
+                                             times[1] * 1000,
+                                             times[0] / times[1]))
+
+def markLoops(node, countable):
+    if node.__class__ == AST.Block:
+        for statement in node.statements:
+            markLoops(statement, countable)
+    elif node.__class__ == AST.For:
+        node.countable = countable
+        markLoops(node.body, countable)
+    elif node.__class__ == AST.While:
+        markLoops(node.body, countable)
+    elif node.__class__ == AST.If:
+        for condition, body in node.branches:
+            markLoops(body, countable)
+        if node.orelse is not None:
+            markLoops(node.orelse, countable)
+
+def benchOptimizer():
+    """Run time of each engine on the Sieve of Eratosthenes, on nested loops
+    with invariant expressions, and on the integer-heavy programs, without
+    optimization passes and with the engine's default passes. The two
+    versions of a program take turns, so that both run under the same
+    machine load, and the total shows whether the default passes are a net
+    win for the engine."""
+    grammar = loadCachedGrammar("BNF.txt")
+    f = open("Programs/eratosthenes.zeph", 'r')
+    sieve = f.read() + "\n"
+    f.close()
+    nested = ("set n to 60\n"
+              "set total to 0\n"
+              "for i from 1 to n * 2\n"
+              "    set j to 0\n"
+              "    while j < (n - 1)\n"
+              "        set total to total + ((n * n) + (i * i))\n"
+              "        set total to total - (i * i)\n"
+              "        inc j\n"
+              "    repeat\n"
+              "next\n"
+              "print total\n")
+    programs = ((("eratosthenes", sieve, "3000\n10\n"), ("nested", nested, ""))
+                + integerPrograms())
+    print("%-14s %-8s %-15s %10s %13s %8s" % ("program", "engine", "passes",
+                                              "none (ms)", "default (ms)",
+                                              "speedup"))
+    for name, executor in (("tree", execute),
+                           ("closure", executeCompiled),
+                           ("vm", executeBytecode),
+                           ("python", Transpiler.executeTranspiled)):
+        passes = defaultPasses[name]
+        totals = [0, 0]
+        for programName, code, inputText in programs:
+            versions = [ optimize(lower(foldConstants(parse(Scanner(code),
+                                                            grammar))),
+                                  versionPasses)
+                         for versionPasses in ((), passes) ]
+            times = [None, None]
+            for i in range(5):
+                for j, program in enumerate(versions):
+                    elapsed = bestTime(lambda: runQuietly(
+                        lambda: executor(program, ProgramState()),
+                        inputText), 1)
+                    if times[j] is None or elapsed < times[j]:
+                        times[j] = elapsed
+            totals[0] += times[0]
+            totals[1] += times[1]
+            print("%-14s %-8s %-15s %10.1f %13.1f %7.1fx" \
+                  % (programName, name, ",".join(passes), times[0] * 1000,
+                     times[1] * 1000, times[0] / times[1]))
+        print("%-14s %-8s %-15s %10.1f %13.1f %7.1fx" \
+              % ("total", name, ",".join(passes), totals[0] * 1000,
+                 totals[1] * 1000, totals[0] / totals[1]))
+
+def integerPrograms():
+    """Returns (name, code, input) for integer-heavy sample programs."""
+    f = open("Programs/threeNPlusOne.zeph", 'r')
+    collatz = f.read() + "\n"
+    f.close()
+    gcds = ("set total to 0\n"
+            "for a from 1 to 60\n"
+            "    for b from 1 to 60\n"
+            "        set x to a\n"
+            "        set y to b\n"
+            "        while y > 0\n"
+            "            set r to x mod y\n"
+            "            set x to y\n"
+            "            set y to r\n"
+            "        repeat\n"
+            "        if (x = 1) and (a < b)\n"
+            "            inc total\n"
+            "        end if\n"
+            "    next\n"
+            "next\n"
+            "print total\n")
+    return (("threeNPlusOne", collatz, "27\nyes\n97\nno\n"),
+            ("gcds", gcds, ""))
+
+def countConstructions(function, classes):
+    """Calls <function> and returns the number of instances of <classes>
+    made meanwhile."""
+    counts = [0]
+    savedConstructors = [ cls.__new__ for cls in classes ]
+    def counting(constructor):
+        def countingNew(cls, *args):
+            counts[0] += 1
+            return constructor(cls, *args)
+        return countingNew
+    for cls, constructor in zip(classes, savedConstructors):
+        cls.__new__ = counting(constructor)
+    try:
+        function()
+    finally:
+        for cls, constructor in zip(classes, savedConstructors):
+            cls.__new__ = constructor
+    return counts[0]
+
+def benchTypes():
+    """Run time of the closure compiler and the VM on integer-heavy programs,
+    without and with the operations that type inference marks running
+    natively. Untyped "mod" works by repeated subtraction, so it dominates
+    threeNPlusOne there."""
+    grammar = loadCachedGrammar("BNF.txt")
+    programs = integerPrograms()
+    print("%-14s %-8s %12s %12s %8s" % ("program", "engine", "untyped (ms)",
+                                        "typed (ms)", "speedup"))
+    for programName, code, inputText in programs:
+        for name, executor in (("closure", executeCompiled),
+                               ("vm", executeBytecode)):
+            times = []
+            for passes in (("licm", "cse"), ("licm", "cse", "types")):
+                program = optimize(lower(foldConstants(parse(Scanner(code),
+                                                             grammar))),
+                                   passes)
+                times.append(bestTime(lambda: runQuietly(
+                    lambda: executor(program, ProgramState()), inputText)))
+            print("%-14s %-8s %12.1f %12.1f %7.1fx" % (programName, name,
+                                                      times[0] * 1000,
+                                                      times[1] * 1000,
+                                                      times[0] / times[1]))
+
+def benchUnboxed():
+    """Run time of the tree walker on integer-heavy programs, and the number
+    of Integers and Booleans it makes, without and with type inference
+    (which lets it evaluate expressions on plain Python ints and bools)."""
+    grammar = loadCachedGrammar("BNF.txt")
+    print("%-14s %12s %12s %8s %12s %12s" % ("program", "untyped (ms)",
+                                             "typed (ms)", "speedup",
+                                             "untyped objs", "typed objs"))
+    for programName, code, inputText in integerPrograms():
+        times = []
+        objects = []
+        for passes in (("licm", "cse"), ("licm", "cse", "types")):
+            program = optimize(lower(foldConstants(parse(Scanner(code),
+                                                         grammar))),
+                               passes)
+            run = lambda: runQuietly(
+                lambda: execute(program, ProgramState()), inputText)
+            times.append(bestTime(run))
+            objects.append(countConstructions(run, (ZInteger, ZBoolean)))
+        print("%-14s %12.1f %12.1f %7.1fx %12d %12d" % (programName,
+                                                       times[0] * 1000,
+                                                       times[1] * 1000,
+                                                       times[0] / times[1],
+                                                       objects[0],
+                                                       objects[1]))
+
+# The revision just before the built-in value classes were slotted and
+# interned; benchValues() compares the constructors of its BuiltInClasses.py
+# with the current ones
+BASELINE_VALUES_REVISION = "dba3992f6bb26d4a51e24fccc256acbfb3d21bf3"
+
+def loadBaselineValues():
+    """Returns the BuiltInClasses module as of BASELINE_VALUES_REVISION,
+    read with git, or None if git or that revision isn't available."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    try:
+        source = subprocess.run(["git", "show", BASELINE_VALUES_REVISION
+                                 + ":BuiltInClasses.py"],
+                                cwd = path, capture_output = True,
+                                check = True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    module = types.ModuleType("BaselineBuiltInClasses")
+    exec(compile(source, "BuiltInClasses.py@" + BASELINE_VALUES_REVISION[:7],
+                 "exec"), module.__dict__)
+    return module
+
+def benchValues():
+    """Memory per value (everything it keeps alive) and time per
+    construction of the built-in values, through the constructors as they
+    were before the classes were slotted and interned (see
+    BASELINE_VALUES_REVISION), the public constructors, which check their
+    arguments, and the trusted ones."""
+    count = 20000
+    baseline = loadBaselineValues()
+    if baseline is None:
+        print("(Can't read revision %s with git, so there are no old "
+              "figures)" % BASELINE_VALUES_REVISION[:7])
+    cases = (("Integer", "ZInteger", ZInteger, makeInteger,
+              [ (1000 + i,) for i in range(count) ]),
+             ("small Integer", "ZInteger", ZInteger, makeInteger,
+              [ (i % 256,) for i in range(count) ]),
+             ("Fraction", "ZFraction", ZFraction, makeFraction,
+              [ (1, i + 2) for i in range(count) ]),
+             ("Boolean", "ZBoolean", ZBoolean, makeBoolean,
+              [ (i % 2 == 0,) for i in range(count) ]),
+             ("Character", "ZCharacter", ZCharacter, None,
+              [ (chr(65 + i % 26),) for i in range(count) ]),
+             ("String", "ZString", ZString, makeString,
+              [ ("abc",) for i in range(count) ]))
+    print("%-14s %10s %10s %14s %12s %12s" % ("value", "old bytes",
+                                              "bytes each", "old (ns)",
+                                              "public (ns)", "trusted (ns)"))
+    for name, className, constructor, trusted, argumentLists in cases:
+        old = getattr(baseline, className, None)
+        sizes = []
+        for function in (old, constructor):
+            if function is None:
+                sizes.append(None)
+                continue
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            values = [ function(*arguments) for arguments in argumentLists ]
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            # Don't count the list itself; shared values take no memory
+            sizes.append(max(after - before - sys.getsizeof(values), 0)
+                         / count)
+            del values
+        times = []
+        for function in (old, constructor, trusted):
+            if function is None:
+                times.append(None)
+                continue
+            def loop():
+                for arguments in argumentLists:
+                    function(*arguments)
+            times.append(bestTime(loop) / count * 1e9)
+        print("%-14s %10s %10.1f %14s %12.0f %12s" \
+              % (name, "-" if sizes[0] is None else "%.1f" % sizes[0],
+                 sizes[1], "-" if times[0] is None else "%.0f" % times[0],
+                 times[1], "-" if times[2] is None else "%.0f" % times[2]))
+
+def benchFractions():
+    """Run time of long Fraction accumulations: harmonic sums built up one
+    term at a time, directly on the built-in classes and by Zephyr programs
+    in the tree walker and the closure compiler."""
+    grammar = loadCachedGrammar("BNF.txt")
+    def harmonic(terms):
+        total = ZInteger(0)
+        for i in range(1, terms + 1):
+            total = applyBinaryOperator('+', total, ZFraction(1, i))
+        return str(total)
+    def products(terms):
+        # Telescoping product (1/2)(2/3)(3/4)... with a sum on the side
+        product = ZInteger(1)
+        total = ZInteger(0)
+        for i in range(1, terms + 1):
+            product = applyBinaryOperator('*', product, ZFraction(i, i + 1))
+            total = applyBinaryOperator('+', total, product)
+        return str(total)
+    print("%-36s %12s" % ("computation", "time (ms)"))
+    for name, function in (("harmonic sum, 300 terms",
+                            lambda: harmonic(300)),
+                           ("harmonic sum, 1000 terms",
+                            lambda: harmonic(1000)),
+                           ("harmonic sum, 2000 terms",
+                            lambda: harmonic(2000)),
+                           ("products, 1000 terms",
+                            lambda: products(1000))):
+        try:
+            elapsed = bestTime(function)
+        except RecursionError:
+            print("%-36s %12s" % (name, "overflow"))
+            continue
+        print("%-36s %12.1f" % (name, elapsed * 1000))
+    code = ("set total to 0\n"
+            "for i from 1 to 300\n"
+            "    set total to total + (1 / i)\n"
+            "next\n"
+            "print total\n")
+    for name, executor in (("tree", execute), ("closure", executeCompiled)):
+        program = optimize(lower(foldConstants(parse(Scanner(code),
+                                                     grammar))))
+        elapsed = bestTime(lambda: runQuietly(
+            lambda: executor(program, ProgramState()), ""))
+        print("%-36s %12.1f" % ("harmonic program, 300 terms, " + name,
+                                elapsed * 1000))
+
+# String concatenation as it was before Strings were kept in chunks: the
+# text of both operands copied into a new String
+eagerConcatenations = {
+    "+": lambda lhs, rhs: makeString("%s%s" % (lhs, rhs)),
+    "|": lambda lhs, rhs: makeString("%s %s" % (lhs, rhs)),
+    "||": lambda lhs, rhs: makeString("%s %s" % (lhs, rhs))
+    }
+
+def withEagerConcatenation(function):
+    """Calls <function> with the operators in eagerConcatenations applied
+    that way to a String lhs."""
+    savedFunctions = {}
+    for key in binaryDispatch:
+        lhsClass, rhsClass, operator = key
+        if lhsClass is ZString and operator in eagerConcatenations:
+            savedFunctions[key] = binaryDispatch[key]
+    for key in savedFunctions:
+        binaryDispatch[key] = eagerConcatenations[key[2]]
+    try:
+        function()
+    finally:
+        binaryDispatch.update(savedFunctions)
+
+def benchStrings():
+    """Run time of building long Strings one piece at a time, with + and
+    with |, directly on the built-in classes and by a Zephyr program in the
+    tree walker and the closure compiler, copying the String every time
+    (see eagerConcatenations) and appending to its chunks."""
+    grammar = loadCachedGrammar("BNF.txt")
+    def build(operator, pieces):
+        report = ZString("")
+        for i in range(pieces):
+            report = applyBinaryOperator(operator, report, ZInteger(i))
+        return str(report)
+    def compare(name, function):
+        times = [ bestTime(lambda: withEagerConcatenation(function)),
+                  bestTime(function) ]
+        print("%-36s %12.1f %12.1f %7.1fx" % (name, times[0] * 1000,
+                                              times[1] * 1000,
+                                              times[0] / times[1]))
+    print("%-36s %12s %12s %8s" % ("computation", "copied (ms)",
+                                   "chunked (ms)", "speedup"))
+    for pieces in (2000, 8000, 32000):
+        for operator in ('+', '|'):
+            compare("s %s i, %d pieces" % (operator, pieces),
+                    lambda: build(operator, pieces))
+    code = ("set report to \"\"\n"
+            "for i from 1 to 5000\n"
+            "    set report to report + (i + \", \")\n"
+            "next\n"
+            "print report\n")
+    for name, executor in (("tree", execute), ("closure", executeCompiled)):
+        program = optimize(lower(foldConstants(parse(Scanner(code),
+                                                     grammar))))
+        compare("report program, 5000 pieces, " + name,
+                lambda: runQuietly(
+                    lambda: executor(program, ProgramState()), ""))
+
+def withCopiedSections(function):
+    """Calls <function> with every section of a String copied out, as it
+    was before sections were views."""
+    savedLength = BuiltInClasses.MIN_VIEW_LENGTH
+    BuiltInClasses.MIN_VIEW_LENGTH = sys.maxsize
+    try:
+        function()
+    finally:
+        BuiltInClasses.MIN_VIEW_LENGTH = savedLength
+
+def benchSections():
+    """Run time of scanning a String one Character at a time by taking the
+    rest of it after each one, directly on the built-in classes and by a
+    Zephyr program in the tree walker and the closure compiler, copying
+    every section and making the long ones views (see MIN_VIEW_LENGTH in
+    BuiltInClasses.py)."""
+    grammar = loadCachedGrammar("BNF.txt")
+    def scan(length):
+        rest = ZString("ab," * (length // 3))
+        end = ZInteger(length)
+        commas = 0
+        while applyBinaryOperator('<', ZString(""), rest).value:
+            if str(rest.z_subscript(ZInteger(1))) == ",":
+                commas += 1
+            rest = rest.z_section(ZInteger(2), end)
+        return commas
+    def compare(name, function):
+        times = [ bestTime(lambda: withCopiedSections(function)),
+                  bestTime(function) ]
+        print("%-36s %12.1f %12.1f %7.1fx" % (name, times[0] * 1000,
+                                              times[1] * 1000,
+                                              times[0] / times[1]))
+    print("%-36s %12s %12s %8s" % ("computation", "copied (ms)",
+                                   "viewed (ms)", "speedup"))
+    for length in (300, 4000, 16000, 64000, 128000):
+        compare("scan, %d characters" % length, lambda: scan(length))
+    for pieces in (4000, 16000):
+        code = ("set rest to \"\"\n"
+                "for i from 1 to %d\n"
+                "    set rest to rest + \"ab,\"\n"
+                "next\n"
+                "set commas to 0\n"
+                "while \"\" < rest\n"
+                "    if rest[1] = ','\n"
+                "        inc commas\n"
+                "    end if\n"
+                "    set rest to rest[2...%d]\n"
+                "repeat\n"
+                "print commas\n") % (pieces, pieces * 3)
+        for name, executor in (("tree", execute),
+                               ("closure", executeCompiled)):
+            program = optimize(lower(foldConstants(parse(Scanner(code),
+                                                         grammar))))
+            compare("scan program, %d chars, %s" % (pieces * 3, name),
+                    lambda: runQuietly(
+                        lambda: executor(program, ProgramState()), ""))
+
+def benchOperators():
+    """Time per binary operation, looking the method up in the dispatch
+    table and searching for it by trying each method in turn."""
+    cases = (("Integer + Integer", '+', ZInteger(5), ZInteger(7)),
+             ("Integer + Fraction", '+', ZInteger(5), ZFraction(1, 3)),
+             ("Integer / Integer", '/', ZInteger(5), ZInteger(7)),
+             ("Integer = Fraction", '=', ZInteger(5), ZFraction(1, 3)),
+             ("Integer + String", '+', ZInteger(5), ZString("x")))
+    repeats = 20000
+    print("%-20s %12s %12s %8s" % ("operation", "search (us)", "table (us)",
+                                   "speedup"))
+    for name, operator, lhs, rhs in cases:
+        times = []
+        for function in (searchBinaryOperator, applyBinaryOperator):
+            def loop():
+                for i in range(repeats):
+                    function(operator, lhs, rhs)
+            times.append(bestTime(loop) / repeats)
+        print("%-20s %12.2f %12.2f %7.1fx" % (name, times[0] * 1e6,
+                                              times[1] * 1e6,
+                                              times[0] / times[1]))
+
+benchmarks = {
+    "parseLookup": benchParseLookup,
+    "parsers": benchParsers,
+    "parseAllocations": benchParseAllocations,
+    "engines": benchEngines,
+    "transpiler": benchTranspiler,
+    "folding": benchFolding,
+    "lowering": benchLowering,
+    "loops": benchCountedLoops,
+    "operators": benchOperators,
+    "optimizer": benchOptimizer,
+    "types": benchTypes,
+    "unboxed": benchUnboxed,
+    "values": benchValues,
+    "fractions": benchFractions,
+    "strings": benchStrings,
+    "sections": benchSections
+    }
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        print("== %s: %s" % (name, " ".join(benchmarks[name].__doc__.split())))
+        benchmarks[name]()
+        print()
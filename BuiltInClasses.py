@@ -8,12 +8,7 @@
 #   - The Zephyr type being constructed
 #   - Other Zephyr types
 
-# Try to import the built-in gcd function; if it is not available, use the
-# local reimplementation
-try:
-    from fractions import gcd
-except ImportError:
-    from Utilities import gcd
+from math import gcd
 
 from Errors import OverrideError, ConstructorTypeError
 
@@ -23,7 +18,16 @@ def getClassName(obj):
     except AttributeError:
         return str(obj.__class__)
 
+# Values are immutable, so every built-in class has a fixed __slots__ layout
+# instead of a per-instance __dict__, and values that are made all the time
+# are shared: there is one true and one false, and one Integer for each value
+# from -256 through 255 (the ones ProgramState keeps in reserved memory).
+# The public constructors check their arguments; code that already has
+# known-good Python values uses the trusted constructors after each class
+# (makeInteger() and so on), which skip the checks.
+
 class ZObject(object):
+    __slots__ = ()
     py_name = "ZObject"
     z_name = "Object"
     tokenStart = tokenEnd = ""
@@ -42,19 +46,21 @@ class ZObject(object):
 
     def z_concat(self, rhs):
         """Concatenate two values to a string (w/ space in between)"""
-        return ZString('%s %s' % (self, rhs))
+        return makeString('%s %s' % (self, rhs))
 
 # Deprecated--use z_concat
     def z_spaceConcat(self, rhs):
-        return ZString('%s %s' % (self, rhs))
+        return makeString('%s %s' % (self, rhs))
 
 class ZFunction(ZObject):
+    __slots__ = ()
     py_name = "ZFunction"
     z_name = "Function"
 
     pass
 
 class ZNumber(ZObject):
+    __slots__ = ()
     py_name = "ZNumber"
     z_name = "Number"
     
@@ -141,12 +147,12 @@ class ZNumber(ZObject):
 
     def z_inc(self):
         """Incrementing x gives x + 1"""
-        return self.z_plus(ZInteger(1))
+        return self.z_plus(makeInteger(1))
     
     def sgn(self):
         """Utility function to return the sign of a ZNumber.
         Override in subclasses for more efficient implementation."""
-        zero = ZInteger(0)
+        zero = makeInteger(0)
         if self.z_lessThan(zero):
             return -1
         elif self.z_equal(zero):
@@ -155,27 +161,27 @@ class ZNumber(ZObject):
             return 1
 
 class ZInteger(ZNumber):
+    __slots__ = ("value",)
     py_name = "ZInteger"
     z_name = "Integer"
     
     def __new__(cls, *args):
-        self = super(ZInteger, cls).__new__(cls)
         if len(args) == 1:
             if type(args[0]) == str:
                 # Convert a Python string
-                self.value = int(args[0])
+                value = int(args[0])
             elif type(args[0]) == int:
                 # Convert a Python integer
-                self.value = args[0]
+                value = args[0]
             elif args[0].__class__ == ZInteger:
-                # Convert another Zephyr integer
-                self.value = args[0].value
+                # Integers are immutable, so there's no need for a copy
+                return args[0]
             elif args[0].__class__ == ZFraction:
                 # Convert a Zephyr fraction (by truncating toward 0)
                 if args[0].sgn() == 1:
-                    self.value = args[0].num // args[0].den
+                    value = args[0].num // args[0].den
                 else:
-                    self.value = -(abs(args[0].num) // args[0].den)
+                    value = -(abs(args[0].num) // args[0].den)
             else:
                 expectedTypes = "str, int, ZInteger, or ZFraction"
                 raise ConstructorTypeError(cls.py_name,
@@ -186,40 +192,50 @@ class ZInteger(ZNumber):
             raise ConstructorTypeError(cls.py_name,
                                         expectedNumber,
                                         len(args))
-        return self
+        return makeInteger(value)
+
+    def __getnewargs__(self):
+        # Lets pickle recreate the object through the constructor
+        return (self.value,)
 
     def __str__(self):
         return str(self.value)
 
     def z_plus(self, rhs):
         if rhs.__class__ == ZInteger:
-            return ZInteger(self.value + rhs.value)
+            return makeInteger(self.value + rhs.value)
         else:
             raise TypeError
     
     def z_times(self, rhs):
         if rhs.__class__ == ZInteger:
-            return ZInteger(self.value * rhs.value)
+            return makeInteger(self.value * rhs.value)
         else:
             raise TypeError
 
     def z_lessThan(self, rhs):
         if rhs.__class__ == ZInteger:
-            return ZBoolean(self.value < rhs.value)
+            return makeBoolean(self.value < rhs.value)
         else:
             raise TypeError
 
     def z_equal(self, rhs):
         if rhs.__class__ == ZInteger:
-            return ZBoolean(self.value == rhs.value)
+            return makeBoolean(self.value == rhs.value)
         else:
             return False
 
+    def z_divide(self, rhs):
+        if rhs.__class__ == ZInteger:
+            return divideIntegers(self.value, rhs.value)
+        else:
+            raise TypeError
+
     def z_negation(self):
-        return ZInteger(-self.value)
+        return makeInteger(-self.value)
 
     def z_inverse(self):
-        return ZFraction(1, self.value)
+        return divideIntegers(1, self.value)
     
     def sgn(self):
         if self.value > 0:
@@ -229,7 +245,46 @@ class ZInteger(ZNumber):
         else:
             return -1
 
+def makeInteger(value):
+    """Trusted constructor: returns the Integer for the Python int
+    <value>."""
+    if -256 <= value < 256:
+        return smallIntegers[value + 256]
+    integer = object.__new__(ZInteger)
+    integer.value = value
+    return integer
+
+smallIntegers = []
+for value in range(-256, 256):
+    integer = object.__new__(ZInteger)
+    integer.value = value
+    smallIntegers.append(integer)
+del value, integer
+
+def divideIntegers(num, den):
+    """Returns the Python ints <num> / <den> as an Integer if the division
+    is exact, and as a Fraction otherwise. Raises ZeroDivisionError if <den>
+    is 0."""
+    quotient, remainder = divmod(num, den)
+    if remainder == 0:
+        return makeInteger(quotient)
+    if den < 0:
+        num = -num
+        den = -den
+    return makeLazyFraction(num, den)
+
+# Fractions are reduced lazily. The arithmetic methods give num and den that
+# need not be in lowest terms, as long as den is positive and does not
+# divide num (so the value is not an Integer, and the class is right). The
+# fraction is reduced in place by reduce(), which is called before it is
+# printed or stored in memory; comparisons work on the unreduced terms.
+# Terms that are left unreduced keep growing, though (a product like
+# (1/2)(2/3)(3/4)... has factorials for terms), so a fraction whose den gets
+# longer than LAZY_FRACTION_BITS is reduced right away.
+LAZY_FRACTION_BITS = 64
+
 class ZFraction(ZNumber):
+    __slots__ = ("num", "den", "reduced")
     py_name = "ZFraction"
     z_name = "Fraction"
     
@@ -246,9 +301,8 @@ class ZFraction(ZNumber):
                     self.num = int(num)
                     self.den = int(den)
             elif args[0].__class__ == ZFraction:
-                # Convert another Zephyr fraction
-                self.num = args[0].num
-                self.den = args[0].den
+                # Fractions are immutable, so there's no need for a copy
+                return args[0]
             elif args[0].__class__ == ZInteger:
                 # "Convert" a Zephyr integer
                 return ZInteger(args[0])
@@ -279,61 +333,91 @@ class ZFraction(ZNumber):
             self.den *= -1
         elif self.den == 0:
             raise ZeroDivisionError
-        this_gcd = abs(gcd(self.num, self.den))
+        this_gcd = gcd(self.num, self.den)
         self.num //= this_gcd
         self.den //= this_gcd
+        self.reduced = True
         if self.den == 1:
             # If the denominator is 1, return an Integer instead
-            return ZInteger(self.num)
+            return makeInteger(self.num)
         else:
             return self
 
+    def __getnewargs__(self):
+        # Lets pickle recreate the object through the constructor
+        return (self.num, self.den)
+
     def __str__(self):
+        self.reduce()
         return "%s/%s" % (self.num, self.den)
 
+    def reduce(self):
+        """Puts the fraction in lowest terms, if it isn't already; its value
+        stays the same."""
+        if not self.reduced:
+            this_gcd = gcd(self.num, self.den)
+            self.num //= this_gcd
+            self.den //= this_gcd
+            self.reduced = True
+
     def z_plus(self, rhs):
         if rhs.__class__ == ZFraction:
             # a/b + c/d <==> (a*d + b*c)/(b*d)
-            return ZFraction(self.num * rhs.den + self.den * rhs.num,
-                              self.den * rhs.den)
+            return makeLazyFraction(self.num * rhs.den + self.den * rhs.num,
+                                    self.den * rhs.den)
         elif rhs.__class__ == ZInteger:
             # a/b + n <==> (a + n*b)/b
-            return ZFraction(self.num + self.den * rhs.value, self.den)
+            return makeLazyFraction(self.num + self.den * rhs.value,
+                                    self.den)
         else:
             raise TypeError
     
     def z_times(self, rhs):
         if rhs.__class__ == ZFraction:
             # a/b * c/d <==> (a*c)/(b*d)
-            return ZFraction(self.num * rhs.num, self.den * rhs.den)
+            return makeLazyFraction(self.num * rhs.num, self.den * rhs.den)
         elif rhs.__class__ == ZInteger:
             # a/b * n <==> (a*n)/b
-            return ZFraction(self.num * rhs.value, self.den)
+            return makeLazyFraction(self.num * rhs.value, self.den)
         else:
             raise TypeError
 
     def z_lessThan(self, rhs):
+        if rhs.__class__ == ZFraction:
+            # a/b < c/d <==> a*d < c*b, since b and d are positive
+            return makeBoolean(self.num * rhs.den < rhs.num * self.den)
+        elif rhs.__class__ == ZInteger:
+            return makeBoolean(self.num < rhs.value * self.den)
         diff = self.z_minus(rhs)
         if diff.sgn() == -1:
             # self - rhs < 0, so self < rhs
-            return ZBoolean(True)
+            return TRUE
         else:
             # self - rhs >= 0, so not(self < rhs)
-            return ZBoolean(False)
+            return FALSE
 
     def z_equal(self, rhs):
         if rhs.__class__ == ZFraction:
-            return (self.num == rhs.num and self.den == rhs.den)
+            return self.num * rhs.den == rhs.num * self.den
         else:
             # No need to test for ZInteger, since no ZFraction has a
             # denominator of 1
             return False
 
     def z_negation(self):
-        return ZFraction(-self.num, self.den)
+        if self.reduced:
+            return makeFraction(-self.num, self.den)
+        return makeLazyFraction(-self.num, self.den)
 
     def z_inverse(self):
-        return ZFraction(self.den, self.num)
+        if self.num > 0:
+            num, den = self.den, self.num
+        else:
+            num, den = -self.den, -self.num
+        if self.reduced:
+            # Terms in lowest terms stay that way when swapped
+            return makeFraction(num, den)
+        return makeLazyFraction(num, den)
     
     def sgn(self):
         if self.num > 0:
@@ -343,26 +427,53 @@ class ZFraction(ZNumber):
         else:
             return -1
 
+def makeFraction(num, den):
+    """Trusted constructor: returns the Fraction <num>/<den>, which must be
+    in lowest terms with <den> positive, or the Integer <num> if <den> is
+    1."""
+    if den == 1:
+        return makeInteger(num)
+    fraction = object.__new__(ZFraction)
+    fraction.num = num
+    fraction.den = den
+    fraction.reduced = True
+    return fraction
+
+def makeLazyFraction(num, den):
+    """Trusted constructor: returns the Fraction <num>/<den>, where <den> is
+    positive but the terms need not be in lowest terms, or the Integer it
+    equals."""
+    if den.bit_length() > LAZY_FRACTION_BITS:
+        divisor = gcd(num, den)
+        return makeFraction(num // divisor, den // divisor)
+    if num % den == 0:
+        return makeInteger(num // den)
+    fraction = object.__new__(ZFraction)
+    fraction.num = num
+    fraction.den = den
+    fraction.reduced = False
+    return fraction
+
 class ZBoolean(ZObject):
+    __slots__ = ("value",)
     py_name = "ZBoolean"
     z_name = "Boolean"
     
     def __new__(cls, *args):
-        self = super(ZBoolean, cls).__new__(cls)
         if len(args) == 1:
             if type(args[0]) == str:
                 # Convert a Python string
                 string = args[0].lower()
                 if string.startswith("t") or string.startswith("y"):
-                    self.value = True
+                    return TRUE
                 else:
-                    self.value = False
+                    return FALSE
             elif type(args[0]) == bool:
                 # Convert a Python boolean
-                self.value = args[0]
+                return makeBoolean(args[0])
             elif args[0].__class__ == ZBoolean:
-                # Convert another Zephyr boolean
-                self.value = args[0].value
+                # Booleans are immutable, so there's no need for a copy
+                return args[0]
             else:
                 expectedTypes = "str, bool, or ZBoolean"
                 raise ConstructorTypeError(cls.py_name,
@@ -373,7 +484,10 @@ class ZBoolean(ZObject):
             raise ConstructorTypeError(cls.py_name,
                                         expectedNumber,
                                         len(args))
-        return self
+
+    def __getnewargs__(self):
+        # Lets pickle recreate the object through the constructor
+        return (self.value,)
 
     def __str__(self):
         if self.value == True:
@@ -386,26 +500,39 @@ class ZBoolean(ZObject):
     
     def z_and(self, rhs):
         if rhs.__class__ == ZBoolean:
-            return ZBoolean(self.value and rhs.value)
+            return makeBoolean(self.value and rhs.value)
         else:
             raise TypeError
     
     def z_or(self, rhs):
         if rhs.__class__ == ZBoolean:
-            return ZBoolean(self.value or rhs.value)
+            return makeBoolean(self.value or rhs.value)
         else:
             raise TypeError
 
     def z_not(self):
-        return ZBoolean(not self.value)
+        return makeBoolean(not self.value)
 
     def z_equal(self, rhs):
         if rhs.__class__ == ZBoolean:
-            return ZBoolean(self.value == rhs.value)
+            return makeBoolean(self.value == rhs.value)
         else:
             return False
 
+def makeBoolean(value):
+    """Trusted constructor: returns true or false, for the Python bool
+    <value>."""
+    if value:
+        return TRUE
+    return FALSE
+
+TRUE = object.__new__(ZBoolean)
+TRUE.value = True
+FALSE = object.__new__(ZBoolean)
+FALSE.value = False
+
 class ZCharacter(ZObject):
+    __slots__ = ("value",)
     py_name = "ZCharacter"
     z_name = "Character"
     tokenStart = tokenEnd = "'"
@@ -435,6 +562,10 @@ class ZCharacter(ZObject):
                                         len(args))
         return self
 
+    def __getnewargs__(self):
+        # Lets pickle recreate the object through the constructor
+        return (self.value,)
+
     def __str__(self):
         # str returns the character sans single-quotes
         return self.value
@@ -445,17 +576,36 @@ class ZCharacter(ZObject):
 
     def z_lessThan(self, rhs):
         if rhs.__class__ == ZCharacter:
-            return ZBoolean(self.value < rhs.value)
+            return makeBoolean(self.value < rhs.value)
         else:
             raise TypeError
 
     def z_equal(self, rhs):
         if rhs.__class__ == ZCharacter:
-            return ZBoolean(self.value == rhs.value)
+            return makeBoolean(self.value == rhs.value)
         else:
             return False
 
+# Strings made by concatenation are kept in pieces. Such a String has value
+# None and holds a list of chunks (Python strs) and the number of them that
+# make it up; flatten() joins them into value before the String is indexed,
+# compared, sectioned or printed. A chunk list is shared: concatenating onto
+# the last String made from it just appends to the list, so building a
+# String one piece at a time in a loop takes time linear in its length,
+# instead of copying it every time.
+#
+# Sections are views: a String with value None that holds the Python str
+# it was cut from (source) and where in it it starts and stops. Indexing,
+# comparing and sectioning a view work on the source, so scanning a String
+# by taking the rest of it again and again doesn't copy the rest each time;
+# the view is only copied out when it is printed or concatenated onto.
+# Sections shorter than MIN_VIEW_LENGTH are copied right away: copying that
+# much takes about as long as making a view, and the copy is quicker to
+# compare.
+MIN_VIEW_LENGTH = 8192
+
 class ZString(ZObject):
+    __slots__ = ("value", "chunks", "count", "source", "start", "stop")
     py_name = "ZString"
     z_name = "String"
     tokenStart = tokenEnd = '"'
@@ -479,38 +629,117 @@ class ZString(ZObject):
             raise ConstructorTypeError(cls.py_name,
                                         expectedNumber,
                                         len(args))
+        self.chunks = None
+        self.count = 0
+        self.source = None
         return self
 
+    def __getnewargs__(self):
+        # Lets pickle recreate the object through the constructor
+        self.flatten()
+        return (self.value,)
+
     def __str__(self):
+        self.flatten()
         return self.value
 
     def __repr__(self):
-        return '"%s"' % self.value
+        return '"%s"' % self
+
+    def flatten(self):
+        """Joins the chunks of the string, or copies the view, into its
+        value, if that hasn't been done yet."""
+        if self.value is None:
+            if self.source is not None:
+                self.value = self.source[self.start:self.stop]
+                self.source = None
+            else:
+                self.value = "".join(self.chunks[:self.count])
+                self.chunks = None
+
+    def span(self):
+        """Returns (text, start, stop), where the string is the Python str
+        text[start:stop], without copying a view."""
+        if self.value is None:
+            if self.source is not None:
+                return self.source, self.start, self.stop
+            self.flatten()
+        return self.value, 0, len(self.value)
+
+    def extended(self, text):
+        """Returns the String made of this one followed by the Python str
+        <text>."""
+        chunks = self.chunks
+        if chunks is not None and self.count == len(chunks):
+            # Nothing has been added to the chunks after this string yet
+            chunks.append(text)
+            return makeLazyString(chunks, self.count + 1)
+        return makeLazyString([str(self), text], 2)
+
+    def prefix(self, length):
+        """Returns the Python str of the first <length> characters of the
+        string (all of it, if it is shorter), without copying the rest of
+        a view."""
+        if self.source is not None:
+            return self.source[self.start:min(self.stop, self.start + length)]
+        return str(self)[:length]
 
     def z_lessThan(self, rhs):
         if rhs.__class__ == ZString:
-            return ZBoolean(self.value < rhs.value)
+            lhsValue = self.value
+            rhsValue = rhs.value
+            # A str compares with a longer one as it does with the first
+            # len(str) + 1 characters of it
+            if lhsValue is None:
+                if rhsValue is None:
+                    return makeBoolean(compareSpans(self.span(), rhs.span())
+                                       < 0)
+                lhsValue = self.prefix(len(rhsValue) + 1)
+            elif rhsValue is None:
+                rhsValue = rhs.prefix(len(lhsValue) + 1)
+            return makeBoolean(lhsValue < rhsValue)
         else:
             raise TypeError
 
     def z_equal(self, rhs):
         if rhs.__class__ == ZString:
-            return ZBoolean(self.value == rhs.value)
+            if self.value is not None and rhs.value is not None:
+                return makeBoolean(self.value == rhs.value)
+            lhsText, lhsStart, lhsStop = self.span()
+            rhsText, rhsStart, rhsStop = rhs.span()
+            if lhsStop - lhsStart != rhsStop - rhsStart:
+                return FALSE
+            return makeBoolean(compareSpans((lhsText, lhsStart, lhsStop),
+                                            (rhsText, rhsStart, rhsStop))
+                               == 0)
         else:
             return False
 
     def z_plus(self, rhs):
         """string + x ==> concatenation"""
-        return ZString('%s%s' % (self, rhs))
+        return self.extended(str(rhs))
 
     def z_rplus(rhs, lhs):
         """x + string ==> concatenation"""
-        return ZString('%s%s' % (lhs, rhs))
+        return makeString('%s%s' % (lhs, rhs))
+
+    def z_concat(self, rhs):
+        """Concatenate two values to a string (w/ space in between)"""
+        return self.extended(" " + str(rhs))
+
+    def z_spaceConcat(self, rhs):
+        return self.extended(" " + str(rhs))
 
     def z_subscript(self, index):
         if index.__class__ == ZInteger:
-            if index.value >= 1 and index.value <= len(self.value):
-                char = self.value[index.value-1]
+            if self.source is not None:
+                text, offset, length = (self.source, self.start,
+                                        self.stop - self.start)
+            else:
+                text, offset = str(self), 0
+                length = len(text)
+            if index.value >= 1 and index.value <= length:
+                char = text[offset + index.value-1]
                 return ZCharacter(char)
             else:
                 raise IndexError
@@ -519,19 +748,76 @@ class ZString(ZObject):
 
     def z_section(self, start, stop):
         if start.__class__ == ZInteger and stop.__class__ == ZInteger:
-            if start.value < 1:
-                start = ZInteger(1)
-            if stop.value > len(self.value):
-                stop = ZInteger(len(self.value))
-            if start.value > stop.value:
-                return ZString("")
+            if self.source is not None:
+                text, offset, length = (self.source, self.start,
+                                        self.stop - self.start)
+            else:
+                text, offset = str(self), 0
+                length = len(text)
+            first = max(start.value, 1)
+            last = min(stop.value, length)
+            if first > last:
+                return makeString("")
+            elif last - first + 1 < MIN_VIEW_LENGTH:
+                return makeString(text[offset + first-1:offset + last])
             else:
-                string = self.value[start.value-1:stop.value]
-                return ZString(string)
+                return makeView(text, offset + first-1, offset + last)
         else:
             raise TypeError
     
+def makeString(value):
+    """Trusted constructor: returns the String for the Python str
+    <value>."""
+    string = object.__new__(ZString)
+    string.value = value
+    string.chunks = None
+    string.count = 0
+    string.source = None
+    return string
+
+def makeLazyString(chunks, count):
+    """Trusted constructor: returns the String made of the first <count>
+    Python strs in the list <chunks>."""
+    string = object.__new__(ZString)
+    string.value = None
+    string.chunks = chunks
+    string.count = count
+    string.source = None
+    return string
+
+def makeView(source, start, stop):
+    """Trusted constructor: returns the String that is the Python str
+    <source>[<start>:<stop>], without copying it."""
+    string = object.__new__(ZString)
+    string.value = None
+    string.chunks = None
+    string.source = source
+    string.start = start
+    string.stop = stop
+    return string
+
+def compareSpans(lhs, rhs):
+    """Returns a negative number, 0 or a positive number as the string in
+    the span <lhs> is less than, equal to or greater than the one in <rhs>
+    (see ZString.span()). Only as much of them as it takes to find where
+    they differ is copied, in pieces of doubling size."""
+    lhsText, lhsStart, lhsStop = lhs
+    rhsText, rhsStart, rhsStop = rhs
+    size = 64
+    while True:
+        lhsPiece = lhsText[lhsStart:min(lhsStart + size, lhsStop)]
+        rhsPiece = rhsText[rhsStart:min(rhsStart + size, rhsStop)]
+        if lhsPiece != rhsPiece:
+            return -1 if lhsPiece < rhsPiece else 1
+        if lhsStart + size >= lhsStop or rhsStart + size >= rhsStop:
+            # One of them has run out, and they are the same up to there
+            return (lhsStop - lhsStart) - (rhsStop - rhsStart)
+        lhsStart += size
+        rhsStart += size
+        size *= 2
+
 class ZArray(ZObject):
+    __slots__ = ("size", "address")
     py_name = "ZArray"
     z_name = "Array"
     
@@ -578,3 +864,67 @@ class ZArray(ZObject):
             raise TypeError
 
 
+
+# The classes of values, and the classes of right-hand operands that each
+# of their binary operator methods handles. Execution.py makes its operator
+# dispatch table from these: an operator is applied with the lhs's method
+# if that handles the rhs's class, or else with the rhs's reverse method
+# (z_rplus for z_plus, z_greaterThan for z_lessThan, and so on) if that
+# handles the lhs's class. Any other combination is an error.
+valueClasses = (ZInteger, ZFraction, ZBoolean, ZCharacter, ZString, ZArray)
+numberClasses = (ZInteger, ZFraction)
+
+for valueClass in valueClasses:
+    # Any two values can be compared with = and concatenated
+    valueClass.binaryOperands = {
+        "z_equal": valueClasses,
+        "z_concat": valueClasses,
+        "z_spaceConcat": valueClasses
+        }
+del valueClass
+
+# \= only takes two Integers, Booleans, Characters or Strings, and a
+# Fraction can only be on the left of > and <=. Any other value divided by an
+# Integer goes to its z_rdivide(), which fails on the types unless the Integer
+# is 0 and reports that instead.
+ZInteger.binaryOperands.update({
+    "z_plus": (ZInteger,),
+    "z_minus": (ZInteger,),
+    "z_times": (ZInteger,),
+    "z_divide": (ZInteger,),
+    "z_mod": (ZInteger,),
+    "z_lessThan": (ZInteger,),
+    "z_greaterThan": (ZInteger,),
+    "z_lessThanEqual": (ZInteger,),
+    "z_greaterThanEqual": (ZInteger,),
+    "z_notEqual": (ZInteger,),
+    "z_rdivide": (ZBoolean, ZCharacter, ZString, ZArray)
+    })
+ZFraction.binaryOperands.update({
+    "z_plus": numberClasses,
+    "z_minus": numberClasses,
+    "z_times": numberClasses,
+    "z_divide": numberClasses,
+    "z_mod": numberClasses,
+    "z_lessThan": numberClasses,
+    "z_greaterThanEqual": numberClasses,
+    "z_rplus": (ZInteger,),
+    "z_rminus": (ZInteger,),
+    "z_rtimes": (ZInteger,),
+    "z_rdivide": (ZInteger,)
+    })
+ZBoolean.binaryOperands.update({
+    "z_and": (ZBoolean,),
+    "z_or": (ZBoolean,),
+    "z_notEqual": (ZBoolean,)
+    })
+ZCharacter.binaryOperands.update({
+    "z_lessThan": (ZCharacter,),
+    "z_notEqual": (ZCharacter,)
+    })
+ZString.binaryOperands.update({
+    "z_plus": valueClasses,
+    "z_rplus": valueClasses,
+    "z_lessThan": (ZString,),
+    "z_notEqual": (ZString,)
+    })
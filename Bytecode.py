@@ -0,0 +1,389 @@
+
+from BuiltInClasses import *
+from AST import Block, Print, Set, Inc, Input, While, For, If, BinOp, \
+                UnaryOp, Name, Subscript, Section, Call, Const, Random, \
+                Literal, Share, Reuse, Hoisted, Reset
+from Tokens import Token
+from Typing import nativeBinaryOps, nativeUnaryOps
+from array import array
+import sys
+
+# Compiler from lowered programs to bytecode for VirtualMachine.py. A
+# program compiles to a CodeObject: a flat array of instructions, each one an
+# opcode followed by a single integer argument, plus a pool of constants
+# (values, built-in classes, operators, and messages) that arguments refer
+# to. Variables are referred to by slot number. Loops and if statements
+# become conditional and unconditional jumps.
+#
+# The tree walker reports a ValueError raised anywhere inside getValue() as
+# an uninitialized variable, and lets it escape otherwise. To get the same
+# behavior, the compiler records the instruction ranges that correspond to a
+# getValue() call, and the VM checks them when a ValueError happens.
+
+# Opcodes
+LOAD_CONST = 0          # Push constants[arg]
+LOAD_SLOT = 1           # Push the variable ID bound to slot arg
+LOAD_SLOT_VALUE = 2     # Push the value of the variable in slot arg
+GET_VALUE = 3           # Replace the entity on top with its value
+BINARY_OP = 4           # Apply binary operator constants[arg] to top two
+UNARY_OP = 5            # Apply unary operator constants[arg] to top
+JUMP = 6                # Jump to arg
+JUMP_IF_FALSE = 7       # Pop a condition; jump to arg if it is false
+CHECK_ASSIGN = 8        # Check that the entity on top is an lvalue
+STORE = 9               # Pop an entity and an lvalue; assign it
+INC = 10                # Pop an lvalue and increment its variable
+PRINT_ITEM = 11         # Pop a value and print it, plus a space
+PRINT_NEWLINE = 12      # Print a newline
+RANDOM = 13             # Push a random Fraction in [0,1)
+LITERAL = 14            # Push the value of the literal token constants[arg]
+CHECK_CLASS = 15        # Check that the value on top is a built-in class
+INSTANTIATE = 16        # Pop arg arguments and a class; push an instance
+CHECK_NOT_CLASS = 17    # Check that the value on top can be subscripted
+SUBSCRIPT = 18          # Pop an index and a value; push the item's lvalue
+SECTION = 19            # Pop two bounds and a value; push the section
+CHECK_INPUT_TYPE = 20   # Check that the value on top is a type
+INPUT = 21              # Pop a type and an lvalue; read input into it
+LOAD_TEMP = 22          # Push the value kept in temp arg, or None
+STORE_TEMP = 23         # Keep the value on top in temp arg
+JUMP_IF_SET = 24        # Jump to arg if the top is not None; else pop it
+CLEAR_TEMP = 25         # Forget the value kept in temp arg
+NATIVE_BINARY_OP = 26   # BINARY_OP marked by Typing.py; constants[arg] is
+                        # (operator, operand class, native function)
+NATIVE_UNARY_OP = 27    # UNARY_OP marked by Typing.py, likewise
+ERROR = 28              # Print the message constants[arg] and stop
+HALT = 29               # End of the program
+
+opNames = [ "LOAD_CONST", "LOAD_SLOT", "LOAD_SLOT_VALUE", "GET_VALUE",
+            "BINARY_OP", "UNARY_OP", "JUMP", "JUMP_IF_FALSE", "CHECK_ASSIGN",
+            "STORE", "INC", "PRINT_ITEM", "PRINT_NEWLINE", "RANDOM",
+            "LITERAL", "CHECK_CLASS", "INSTANTIATE", "CHECK_NOT_CLASS",
+            "SUBSCRIPT", "SECTION", "CHECK_INPUT_TYPE", "INPUT", "LOAD_TEMP",
+            "STORE_TEMP", "JUMP_IF_SET", "CLEAR_TEMP", "NATIVE_BINARY_OP",
+            "NATIVE_UNARY_OP", "ERROR", "HALT" ]
+
+# Opcodes whose argument is an index into the constants
+constantOps = { LOAD_CONST, BINARY_OP, UNARY_OP, LITERAL, ERROR,
+                NATIVE_BINARY_OP, NATIVE_UNARY_OP }
+nativeOps = { NATIVE_BINARY_OP, NATIVE_UNARY_OP }
+jumpOps = { JUMP, JUMP_IF_FALSE, JUMP_IF_SET }
+# Opcodes whose argument is a slot number (see Resolution.py)
+slotOps = { LOAD_SLOT, LOAD_SLOT_VALUE }
+# Opcodes whose argument is a temp number (see Optimizer.py)
+tempOps = { LOAD_TEMP, STORE_TEMP, CLEAR_TEMP }
+
+class CodeObject:
+    """A compiled Zephyr program."""
+    def __init__(self):
+        self.code = array('l')
+        self.constants = []
+        # (start, stop) instruction offsets of code that runs inside a
+        # getValue() call of the tree walker
+        self.valueRegions = []
+        # Variable name of each slot used by the code
+        self.slotNames = []
+
+    def inValueRegion(self, offset):
+        for start, stop in self.valueRegions:
+            if start <= offset < stop:
+                return True
+        return False
+
+class Compiler:
+    """Compiles a lowered program into a CodeObject."""
+    def __init__(self):
+        self.codeObject = CodeObject()
+        self.code = self.codeObject.code
+        # Indices of string constants, which are worth sharing
+        self.stringIndices = {}
+
+    def compile(self, program):
+        self.compileStatement(program)
+        self.emit(HALT)
+        return self.codeObject
+
+    def emit(self, op, arg = 0):
+        """Appends an instruction and returns its offset."""
+        offset = len(self.code)
+        self.code.append(op)
+        self.code.append(arg)
+        return offset
+
+    def here(self):
+        return len(self.code)
+
+    def patchJump(self, offset, target = None):
+        """Points the jump at <offset> to <target> (by default, the next
+        instruction to be emitted)."""
+        if target is None:
+            target = self.here()
+        self.code[offset + 1] = target
+
+    def constant(self, value):
+        """Returns the index of <value> in the constant pool."""
+        constants = self.codeObject.constants
+        if value.__class__ == str:
+            if value not in self.stringIndices:
+                self.stringIndices[value] = len(constants)
+                constants.append(value)
+            return self.stringIndices[value]
+        constants.append(value)
+        return len(constants) - 1
+
+    def slot(self, node):
+        """Records the variable name of the Name <node> for its slot and
+        returns the slot number."""
+        slotNames = self.codeObject.slotNames
+        slot = node.slot
+        if slot >= len(slotNames):
+            slotNames.extend([None] * (slot + 1 - len(slotNames)))
+        slotNames[slot] = node.name
+        return slot
+
+    def error(self, message):
+        self.emit(ERROR, self.constant(message))
+
+    # Statements
+
+    def compileStatement(self, node):
+        if node.__class__ in statementMethods:
+            getattr(self, statementMethods[node.__class__])(node)
+        else:
+            self.error("Trying to execute unrecognized entity: %s"
+                       % node.__class__.__name__)
+
+    def compileBlock(self, node):
+        for statement in node.statements:
+            self.compileStatement(statement)
+
+    def compilePrint(self, node):
+        for item in node.items:
+            self.compileValue(item)
+            self.emit(PRINT_ITEM)
+        if node.newline:
+            self.emit(PRINT_NEWLINE)
+
+    def compileSet(self, node):
+        self.compileAssignment(node.target, node.value)
+
+    def compileAssignment(self, target, value):
+        self.compileEntity(target)
+        self.emit(CHECK_ASSIGN)
+        self.compileEntity(value)
+        self.emit(STORE)
+
+    def compileInc(self, node):
+        self.compileEntity(node.target)
+        self.emit(INC)
+
+    def compileInput(self, node):
+        self.compileEntity(node.target)
+        self.emit(CHECK_ASSIGN)
+        if node.inputType is not None:
+            self.compileValue(node.inputType)
+            self.emit(CHECK_INPUT_TYPE)
+        else:
+            self.emit(LOAD_CONST, self.constant(ZString))
+        self.emit(INPUT)
+
+    def compileLoop(self, condition, block, updater = None):
+        top = self.here()
+        self.compileValue(condition)
+        exitJump = self.emit(JUMP_IF_FALSE)
+        self.compileStatement(block)
+        if updater is not None:
+            self.compileStatement(updater)
+        self.emit(JUMP, top)
+        self.patchJump(exitJump)
+
+    def compileWhile(self, node):
+        self.compileLoop(node.condition, node.body)
+
+    def compileFor(self, node):
+        # Like the tree walker, update the loop variable with an assignment
+        # and an increment, and test it with an expression
+        self.compileAssignment(node.var, node.start)
+        self.compileLoop(BinOp("<=", node.var, node.finish), node.body,
+                         Inc(node.var))
+
+    def compileIf(self, node):
+        endJumps = []
+        for index, (condition, body) in enumerate(node.branches):
+            self.compileValue(condition)
+            nextJump = self.emit(JUMP_IF_FALSE)
+            self.compileStatement(body)
+            if index + 1 < len(node.branches) or node.orelse is not None:
+                endJumps.append(self.emit(JUMP))
+            self.patchJump(nextJump)
+        if node.orelse is not None:
+            self.compileStatement(node.orelse)
+        for offset in endJumps:
+            self.patchJump(offset)
+
+    def compileReset(self, node):
+        for temp in node.temps:
+            self.emit(CLEAR_TEMP, temp)
+
+    # Expressions
+
+    def compileValue(self, node):
+        """Compiles code that pushes what Execution.getValue() returns for
+        <node>."""
+        if node.__class__ == Const:
+            self.emit(LOAD_CONST, self.constant(node.value))
+            return
+        elif node.__class__ == Reuse:
+            self.emit(LOAD_TEMP, node.temp)
+            return
+        start = self.here()
+        if node.__class__ == Name:
+            # Plain variable
+            self.emit(LOAD_SLOT_VALUE, self.slot(node))
+        elif node.__class__ in (BinOp, UnaryOp, Share, Hoisted):
+            # Operators always give values, not variable IDs
+            self.compileEntity(node)
+        else:
+            self.compileEntity(node)
+            self.emit(GET_VALUE)
+        self.codeObject.valueRegions.append((start, self.here()))
+
+    def compileEntity(self, node):
+        """Compiles code that pushes what Execution.evaluate() returns for
+        <node>."""
+        nodeClass = node.__class__
+        if nodeClass == BinOp:
+            self.compileValue(node.lhs)
+            self.compileValue(node.rhs)
+            if node.operandType is not None:
+                native = nativeBinaryOps[node.operandType, node.operator]
+                self.emit(NATIVE_BINARY_OP,
+                          self.constant((node.operator, node.operandType,
+                                         native)))
+            else:
+                self.emit(BINARY_OP, self.constant(node.operator))
+        elif nodeClass == UnaryOp:
+            self.compileValue(node.operand)
+            if node.operandType is not None:
+                native = nativeUnaryOps[node.operandType, node.operator]
+                self.emit(NATIVE_UNARY_OP,
+                          self.constant((node.operator, node.operandType,
+                                         native)))
+            else:
+                self.emit(UNARY_OP, self.constant(node.operator))
+        elif nodeClass == Name:
+            self.emit(LOAD_SLOT, self.slot(node))
+        elif nodeClass == Const:
+            self.emit(LOAD_CONST, self.constant(node.value))
+        elif nodeClass == Reuse:
+            self.emit(LOAD_TEMP, node.temp)
+        elif nodeClass == Share:
+            self.compileEntity(node.expression)
+            self.emit(STORE_TEMP, node.temp)
+        elif nodeClass == Hoisted:
+            # Evaluate the expression only if no value is kept yet
+            self.emit(LOAD_TEMP, node.temp)
+            keptJump = self.emit(JUMP_IF_SET)
+            self.compileEntity(node.expression)
+            self.emit(STORE_TEMP, node.temp)
+            self.patchJump(keptJump)
+        elif nodeClass == Subscript or nodeClass == Section:
+            self.compileBase(node.base)
+            self.emit(CHECK_NOT_CLASS)
+            if nodeClass == Subscript:
+                self.compileValue(node.index)
+                self.emit(SUBSCRIPT)
+            else:
+                self.compileValue(node.start)
+                self.compileValue(node.stop)
+                self.emit(SECTION)
+        elif nodeClass == Call:
+            self.compileBase(node.base)
+            self.emit(CHECK_CLASS)
+            for argument in node.arguments:
+                self.compileValue(argument)
+            self.emit(INSTANTIATE, len(node.arguments))
+        elif nodeClass == Random:
+            self.emit(RANDOM)
+        elif nodeClass == Literal:
+            # Invalid literal; leave the error to run time
+            self.emit(LITERAL, self.constant(node.token))
+        else:
+            self.error("Trying to evaluate unrecognized entity: %s"
+                       % nodeClass.__name__)
+
+    def compileBase(self, node):
+        """Compiles code that pushes the value of the entity that a
+        subscript, section or instantiation starts from."""
+        self.compileEntity(node)
+        if node.__class__ != Const:
+            # A class is its own value
+            self.emit(GET_VALUE)
+
+statementMethods = {
+    Block: "compileBlock",
+    Print: "compilePrint",
+    Set: "compileSet",
+    Inc: "compileInc",
+    Input: "compileInput",
+    While: "compileWhile",
+    For: "compileFor",
+    If: "compileIf",
+    Reset: "compileReset"
+    }
+
+def compileProgram(program):
+    """Returns the CodeObject for the lowered <program>."""
+    return Compiler().compile(program)
+
+def disassemble(codeObject, file = None):
+    """Prints a listing of the instructions in <codeObject>."""
+    if file is None:
+        file = sys.stdout
+    code = codeObject.code
+    jumpTargets = { code[offset + 1] for offset in range(0, len(code), 2)
+                    if code[offset] in jumpOps }
+    for offset in range(0, len(code), 2):
+        op = code[offset]
+        arg = code[offset + 1]
+        marker = ">>" if offset in jumpTargets else ""
+        if op in constantOps:
+            constant = codeObject.constants[arg]
+            if op in nativeOps:
+                description = "(%r on %s)" % (constant[0],
+                                              constant[1].z_name)
+            elif isinstance(constant, Token):
+                description = "(%s)" % constant
+            elif isinstance(constant, type):
+                description = "(%s)" % constant.z_name
+            else:
+                description = "(%r)" % (constant,)
+            argText = "%d %s" % (arg, description)
+        elif op in slotOps:
+            argText = "%d (%s)" % (arg, codeObject.slotNames[arg])
+        elif op in tempOps:
+            argText = "$%d" % arg
+        elif op in jumpOps:
+            argText = "to %d" % arg
+        elif op == INSTANTIATE:
+            argText = "%d" % arg
+        else:
+            argText = ""
+        line = "%2s %5d  %-17s %s" % (marker, offset, opNames[op], argText)
+        print(line.rstrip(), file = file)
+
+if __name__ == "__main__":
+    # Print the bytecode of a program
+    from Scanner import Scanner
+    from TableParser import parseIterative
+    from BNF import loadCachedGrammar
+    from Folding import foldConstants
+    from Lowering import lower
+    from Optimizer import optimize
+    if len(sys.argv) < 2:
+        print("Usage: python Bytecode.py program.zeph")
+        sys.exit(1)
+    f = open(sys.argv[1], 'r')
+    code = f.read() + "\n"
+    f.close()
+    syntaxTree = parseIterative(Scanner(code), loadCachedGrammar("BNF.txt"))
+    program = optimize(lower(foldConstants(syntaxTree)))
+    disassemble(compileProgram(program))
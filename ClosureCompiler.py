@@ -0,0 +1,460 @@
+
+from BuiltInClasses import *
+from Errors import ZRuntimeError
+from ProgramState import isLValue
+from AST import Block, Print, Set, Inc, Input, While, For, If, BinOp, \
+                UnaryOp, Name, Subscript, Section, Call, Const, Random, \
+                Literal, Share, Reuse, Hoisted, Reset
+from Execution import literalValue, instantiate, subscript, section, \
+                      applyBinaryOperator, applyUnaryOperator, countedLoop
+from Typing import nativeBinaryOps, nativeUnaryOps, valueType
+from sys import stdout
+from random import randrange
+
+# The closure compiler walks the lowered program once and turns every node
+# into a Python closure that does what Execution.execute() or evaluate()
+# would do with that node. The closures have their child closures, operators
+# and constant values bound in already, so running the program is just
+# calling the closure for the root node. Error messages and the order of
+# side effects are the same as with the tree walker.
+#
+# Statement closures take the ProgramState. Expression closures come in two
+# flavors, matching the tree walker: compileEntity() gives the entity
+# (a value, a variable ID, or a built-in class) that evaluate() returns, and
+# compileValue() gives the value that getValue() returns.
+#
+# Operators, assignments and increments that the "types" pass marked (see
+# Typing.py) get closures that work on the Python values of their operands.
+# Each of them checks that the operands have the expected class first, and
+# if they don't, deoptimizes to what the unmarked closure would do.
+
+def executeCompiled(program, state):
+    """Compiles the lowered <program> and runs it on <state>; does the same
+    thing as Execution.execute()."""
+    compileStatement(program)(state)
+
+def compileStatement(node):
+    """Returns a closure that executes the statement <node>."""
+    if node.__class__ in statementCompilers:
+        return statementCompilers[node.__class__](node)
+    name = node.__class__.__name__
+    def unrecognized(state):
+        print("Trying to execute unrecognized entity:", name)
+        raise ZRuntimeError
+    return unrecognized
+
+def compileBlock(node):
+    statements = tuple(compileStatement(child) for child in node.statements)
+    if len(statements) == 1:
+        return statements[0]
+    def block(state):
+        for statement in statements:
+            statement(state)
+    return block
+
+def compilePrint(node):
+    values = tuple(compileValue(item) for item in node.items)
+    printNewline = node.newline
+    def printStatement(state):
+        for getValue in values:
+            value = getValue(state)
+            if hasattr(value, "z_output"):
+                # Call the value's z_output function
+                value.z_output()
+            else:
+                # Use the value's __str__ function instead
+                stdout.write(str(value))
+            # Either way, print a space afterward
+            stdout.write(" ")
+        if printNewline:
+            stdout.write("\n")
+    return printStatement
+
+def compileSet(node):
+    valueClass = valueType(node.value)
+    if node.target.__class__ == Name and valueClass is not None:
+        return compileTypedAssignment(node.target, node.value, valueClass)
+    return compileAssignment(node.target, node.value)
+
+def compileTypedAssignment(target, value, valueClass):
+    """Returns a closure that assigns the value of <value>, which is expected
+    to be a <valueClass>, to the variable <target>."""
+    slot = target.slot
+    name = target.name
+    rhs = compileEntity(value)
+    def typedSetStatement(state):
+        varId = state.getSlotVarId(slot, name)
+        rhsEntity = rhs(state)
+        if rhsEntity.__class__ is valueClass:
+            # Any value matches a variable's type, so skip the check in
+            # setVarAddress()
+            state.variables[varId] = (state.memorize(rhsEntity),
+                                      state.variables[varId][1])
+        else:
+            # Deoptimize
+            if isLValue(rhsEntity):
+                address = state.getVarAddress(rhsEntity)
+            else:
+                address = state.memorize(rhsEntity)
+            state.setVarAddress(varId, address)
+    return typedSetStatement
+
+def compileAssignment(target, value):
+    lhs = compileEntity(target)
+    rhs = compileEntity(value)
+    def setStatement(state):
+        lhsEntity = lhs(state)
+        if not isLValue(lhsEntity):
+            print("Trying to assign to value or reserved name")
+            raise ZRuntimeError
+        rhsEntity = rhs(state)
+        if isLValue(rhsEntity):
+            # Assign by reference
+            address = state.getVarAddress(rhsEntity)
+        else:
+            # Assign by value
+            address = state.memorize(rhsEntity)
+        state.setVarAddress(lhsEntity, address)
+    return setStatement
+
+def compileInc(node):
+    if node.target.__class__ == Name and node.targetType == ZInteger:
+        return compileIntegerIncrement(node.target)
+    return compileIncrement(node.target)
+
+def compileIntegerIncrement(target):
+    """Returns a closure that increments the variable <target>, which is
+    expected to hold an Integer."""
+    slot = target.slot
+    name = target.name
+    generic = compileIncrement(target)
+    def integerIncStatement(state):
+        varId = state.getSlotVarId(slot, name)
+        address, varType = state.variables[varId]
+        if address != -1:
+            oldValue = state.recall(address)
+            if oldValue.__class__ is ZInteger:
+                state.variables[varId] = \
+                    (state.memorize(makeInteger(oldValue.value + 1)), varType)
+                return
+        # Deoptimize
+        generic(state)
+    return integerIncStatement
+
+def compileIncrement(target):
+    lhs = compileEntity(target)
+    def incStatement(state):
+        lhsEntity = lhs(state)
+        if not isLValue(lhsEntity):
+            print("Trying to increment value or reserved name")
+            raise ZRuntimeError
+        try:
+            oldValue = state.getValue(lhsEntity)
+        except ValueError:
+            print("Trying to increment uninitialized variable")
+            raise ZRuntimeError
+        try:
+            newValue = oldValue.z_inc()
+        except AttributeError:
+            # oldValue's class does not have a z_inc() function
+            print("Cannot increment %s" % oldValue.z_name)
+            raise ZRuntimeError
+        address = state.memorize(newValue)
+        state.setVarAddress(lhsEntity, address)
+    return incStatement
+
+def compileInput(node):
+    lhs = compileEntity(node.target)
+    if node.inputType is not None:
+        getInputType = compileValue(node.inputType)
+    else:
+        getInputType = None
+    def inputStatement(state):
+        lhsEntity = lhs(state)
+        if not isLValue(lhsEntity):
+            print("Trying to assign to value or reserved name")
+            raise ZRuntimeError
+        if getInputType is not None:
+            inputType = getInputType(state)
+            if not isinstance(inputType, type):
+                print("Cannot input as %s because it is not a type" \
+                      % inputType)
+                raise ZRuntimeError
+        else:
+            inputType = ZString
+        value = inputType(input())
+        address = state.memorize(value)
+        state.setVarAddress(lhsEntity, address)
+    return inputStatement
+
+def compileLoop(condition, block, initializer = None, updater = None):
+    """Returns a closure that runs <initializer> (if given), then runs
+    <block> and <updater> (if given) while <condition> is true."""
+    def loop(state):
+        if initializer is not None:
+            initializer(state)
+        condVal = condition(state)
+        if condVal.__class__ != ZBoolean:
+            print("Given non-boolean as condition expression:", \
+                  repr(condVal))
+            raise ZRuntimeError
+        while condVal.value == True:
+            block(state)
+            if updater is not None:
+                updater(state)
+            condVal = condition(state)
+            if condVal.__class__ != ZBoolean:
+                print("Given non-boolean as condition expression:", \
+                      repr(condVal))
+                raise ZRuntimeError
+    return loop
+
+def compileWhile(node):
+    return compileLoop(compileValue(node.condition),
+                       compileStatement(node.body))
+
+def compileFor(node):
+    # Like the tree walker, update the loop variable with an assignment and
+    # an increment, and test it with an expression
+    initializer = compileAssignment(node.var, node.start)
+    updater = compileIncrement(node.var)
+    condition = compileValue(BinOp("<=", node.var, node.finish))
+    body = compileStatement(node.body)
+    if not node.countable:
+        return compileLoop(condition, body, initializer, updater)
+    loopVarEntity = compileEntity(node.var)
+    getFinish = compileValue(node.finish)
+    genericLoop = compileLoop(condition, body, None, updater)
+    def forStatement(state):
+        initializer(state)
+        # Count natively if the loop variable holds an Integer
+        varId = loopVarEntity(state)
+        if state.getValue(varId).__class__ == ZInteger:
+            countedLoop(varId, getFinish, body, state)
+        else:
+            genericLoop(state)
+    return forStatement
+
+def compileIf(node):
+    branches = tuple((compileValue(condition), compileStatement(body))
+                     for condition, body in node.branches)
+    if node.orelse is not None:
+        elseBlock = compileStatement(node.orelse)
+    else:
+        elseBlock = None
+    def ifStatement(state):
+        for condition, block in branches:
+            condVal = condition(state)
+            if condVal.__class__ != ZBoolean:
+                print("Given non-boolean as condition expression:", \
+                      repr(condVal))
+                raise ZRuntimeError
+            elif condVal.value == True:
+                # Execute this branch and skip the others
+                block(state)
+                return
+        if elseBlock is not None:
+            elseBlock(state)
+    return ifStatement
+
+def compileReset(node):
+    temps = node.temps
+    def resetStatement(state):
+        # Forget the values of a loop's hoisted expressions
+        for temp in temps:
+            state.temps.pop(temp, None)
+    return resetStatement
+
+statementCompilers = {
+    Block: compileBlock,
+    Print: compilePrint,
+    Set: compileSet,
+    Inc: compileInc,
+    Input: compileInput,
+    While: compileWhile,
+    For: compileFor,
+    If: compileIf,
+    Reset: compileReset
+    }
+
+def compileValue(node):
+    """Returns a closure that does what Execution.getValue() does with
+    <node>."""
+    if node.__class__ == Const:
+        constant = node.value
+        return lambda state: constant
+    if node.__class__ == Name:
+        # Plain variable
+        slot = node.slot
+        name = node.name
+        def variableValue(state):
+            try:
+                return state.getValue(state.getSlotVarId(slot, name))
+            except ValueError:
+                print("Trying to get the value of uninitialized variable")
+                raise ZRuntimeError
+        return variableValue
+    if node.__class__ == Reuse:
+        temp = node.temp
+        return lambda state: state.temps[temp]
+    if node.__class__ in (BinOp, UnaryOp) and node.operandType is not None:
+        return compileNativeOperator(node, True)
+    entity = compileEntity(node)
+    def value(state):
+        try:
+            return state.getValue(entity(state))
+        except ValueError:
+            print("Trying to get the value of uninitialized variable")
+            raise ZRuntimeError
+    return value
+
+def compileNativeOperator(node, forValue):
+    """Returns a closure for the BinOp or UnaryOp <node> marked by Typing.py,
+    which applies the operator natively to operands of the expected class
+    and deoptimizes to the generic operator otherwise. If <forValue>, an
+    error from the generic operator is reported as compileValue() would."""
+    operator = node.operator
+    operandType = node.operandType
+    if node.__class__ == BinOp:
+        native = nativeBinaryOps[operandType, operator]
+        lhs = compileValue(node.lhs)
+        rhs = compileValue(node.rhs)
+        def nativeBinaryExpression(state):
+            lhsValue = lhs(state)
+            rhsValue = rhs(state)
+            if lhsValue.__class__ is operandType \
+               and rhsValue.__class__ is operandType:
+                try:
+                    return native(lhsValue, rhsValue)
+                except ZeroDivisionError:
+                    # Let the generic operator report it
+                    pass
+            # Deoptimize
+            if not forValue:
+                return applyBinaryOperator(operator, lhsValue, rhsValue)
+            try:
+                return applyBinaryOperator(operator, lhsValue, rhsValue)
+            except ValueError:
+                print("Trying to get the value of uninitialized variable")
+                raise ZRuntimeError
+        return nativeBinaryExpression
+    native = nativeUnaryOps[operandType, operator]
+    operand = compileValue(node.operand)
+    def nativeUnaryExpression(state):
+        value = operand(state)
+        if value.__class__ is operandType:
+            return native(value)
+        # Deoptimize
+        if not forValue:
+            return applyUnaryOperator(operator, value)
+        try:
+            return applyUnaryOperator(operator, value)
+        except ValueError:
+            print("Trying to get the value of uninitialized variable")
+            raise ZRuntimeError
+    return nativeUnaryExpression
+
+def compileEntity(node):
+    """Returns a closure that does what Execution.evaluate() does with
+    <node>."""
+    nodeClass = node.__class__
+    if nodeClass in (BinOp, UnaryOp) and node.operandType is not None:
+        return compileNativeOperator(node, False)
+    if nodeClass == BinOp:
+        lhs = compileValue(node.lhs)
+        operator = node.operator
+        rhs = compileValue(node.rhs)
+        def binaryExpression(state):
+            return applyBinaryOperator(operator, lhs(state), rhs(state))
+        return binaryExpression
+    elif nodeClass == UnaryOp:
+        operator = node.operator
+        operand = compileValue(node.operand)
+        def unaryExpression(state):
+            return applyUnaryOperator(operator, operand(state))
+        return unaryExpression
+    elif nodeClass == Name:
+        slot = node.slot
+        name = node.name
+        return lambda state: state.getSlotVarId(slot, name)
+    elif nodeClass == Const:
+        constant = node.value
+        return lambda state: constant
+    elif nodeClass == Reuse:
+        temp = node.temp
+        return lambda state: state.temps[temp]
+    elif nodeClass == Share:
+        expression = compileEntity(node.expression)
+        temp = node.temp
+        def share(state):
+            value = state.temps[temp] = expression(state)
+            return value
+        return share
+    elif nodeClass == Hoisted:
+        expression = compileEntity(node.expression)
+        temp = node.temp
+        def hoisted(state):
+            # Loop-invariant expression, evaluated the first time around
+            value = state.temps.get(temp)
+            if value is None:
+                value = state.temps[temp] = expression(state)
+            return value
+        return hoisted
+    elif nodeClass == Subscript:
+        base = compileEntity(node.base)
+        index = compileValue(node.index)
+        def subscriptExpression(state):
+            currValue = state.getValue(base(state))
+            if isinstance(currValue, type):
+                print("Trying to subscript built-in class", \
+                      currValue.z_name)
+                raise ZRuntimeError
+            return subscript(currValue, index(state))
+        return subscriptExpression
+    elif nodeClass == Section:
+        base = compileEntity(node.base)
+        start = compileValue(node.start)
+        stop = compileValue(node.stop)
+        def sectionExpression(state):
+            currValue = state.getValue(base(state))
+            if isinstance(currValue, type):
+                print("Trying to subscript built-in class", \
+                      currValue.z_name)
+                raise ZRuntimeError
+            startValue = start(state)
+            return section(currValue, startValue, stop(state))
+        return sectionExpression
+    elif nodeClass == Call:
+        base = compileEntity(node.base)
+        arguments = tuple(compileValue(argument)
+                          for argument in node.arguments)
+        def call(state):
+            currValue = state.getValue(base(state))
+            if isinstance(currValue, type):
+                # currValue is a built-in class; instantiate it
+                return instantiate(currValue,
+                                   [ argument(state)
+                                     for argument in arguments ],
+                                   state)
+            else:
+                print("Trying to instantiate object of type", \
+                      getClassName(currValue))
+                raise ZRuntimeError
+        return call
+    elif nodeClass == Random:
+        def random(state):
+            # Generate a random Fraction in [0,1) and return it
+            denom = 12252240
+            numer = randrange(denom)
+            return ZFraction(numer, denom)
+        return random
+    elif nodeClass == Literal:
+        # Invalid literal; leave the error to run time
+        token = node.token
+        return lambda state: literalValue(token)
+    else:
+        name = nodeClass.__name__
+        def unrecognized(state):
+            print("Trying to evaluate unrecognized entity:", name)
+            raise ZRuntimeError
+        return unrecognized
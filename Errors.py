@@ -2,6 +2,9 @@
 class TokenError(Exception): pass
 class BNFError(Exception): pass
 class ZRuntimeError(Exception): pass
+# Raised when a value is not of the class that type inference expected (see
+# Typing.py); never reaches the user
+class Deoptimization(Exception): pass
 
 class ParseError(Exception):
     def __init__(self, message, token = None):
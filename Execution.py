@@ -1,9 +1,12 @@
 
 from BuiltInClasses import *
-from Errors import ZRuntimeError, ConstructorTypeError
+from Errors import ZRuntimeError, ConstructorTypeError, Deoptimization
 from ProgramState import ProgramState, isLValue
-from AST import TreeNode
-from Tokens import Operator
+from AST import Block, Print, Set, Inc, Input, While, For, If, BinOp, \
+                UnaryOp, Name, Subscript, Section, Call, Const, Random, \
+                Literal, Share, Reuse, Hoisted, Reset
+from Typing import unboxedBinaryOps, unboxedUnaryOps, unboxedClasses, \
+                   valueType
 from Utilities import removeFromFront, removeFromEnd
 from sys import stdout
 from random import randrange
@@ -50,12 +53,17 @@ builtInClasses = {
     "Array": ZArray
     }
 
-def runProgram(syntaxTree, debug = False):
+def runProgram(program, debug = False, executor = None):
+    """Runs the lowered <program> (see Lowering.py). <executor> is the
+    function that carries out the program's effects on a ProgramState; by
+    default, it is execute(), which walks the program directly."""
+    if executor is None:
+        executor = execute
     # Create a new (empty) program state
     state = ProgramState()
     # Execute the code
     try:
-        execute(syntaxTree, state)
+        executor(program, state)
     except (ZRuntimeError, KeyboardInterrupt):
         print("Execution terminated.")
     if debug:
@@ -63,156 +71,220 @@ def runProgram(syntaxTree, debug = False):
         state.output()
     
 def execute(node, state):
-    """Generates output and/or state changes based on the given AST node."""
-    if node.name == "Program":
-        # Execute the program's main block
-        execute(node.children[0], state)
-    elif node.name == "Block":
-        # Execute each statement in the block
-        for child in node.children:
-            execute(child, state)
-    elif node.name == "PrintStatement":
-        # Evaluate the statement's expressions and output them
-        printNewline = True
-        for child in node.children:
-            if child.name == "Symbol" and child.value == "...":
-                printNewline = False
-                break
-            value = getValue(child, state)
-            if hasattr(value, "z_output"):
-                # Call the value's z_output function
-                value.z_output()
-            else:
-                # Use the value's __str__ function instead
-                stdout.write(str(value))
-            # Either way, print a space afterward
-            stdout.write(" ")
-        if printNewline:
-            stdout.write("\n")
-    elif node.name == "SetStatement":
-        # Make the appropriate changes to the given variable
-        lhsEntity = evaluate(node.children[0], state)
-        if not isLValue(lhsEntity):
-            print("Trying to assign to value or reserved name")
-            raise ZRuntimeError
-        rhsEntity = evaluate(node.children[1], state)
-        if isLValue(rhsEntity):
-            # Assign by reference
-            address = state.getVarAddress(rhsEntity)
+    """Generates output and/or state changes based on the given lowered
+    statement node."""
+    handler = statementHandlers.get(node.__class__)
+    if handler is None:
+        print("Trying to execute unrecognized entity:", \
+              node.__class__.__name__)
+        raise ZRuntimeError
+    handler(node, state)
+
+def executeBlock(node, state):
+    # Execute each statement in the block
+    for statement in node.statements:
+        execute(statement, state)
+
+def executePrint(node, state):
+    # Evaluate the statement's expressions and output them
+    for item in node.items:
+        value = getValue(item, state)
+        if hasattr(value, "z_output"):
+            # Call the value's z_output function
+            value.z_output()
         else:
-            # Assign by value
-            address = state.memorize(rhsEntity)
-        state.setVarAddress(lhsEntity, address)
-    elif node.name == "IncStatement":
-        # Increment the given variable
-        lhsEntity = evaluate(node.children[0], state)
-        if not isLValue(lhsEntity):
-            print("Trying to increment value or reserved name")
-            raise ZRuntimeError
+            # Use the value's __str__ function instead
+            stdout.write(str(value))
+        # Either way, print a space afterward
+        stdout.write(" ")
+    if node.newline:
+        stdout.write("\n")
+
+def executeSet(node, state):
+    target = node.target
+    if target.__class__ == Name and valueType(node.value) is not None:
+        # The value is expected to be an Integer or Boolean
+        varId = state.getSlotVarId(target.slot, target.name)
         try:
-            oldValue = state.getValue(lhsEntity)
-        except ValueError:
-            print("Trying to increment uninitialized variable")
+            value = unboxedValue(node.value, state)
+        except Deoptimization:
+            pass
+        else:
+            # Any value matches a variable's type, so skip the check in
+            # setVarAddress()
+            state.variables[varId] = (state.memorizeUnboxed(value),
+                                      state.variables[varId][1])
+            return
+    assign(target, node.value, state)
+
+def assign(target, value, state):
+    """Makes the appropriate changes to the variable given by <target> to
+    give it the value of the expression <value>."""
+    lhsEntity = evaluate(target, state)
+    if not isLValue(lhsEntity):
+        print("Trying to assign to value or reserved name")
+        raise ZRuntimeError
+    rhsEntity = evaluate(value, state)
+    if isLValue(rhsEntity):
+        # Assign by reference
+        address = state.getVarAddress(rhsEntity)
+    else:
+        # Assign by value
+        address = state.memorize(rhsEntity)
+    state.setVarAddress(lhsEntity, address)
+
+def executeInc(node, state):
+    target = node.target
+    if node.targetType == ZInteger and target.__class__ == Name:
+        varId = state.getSlotVarId(target.slot, target.name)
+        address, varType = state.variables[varId]
+        if address != -1:
+            oldValue = state.recall(address)
+            if oldValue.__class__ is ZInteger:
+                state.variables[varId] = \
+                    (state.memorizeUnboxed(oldValue.value + 1), varType)
+                return
+    increment(target, state)
+
+def increment(target, state):
+    """Increments the variable given by <target>."""
+    lhsEntity = evaluate(target, state)
+    if not isLValue(lhsEntity):
+        print("Trying to increment value or reserved name")
+        raise ZRuntimeError
+    try:
+        oldValue = state.getValue(lhsEntity)
+    except ValueError:
+        print("Trying to increment uninitialized variable")
+        raise ZRuntimeError
+    try:
+        newValue = oldValue.z_inc()
+    except AttributeError:
+        # oldValue's class does not have a z_inc() function
+        print("Cannot increment %s" % oldValue.z_name)
+        raise ZRuntimeError
+    address = state.memorize(newValue)
+    state.setVarAddress(lhsEntity, address)
+
+def executeInput(node, state):
+    # Wait for user input and store it in the given variable
+    lhsEntity = evaluate(node.target, state)
+    if not isLValue(lhsEntity):
+        print("Trying to assign to value or reserved name")
+        raise ZRuntimeError
+    if node.inputType is not None:
+        inputType = getValue(node.inputType, state)
+        if not isinstance(inputType, type):
+            print("Cannot input as %s because it is not a type" % inputType)
             raise ZRuntimeError
+    else:
+        inputType = ZString
+    value = inputType(input())
+    address = state.memorize(value)
+    state.setVarAddress(lhsEntity, address)
+
+def conditionValue(condition, state):
+    """Returns the value of <condition>, which must be a Boolean."""
+    condVal = getValue(condition, state)
+    if condVal.__class__ != ZBoolean:
+        print("Given non-boolean as condition expression:", \
+              repr(condVal))
+        raise ZRuntimeError
+    return condVal
+
+def conditionTrue(condition, state):
+    """Returns whether <condition>, which must be a Boolean, is true."""
+    if valueType(condition) == ZBoolean:
         try:
-            newValue = oldValue.z_inc()
-        except AttributeError:
-            # oldValue's class does not have a z_inc() function
-            print("Cannot increment %s" % oldValue.z_name)
-            raise ZRuntimeError
-        address = state.memorize(newValue)
-        state.setVarAddress(lhsEntity, address)
-    elif node.name == "InputStatement":
-        # Wait for user input and store it in the given variable
-        lhsEntity = evaluate(node.children[0], state)
-        if not isLValue(lhsEntity):
-            print("Trying to assign to value or reserved name")
-            raise ZRuntimeError
-        if len(node.children) > 1:
-            inputType = getValue(node.children[1], state)
-            if not isinstance(inputType, type):
-                print("Cannot input as %s because it is not a type" % inputType)
-                raise ZRuntimeError
+            return unboxedValue(condition, state)
+        except Deoptimization:
+            pass
+    return conditionValue(condition, state).value == True
+
+def executeWhile(node, state):
+    # Execute the statement's block as long as its expression is true
+    while conditionTrue(node.condition, state):
+        execute(node.body, state)
+
+def executeFor(node, state):
+    # Execute the statement's block for values of its variable between
+    # the given bounds
+    assign(node.var, node.start, state)
+    if node.countable:
+        # Count natively if the loop variable holds an Integer
+        varId = evaluate(node.var, state)
+        if state.getValue(varId).__class__ == ZInteger:
+            finish = node.finish
+            body = node.body
+            countedLoop(varId, lambda state: getValue(finish, state),
+                        lambda state: execute(body, state), state)
+            return
+    # Construct an expression to test the loop variable
+    condition = BinOp("<=", node.var, node.finish)
+    while conditionValue(condition, state).value == True:
+        execute(node.body, state)
+        increment(node.var, state)
+
+def executeIf(node, state):
+    # Execute the appropriate block based on the conditions
+    for condition, body in node.branches:
+        if conditionTrue(condition, state):
+            # Execute this branch and skip the others
+            execute(body, state)
+            return
+    if node.orelse is not None:
+        execute(node.orelse, state)
+
+def executeReset(node, state):
+    # Forget the values of a loop's hoisted expressions
+    for temp in node.temps:
+        state.temps.pop(temp, None)
+
+statementHandlers = {
+    Block: executeBlock,
+    Print: executePrint,
+    Set: executeSet,
+    Inc: executeInc,
+    Input: executeInput,
+    While: executeWhile,
+    For: executeFor,
+    If: executeIf,
+    Reset: executeReset
+    }
+
+def countedLoop(varId, getFinish, runBlock, state):
+    """Runs a for loop whose variable <varId> holds an Integer and is not
+    changed by the body, keeping the count in a Python int. <getFinish>
+    gives the value of the upper bound, which is evaluated again before
+    each iteration; <runBlock> runs the body. The variable is updated in
+    memory each time around, as the generic loop would."""
+    counter = state.getValue(varId).value
+    varType = state.getVarType(varId)
+    while True:
+        finishValue = getFinish(state)
+        if finishValue.__class__ == ZInteger:
+            if counter > finishValue.value:
+                break
         else:
-            inputType = ZString
-        value = inputType(input())
-        address = state.memorize(value)
-        state.setVarAddress(lhsEntity, address)
-    elif node.name == "WhileStatement":
-        # Execute the statement's block as long as its expression is true
-        condition = node.children[0]
-        block = node.children[1]
-        condVal = getValue(condition, state)
-        if condVal.__class__ != ZBoolean:
-            print("Given non-boolean as condition expression:", \
-                  repr(condVal))
-            raise ZRuntimeError
-        while condVal.value == True:
-            execute(block, state)
-            condVal = getValue(condition, state)
-            if condVal.__class__ != ZBoolean:
-                print("Given non-boolean as condition expression:", \
-                      repr(condVal))
+            try:
+                condVal = applyBinaryOperator("<=", makeInteger(counter),
+                                              finishValue)
+            except ValueError:
+                # The generic loop compares inside getValue()
+                print("Trying to get the value of uninitialized variable")
                 raise ZRuntimeError
-    elif node.name == "ForStatement":
-        # Execute the statement's block for values of its variable between
-        # the given bounds
-        loopVar = node.children[0]
-        start = node.children[1]
-        finish = node.children[2]
-        block = node.children[-1]
-        # Construct a couple of statements to update the value of the
-        # loop variable and an expression to test it
-        initializer = TreeNode("SetStatement", loopVar, start)
-        updater = TreeNode("IncStatement", loopVar)
-        condOperator = Operator("<=")
-        condition = TreeNode("Expression", loopVar, condOperator, finish)
-        # Enter the loop
-        execute(initializer, state)
-        condVal = getValue(condition, state)
-        if condVal.__class__ != ZBoolean:
-            print("Given non-boolean as condition expression:", \
-                  repr(condVal))
-            raise ZRuntimeError
-        while condVal.value == True:
-            execute(block, state)
-            execute(updater, state)
-            condVal = getValue(condition, state)
             if condVal.__class__ != ZBoolean:
                 print("Given non-boolean as condition expression:", \
                       repr(condVal))
                 raise ZRuntimeError
-    elif node.name == "IfStatement":
-        # Execute the appropriate block based on the conditions
-        index = 0
-        while index < len(node.children):
-            if index == len(node.children) - 1:
-                # We're looking at the last child, which must be the block
-                # of an else branch
-                block = node.children[index]
-                execute(block, state)
+            if condVal.value != True:
                 break
-            else:
-                # Otherwise, we're looking at the original if branch or
-                # an else if branch
-                condition = node.children[index]
-                block = node.children[index+1]
-                condVal = getValue(condition, state)
-                if condVal.__class__ != ZBoolean:
-                    print("Given non-boolean as condition expression:", \
-                          repr(condVal))
-                    raise ZRuntimeError
-                elif condVal.value == True:
-                    # Execute this branch and skip the others
-                    execute(block, state)
-                    break
-                else:
-                    # Skip this branch and try the next one
-                    index += 2
-    else:
-        print("Trying to execute unrecognized entity:", node.name)
-        raise ZRuntimeError
-    return
+        runBlock(state)
+        counter += 1
+        # An Integer always matches the variable's type, so skip the check
+        # in setVarAddress()
+        state.variables[varId] = (state.memorize(makeInteger(counter)),
+                                  varType)
 
 def getValue(node, state):
     """Convenience function that combines evaluate() and state.getValue()."""
@@ -223,132 +295,238 @@ def getValue(node, state):
         raise ZRuntimeError
 
 def evaluate(node, state):
-    """Returns the value of the given AST node."""
-    if node.name == "Expression":
-        # Evaluate an expression
-        if len(node.children) == 1:
-            # Single entity
-            return evaluate(node.children[0], state)
-        elif len(node.children) == 2:
-            # Unary operator and a single entity
-            operator = node.children[0].value
-            value = getValue(node.children[1], state)
-            return applyUnaryOperator(operator, value)
+    """Returns the value of the given lowered expression node."""
+    nodeClass = node.__class__
+    if nodeClass == Name:
+        # The variable ID of a variable
+        return state.getSlotVarId(node.slot, node.name)
+    elif nodeClass == Const:
+        # Literal, built-in class, or constant expression whose value was
+        # computed ahead of time
+        return node.value
+    elif nodeClass == BinOp:
+        if node.operandType is not None:
+            try:
+                return boxed(unboxedValue(node, state))
+            except Deoptimization:
+                pass
+        # Two entities and a binary operator
+        lhsValue = getValue(node.lhs, state)
+        # TODO: Short-circuit code goes here?
+        rhsValue = getValue(node.rhs, state)
+        return applyBinaryOperator(node.operator, lhsValue, rhsValue)
+    elif nodeClass == Reuse:
+        # Value of a shared expression, kept by a Share node
+        return state.temps[node.temp]
+    elif nodeClass == Share:
+        value = evaluate(node.expression, state)
+        state.temps[node.temp] = value
+        return value
+    elif nodeClass == Hoisted:
+        # Loop-invariant expression, evaluated the first time around
+        value = state.temps.get(node.temp)
+        if value is None:
+            value = evaluate(node.expression, state)
+            state.temps[node.temp] = value
+        return value
+    elif nodeClass == UnaryOp:
+        if node.operandType is not None:
+            try:
+                return boxed(unboxedValue(node, state))
+            except Deoptimization:
+                pass
+        # Unary operator and a single entity
+        value = getValue(node.operand, state)
+        return applyUnaryOperator(node.operator, value)
+    elif nodeClass == Subscript or nodeClass == Section:
+        currValue = state.getValue(evaluate(node.base, state))
+        if isinstance(currValue, type):
+            print("Trying to subscript built-in class", currValue.z_name)
+            raise ZRuntimeError
+        elif nodeClass == Subscript:
+            index = getValue(node.index, state)
+            return subscript(currValue, index)
+        else:
+            start = getValue(node.start, state)
+            stop = getValue(node.stop, state)
+            return section(currValue, start, stop)
+    elif nodeClass == Call:
+        currValue = state.getValue(evaluate(node.base, state))
+        if isinstance(currValue, type):
+            # currValue is a built-in class; instantiate it
+            arguments = [ getValue(argument, state)
+                          for argument in node.arguments ]
+            return instantiate(currValue, arguments, state)
         else:
-            # Two entities and a binary operator
-            lhsValue = getValue(node.children[0], state)
-            operator = node.children[1].value
-            # TODO: Short-circuit code goes here?
-            rhsValue = getValue(node.children[2], state)
-            return applyBinaryOperator(operator, lhsValue, rhsValue)
-    elif node.name == "Keyword" and node.value == "random":
+            print("Trying to instantiate object of type", \
+                  getClassName(currValue))
+            raise ZRuntimeError
+    elif nodeClass == Random:
         # Generate a random Fraction in [0,1) and return it
         denom = 12252240
         numer = randrange(denom)
         return ZFraction(numer, denom)
-    elif node.name == "NameThing":
-        # Get the value of a variable or constant name, an object
-        # instantiation, a subscript, or a slice
-        # Start by getting the (l)value associated with the base name
-        name = node.children[0].value
-        if name in builtInClasses:
-            currEntity = builtInClasses[name]
-        else:
-            currEntity = state.getVarId(name)
-        # Modify the entity based on the remaining child nodes
-        for child in node.children[1:]:
-            # Get the value of the current entity
-            currValue = state.getValue(currEntity)
-            # Under certain error conditions, we had the following:
-            #print "Trying to get the value of uninitialized variable", \
-            #      "'%s'" % name
-            #raise ZRuntimeError
-            if child.name == "Parentheses":
-                if isinstance(currValue, type):
-                    # currValue is a built-in class; instantiate it
-                    arguments = [ getValue(grandchild, state)
-                                  for grandchild in child.children ]
-                    try:
-                        currEntity = currValue(*arguments)
-                    except ConstructorTypeError:
-                        print("Wrong argument number or type(s) for %s():" \
-                                  % getClassName(currValue), end=' ')
-                        argtypes = [ getClassName(arg) for arg in arguments ]
-                        print(", ".join(argtypes))
-                        raise ZRuntimeError
-                    if type(currEntity) == tuple:
-                        # Constructor returned a value and a memory operation
-                        currEntity, memOp = currEntity
-                        # At this point, the only "memory operation" is an
-                        # integer number of variables to allocate for an array
-                        address = state.createVariables(memOp)
-                        currEntity.assignAddress(address)
-                else:
-                    print("Trying to instantiate object of type", \
-                          getClassName(currValue))
-                    raise ZRuntimeError
-            elif child.name == "SquareBraces":
-                if isinstance(currValue, type):
-                    print("Trying to subscript built-in class", \
-                          currValue.z_name)
-                    raise ZRuntimeError
-                else:
-                    # Determine whether we're dealing with a subscript or a
-                    # section
-                    if len(child.children) == 1:
-                        # This is a subscript
-                        isSection = False
-                        # Evaluate the given index
-                        index = getValue(child.children[0], state)
-                    elif len(child.children) == 2:
-                        # This is a section
-                        isSection = True
-                        # Evaluate the given indices
-                        start = getValue(child.children[0], state)
-                        stop = getValue(child.children[1], state)
-                    if isSection:
-                        # Get the value of the given section
-                        try:
-                            currEntity = currValue.z_section(start, stop)
-                        except AttributeError:
-                            print("%s object does not allow sections" \
-                                  % currValue.z_name)
-                            raise ZRuntimeError
-                        except TypeError:
-                            print("Illegal section bounds for %s: %s and %s" \
-                                  % (currValue.z_name, start, stop))
-                            raise ZRuntimeError
-                    else:
-                        # Get the lvalue of the item at the given subscript
-                        try:
-                            currEntity = currValue.z_subscript(index)
-                        except AttributeError:
-                            print("%s object is not subscriptable" \
-                                  % currValue.z_name)
-                            raise ZRuntimeError
-                        except TypeError:
-                            print("Illegal subscript for %s: %s" \
-                                  % (currValue.z_name, index))
-                            raise ZRuntimeError
-                        except IndexError:
-                            print("Subscript out of bounds:", index)
-                            raise ZRuntimeError
-            else:
-                print("Unsupported NameThing child:", child.name)
-                raise ZRuntimeError
-        return currEntity
-    elif node.name in builtInClasses:
-        # Token is a literal of a built-in type
-        itemClass = builtInClasses[node.name]
-        tokenString = node.value
-        tokenString = removeFromFront(tokenString, itemClass.tokenStart)
-        tokenString = removeFromEnd(tokenString, itemClass.tokenEnd)
-        return itemClass(tokenString)
+    elif nodeClass == Literal:
+        # Invalid literal; this raises the error
+        return literalValue(node.token)
     else:
-        print("Trying to evaluate unrecognized entity:", node.name)
+        print("Trying to evaluate unrecognized entity:", nodeClass.__name__)
+        raise ZRuntimeError
+
+def unboxedValue(node, state):
+    """Returns the value of the lowered expression <node>, which is expected
+    to be an Integer or Boolean (see Typing.py), as a plain Python int or
+    bool, without making Zephyr objects for the values along the way.
+    Raises Deoptimization if some value isn't of the class the types pass
+    expected, or an operation would give an error or a value of another
+    class; since the expression has no side effects apart from creating
+    variables, the caller can then evaluate it again the generic way, and
+    get the same result or error."""
+    nodeClass = node.__class__
+    if nodeClass == Name:
+        varId = state.getSlotVarId(node.slot, node.name)
+        address = state.variables[varId][0]
+        if address == -1:
+            # Uninitialized variable
+            raise Deoptimization
+        return unboxed(state.recall(address))
+    elif nodeClass == BinOp:
+        operandType = node.operandType
+        if operandType is None:
+            raise Deoptimization
+        lhs = unboxedValue(node.lhs, state)
+        rhs = unboxedValue(node.rhs, state)
+        pythonClass = unboxedClasses[operandType]
+        if lhs.__class__ is not pythonClass \
+           or rhs.__class__ is not pythonClass:
+            raise Deoptimization
+        try:
+            return unboxedBinaryOps[operandType, node.operator](lhs, rhs)
+        except ZeroDivisionError:
+            raise Deoptimization
+    elif nodeClass == Const:
+        return unboxed(node.value)
+    elif nodeClass == UnaryOp:
+        operandType = node.operandType
+        if operandType is None:
+            raise Deoptimization
+        value = unboxedValue(node.operand, state)
+        if value.__class__ is not unboxedClasses[operandType]:
+            raise Deoptimization
+        return unboxedUnaryOps[operandType, node.operator](value)
+    elif nodeClass == Reuse:
+        return unboxed(state.temps[node.temp])
+    elif nodeClass == Share:
+        value = unboxedValue(node.expression, state)
+        # Other expressions may use the kept value, so it must be boxed
+        state.temps[node.temp] = boxed(value)
+        return value
+    elif nodeClass == Hoisted:
+        keptValue = state.temps.get(node.temp)
+        if keptValue is not None:
+            return unboxed(keptValue)
+        value = unboxedValue(node.expression, state)
+        state.temps[node.temp] = boxed(value)
+        return value
+    # Anything else, such as a constructor call, could have side effects
+    raise Deoptimization
+
+def unboxed(value):
+    """Returns the Python value inside the Integer or Boolean <value>;
+    raises Deoptimization if it is something else."""
+    valueClass = value.__class__
+    if valueClass is ZInteger or valueClass is ZBoolean:
+        return value.value
+    raise Deoptimization
+
+def boxed(value):
+    """Returns the Integer or Boolean for the Python int or bool <value>."""
+    if value.__class__ is bool:
+        return makeBoolean(value)
+    return makeInteger(value)
+
+def literalValue(token):
+    """Returns the value of a literal token of a built-in type."""
+    itemClass = builtInClasses[token.name]
+    tokenString = token.value
+    tokenString = removeFromFront(tokenString, itemClass.tokenStart)
+    tokenString = removeFromEnd(tokenString, itemClass.tokenEnd)
+    return itemClass(tokenString)
+
+def instantiate(itemClass, arguments, state):
+    """Returns a new instance of the built-in class <itemClass>, allocating
+    any variables it needs."""
+    try:
+        currEntity = itemClass(*arguments)
+    except ConstructorTypeError:
+        print("Wrong argument number or type(s) for %s():" \
+                  % getClassName(itemClass), end=' ')
+        argtypes = [ getClassName(arg) for arg in arguments ]
+        print(", ".join(argtypes))
+        raise ZRuntimeError
+    if type(currEntity) == tuple:
+        # Constructor returned a value and a memory operation
+        currEntity, memOp = currEntity
+        # At this point, the only "memory operation" is an
+        # integer number of variables to allocate for an array
+        address = state.createVariables(memOp)
+        currEntity.assignAddress(address)
+    return currEntity
+
+def subscript(currValue, index):
+    """Returns the lvalue of the item of <currValue> at <index>."""
+    try:
+        return currValue.z_subscript(index)
+    except AttributeError:
+        print("%s object is not subscriptable" % currValue.z_name)
+        raise ZRuntimeError
+    except TypeError:
+        print("Illegal subscript for %s: %s" % (currValue.z_name, index))
+        raise ZRuntimeError
+    except IndexError:
+        print("Subscript out of bounds:", index)
+        raise ZRuntimeError
+
+def section(currValue, start, stop):
+    """Returns the value of the section of <currValue> from <start> to
+    <stop>."""
+    try:
+        return currValue.z_section(start, stop)
+    except AttributeError:
+        print("%s object does not allow sections" % currValue.z_name)
+        raise ZRuntimeError
+    except TypeError:
+        print("Illegal section bounds for %s: %s and %s" \
+              % (currValue.z_name, start, stop))
         raise ZRuntimeError
 
 def applyBinaryOperator(operator, lhs, rhs):
+    function = binaryDispatch.get((lhs.__class__, rhs.__class__, operator))
+    if function is None:
+        if lhs.__class__ in valueClasses and rhs.__class__ in valueClasses \
+           and operator in binaryOpNames:
+            # The table covers every combination of values that works
+            print("Wrong operand types for %s: %s and %s" \
+                  % (operator, lhs.z_name, rhs.z_name))
+            raise ZRuntimeError
+        # A class used as a value, which the table doesn't cover
+        return searchBinaryOperator(operator, lhs, rhs)
+    try:
+        return function(lhs, rhs)
+    except ZeroDivisionError:
+        # Division or modulo by zero
+        print("Attempting to take %s %s 0" % (lhs, operator))
+        raise ZRuntimeError
+    except TypeError:
+        # A method that handles the classes but not these values, like
+        # ZNumber.z_mod() for some Fractions
+        print("Wrong operand types for %s: %s and %s" \
+              % (operator, lhs.z_name, rhs.z_name))
+        raise ZRuntimeError
+
+def searchBinaryOperator(operator, lhs, rhs):
+    """Applies <operator> by trying the lhs's method and then the rhs's
+    reverse method, as each one raises an error."""
     if operator not in binaryOpNames:
         print("Trying to apply unrecognized binary operator:", operator)
         raise ZRuntimeError
@@ -368,7 +546,7 @@ def applyBinaryOperator(operator, lhs, rhs):
                 ropFunction = getattr(rhs, ropName)
                 result = ropFunction(lhs)
                 if result.__class__ == bool:
-                    result = ZBoolean(result)
+                    result = makeBoolean(result)
             except (AttributeError, TypeError):
                 print("Wrong operand types for %s: %s and %s" \
                       % (operator, lhs.z_name, rhs.z_name))
@@ -379,6 +557,45 @@ def applyBinaryOperator(operator, lhs, rhs):
         raise ZRuntimeError
     return result
 
+def reverseOperator(method):
+    """Returns a function taking (lhs, rhs) that applies the reverse
+    operator <method> of the rhs's class."""
+    return lambda lhs, rhs: method(rhs, lhs)
+
+def booleanResult(function):
+    """Returns a function that applies <function> and turns a Python bool
+    result into a Boolean. Some z_equal() methods return Python's False
+    for operands of other classes (or Python bools for any operands), so
+    that searchBinaryOperator() falls back to the rhs's method."""
+    def apply(lhs, rhs):
+        result = function(lhs, rhs)
+        if result.__class__ == bool:
+            result = makeBoolean(result)
+        return result
+    return apply
+
+def buildBinaryDispatch():
+    """Returns a table mapping (lhs class, rhs class, operator) to the
+    function that applies the operator to operands of those classes, made
+    from the operands that the methods of each class of values handle (see
+    binaryOperands in BuiltInClasses.py). Combinations that are left out
+    are errors."""
+    dispatch = {}
+    for lhsClass in valueClasses:
+        for rhsClass in valueClasses:
+            for operator, opName in binaryOpNames.items():
+                ropName = reverseOpName(opName)
+                if rhsClass in lhsClass.binaryOperands.get(opName, ()):
+                    function = getattr(lhsClass, opName)
+                elif lhsClass in rhsClass.binaryOperands.get(ropName, ()):
+                    function = reverseOperator(getattr(rhsClass, ropName))
+                else:
+                    continue
+                if opName == "z_equal":
+                    function = booleanResult(function)
+                dispatch[lhsClass, rhsClass, operator] = function
+    return dispatch
+
 def applyUnaryOperator(operator, value):
     if operator not in unaryOpNames:
         print("Trying to apply unrecognized unary operator:", operator)
@@ -403,5 +620,4 @@ def reverseOpName(opName):
         opNameBase = opName.strip("z_")
         return "z_r" + opNameBase
 
-
-
+binaryDispatch = buildBinaryDispatch()
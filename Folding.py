@@ -0,0 +1,70 @@
+
+from AST import TreeNode, Const
+from BuiltInClasses import ZInteger
+from Execution import builtInClasses, literalValue, applyBinaryOperator, \
+                      applyUnaryOperator
+import contextlib
+import io
+
+# Literal resolution and constant folding, run once on the parse tree after
+# parsing. Every literal token becomes a Const node holding its value, so
+# the engines don't convert the token text each time they evaluate it. An
+# Expression whose operands are all Consts is replaced by a Const holding
+# its result, as long as the operator works on those operands; anything that
+# would fail (and print an error) is left alone, so that the error happens
+# at run time exactly as before.
+
+# Folding "mod" takes as many steps as the quotient, so skip it when that
+# would be slow
+MAX_FOLDED_QUOTIENT = 1000
+
+def foldConstants(node):
+    """Resolves literals and folds constant expressions in the tree rooted
+    at <node>. Returns the (possibly new) root."""
+    if node.__class__ != TreeNode:
+        if node.name in builtInClasses:
+            try:
+                return Const(literalValue(node))
+            except Exception:
+                # An invalid literal; leave the error to run time
+                return node
+        return node
+    node.children = [ foldConstants(child) for child in node.children ]
+    if node.name == "Expression":
+        return foldExpression(node)
+    return node
+
+def foldExpression(node):
+    children = node.children
+    if len(children) == 1:
+        if children[0].__class__ == Const:
+            return children[0]
+    elif len(children) == 2:
+        operand = children[1]
+        if operand.__class__ == Const:
+            return quietlyFold(applyUnaryOperator, children[0].value,
+                               operand.value) or node
+    elif len(children) == 3:
+        lhs = children[0]
+        rhs = children[2]
+        if lhs.__class__ == Const and rhs.__class__ == Const:
+            operator = children[1].value
+            if operator == "mod" and not cheapMod(lhs.value, rhs.value):
+                return node
+            return quietlyFold(applyBinaryOperator, operator, lhs.value,
+                               rhs.value) or node
+    return node
+
+def cheapMod(lhs, rhs):
+    if lhs.__class__ == rhs.__class__ == ZInteger:
+        return abs(lhs.value) <= MAX_FOLDED_QUOTIENT * max(abs(rhs.value), 1)
+    return False
+
+def quietlyFold(function, *args):
+    """Returns a Const holding function(*args), or None if that fails. Any
+    error message the function prints is thrown away."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return Const(function(*args))
+        except Exception:
+            return None
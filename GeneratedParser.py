@@ -0,0 +1,491 @@
+# Recursive-descent parser generated by ParserGenerator.py from BNF.txt.
+# Do not edit; run "python ParserGenerator.py" to regenerate it.
+
+from AST import TreeNode, TempNode
+from Errors import ParseError
+from TableParser import reportParseError
+
+PARSER_HASH = '106aaf502f337f7426300f8228c49f78a8c14fde6a371caca07bad0654425da9'
+
+def parse(scanner, grammar = None):
+    holder = TempNode()
+    try:
+        parse_Program(scanner, holder)
+    except ParseError as e:
+        reportParseError(e)
+        raise
+    return holder.children[0]
+
+def parse_Program(scanner, parent):
+    node = TreeNode('Program')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType in {'eof', 'eol'} or tokenValue in {';', 'for', 'if', 'inc', 'input', 'print', 'set', 'while'}:
+        parse_Block(scanner, node)
+    else:
+        raise ParseError("failed while parsing Program at %s" % token, token)
+
+def parse_Block(scanner, parent):
+    node = TreeNode('Block')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType in {'eof', 'eol'} or tokenValue in {';', 'else', 'end', 'for', 'if', 'inc', 'input', 'next', 'print', 'repeat', 'set', 'while'}:
+        parse_Statements(scanner, node)
+    else:
+        raise ParseError("failed while parsing Block at %s" % token, token)
+
+def parse_Statements(scanner, parent):
+    node = parent
+    while True:
+        token = scanner.lookAhead()
+        tokenType = token.typeName
+        tokenValue = token.value
+        if tokenType == 'eol' or tokenValue in {';', 'for', 'if', 'inc', 'input', 'print', 'set', 'while'}:
+            parse_Statement(scanner, node)
+            parse_StatementEnd(scanner, node)
+            continue
+        elif tokenType == 'eof' or tokenValue in {'else', 'end', 'next', 'repeat'}:
+            return
+        else:
+            raise ParseError("failed while parsing Statements at %s" % token, token)
+
+def parse_Statement(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue in {'inc', 'input', 'print', 'set'}:
+        parse_LineStatement(scanner, node)
+    elif tokenValue in {'for', 'if', 'while'}:
+        parse_BlockStatement(scanner, node)
+    elif tokenType == 'eol' or tokenValue == ';':
+        pass
+    else:
+        raise ParseError("failed while parsing Statement at %s" % token, token)
+
+def parse_LineStatement(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'print':
+        parse_PrintStatement(scanner, node)
+    elif tokenValue == 'set':
+        parse_SetStatement(scanner, node)
+    elif tokenValue == 'inc':
+        parse_IncStatement(scanner, node)
+    elif tokenValue == 'input':
+        parse_InputStatement(scanner, node)
+    else:
+        raise ParseError("failed while parsing LineStatement at %s" % token, token)
+
+def parse_BlockStatement(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'while':
+        parse_WhileStatement(scanner, node)
+    elif tokenValue == 'for':
+        parse_ForStatement(scanner, node)
+    elif tokenValue == 'if':
+        parse_IfStatement(scanner, node)
+    else:
+        raise ParseError("failed while parsing BlockStatement at %s" % token, token)
+
+def parse_PrintStatement(scanner, parent):
+    node = TreeNode('PrintStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'print':
+        scanner.match(value = 'print')
+        parse_ExprList(scanner, node)
+        parse_SuppressNewline(scanner, node)
+    else:
+        raise ParseError("failed while parsing PrintStatement at %s" % token, token)
+
+def parse_SuppressNewline(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == '...':
+        node.children.append(scanner.match(value = '...'))
+    elif tokenType == 'eol' or tokenValue == ';':
+        pass
+    else:
+        raise ParseError("failed while parsing SuppressNewline at %s" % token, token)
+
+def parse_SetStatement(scanner, parent):
+    node = TreeNode('SetStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'set':
+        scanner.match(value = 'set')
+        parse_NameThing(scanner, node)
+        scanner.match(value = 'to')
+        parse_Expression(scanner, node)
+    else:
+        raise ParseError("failed while parsing SetStatement at %s" % token, token)
+
+def parse_IncStatement(scanner, parent):
+    node = TreeNode('IncStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'inc':
+        scanner.match(value = 'inc')
+        parse_NameThing(scanner, node)
+    else:
+        raise ParseError("failed while parsing IncStatement at %s" % token, token)
+
+def parse_InputStatement(scanner, parent):
+    node = TreeNode('InputStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'input':
+        scanner.match(value = 'input')
+        parse_NameThing(scanner, node)
+        parse_AsPart(scanner, node)
+    else:
+        raise ParseError("failed while parsing InputStatement at %s" % token, token)
+
+def parse_AsPart(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'as':
+        scanner.match(value = 'as')
+        parse_NameThing(scanner, node)
+    elif tokenType == 'eol' or tokenValue == ';':
+        pass
+    else:
+        raise ParseError("failed while parsing AsPart at %s" % token, token)
+
+def parse_WhileStatement(scanner, parent):
+    node = TreeNode('WhileStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'while':
+        scanner.match(value = 'while')
+        parse_Expression(scanner, node)
+        parse_HeaderEnd(scanner, node)
+        parse_Block(scanner, node)
+        scanner.match(value = 'repeat')
+    else:
+        raise ParseError("failed while parsing WhileStatement at %s" % token, token)
+
+def parse_ForStatement(scanner, parent):
+    node = TreeNode('ForStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'for':
+        scanner.match(value = 'for')
+        parse_NameThing(scanner, node)
+        scanner.match(value = 'from')
+        parse_Expression(scanner, node)
+        scanner.match(value = 'to')
+        parse_Expression(scanner, node)
+        parse_HeaderEnd(scanner, node)
+        parse_Block(scanner, node)
+        scanner.match(value = 'next')
+    else:
+        raise ParseError("failed while parsing ForStatement at %s" % token, token)
+
+def parse_IfStatement(scanner, parent):
+    node = TreeNode('IfStatement')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'if':
+        scanner.match(value = 'if')
+        parse_Expression(scanner, node)
+        parse_HeaderEnd(scanner, node)
+        parse_Block(scanner, node)
+        parse_ElseBlocks(scanner, node)
+        scanner.match(value = 'end')
+        scanner.match(value = 'if')
+    else:
+        raise ParseError("failed while parsing IfStatement at %s" % token, token)
+
+def parse_ElseBlocks(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'else':
+        scanner.match(value = 'else')
+        parse_ElseIfsOrBlock(scanner, node)
+    elif tokenValue == 'end':
+        pass
+    else:
+        raise ParseError("failed while parsing ElseBlocks at %s" % token, token)
+
+def parse_ElseIfsOrBlock(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == 'if':
+        scanner.match(value = 'if')
+        parse_Expression(scanner, node)
+        parse_HeaderEnd(scanner, node)
+        parse_Block(scanner, node)
+        parse_ElseBlocks(scanner, node)
+    elif tokenType == 'eol' or tokenValue == ':':
+        parse_HeaderEnd(scanner, node)
+        parse_Block(scanner, node)
+    else:
+        raise ParseError("failed while parsing ElseIfsOrBlock at %s" % token, token)
+
+def parse_Expression(scanner, parent):
+    node = TreeNode('Expression')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType in {'boolean', 'character', 'integer', 'name', 'string'} or tokenValue in {'(', 'random'}:
+        parse_Atom(scanner, node)
+        parse_BinaryRest(scanner, node)
+    elif tokenValue in {'-', '/', 'not'}:
+        parse_UnaryOperator(scanner, node)
+        parse_Atom(scanner, node)
+    else:
+        raise ParseError("failed while parsing Expression at %s" % token, token)
+
+def parse_BinaryRest(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue in {'*', '+', '-', '/', '<', '<=', '=', '>', '>=', '\\=', 'and', 'mod', 'or', '|', '||'}:
+        parse_BinaryOperator(scanner, node)
+        parse_Atom(scanner, node)
+    elif tokenType == 'eol' or tokenValue in {')', ',', '...', ':', ';', ']', 'to'}:
+        pass
+    else:
+        raise ParseError("failed while parsing BinaryRest at %s" % token, token)
+
+def parse_BinaryOperator(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == '+':
+        node.children.append(scanner.match(value = '+'))
+    elif tokenValue == '-':
+        node.children.append(scanner.match(value = '-'))
+    elif tokenValue == '*':
+        node.children.append(scanner.match(value = '*'))
+    elif tokenValue == '/':
+        node.children.append(scanner.match(value = '/'))
+    elif tokenValue == 'mod':
+        node.children.append(scanner.match(value = 'mod'))
+    elif tokenValue == '<':
+        node.children.append(scanner.match(value = '<'))
+    elif tokenValue == '>':
+        node.children.append(scanner.match(value = '>'))
+    elif tokenValue == '=':
+        node.children.append(scanner.match(value = '='))
+    elif tokenValue == '<=':
+        node.children.append(scanner.match(value = '<='))
+    elif tokenValue == '>=':
+        node.children.append(scanner.match(value = '>='))
+    elif tokenValue == '\\=':
+        node.children.append(scanner.match(value = '\\='))
+    elif tokenValue == '|':
+        node.children.append(scanner.match(value = '|'))
+    elif tokenValue == '||':
+        node.children.append(scanner.match(value = '||'))
+    elif tokenValue == 'and':
+        node.children.append(scanner.match(value = 'and'))
+    elif tokenValue == 'or':
+        node.children.append(scanner.match(value = 'or'))
+    else:
+        raise ParseError("failed while parsing BinaryOperator at %s" % token, token)
+
+def parse_UnaryOperator(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == '-':
+        node.children.append(scanner.match(value = '-'))
+    elif tokenValue == '/':
+        node.children.append(scanner.match(value = '/'))
+    elif tokenValue == 'not':
+        node.children.append(scanner.match(value = 'not'))
+    else:
+        raise ParseError("failed while parsing UnaryOperator at %s" % token, token)
+
+def parse_Atom(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType in {'boolean', 'character', 'integer', 'string'}:
+        parse_Literal(scanner, node)
+    elif tokenType == 'name':
+        parse_NameThing(scanner, node)
+    elif tokenValue == 'random':
+        node.children.append(scanner.match(value = 'random'))
+    elif tokenValue == '(':
+        scanner.match(value = '(')
+        parse_Expression(scanner, node)
+        scanner.match(value = ')')
+    else:
+        raise ParseError("failed while parsing Atom at %s" % token, token)
+
+def parse_NameThing(scanner, parent):
+    node = TreeNode('NameThing')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType == 'name':
+        node.children.append(scanner.match(type = 'name'))
+        parse_NameThingMore(scanner, node)
+    else:
+        raise ParseError("failed while parsing NameThing at %s" % token, token)
+
+def parse_NameThingMore(scanner, parent):
+    node = parent
+    while True:
+        token = scanner.lookAhead()
+        tokenType = token.typeName
+        tokenValue = token.value
+        if tokenValue == '(':
+            parse_Parentheses(scanner, node)
+            continue
+        elif tokenValue == '[':
+            parse_SquareBraces(scanner, node)
+            continue
+        elif tokenType == 'eol' or tokenValue in {')', '*', '+', ',', '-', '...', '/', ':', ';', '<', '<=', '=', '>', '>=', '\\=', ']', 'and', 'as', 'from', 'mod', 'or', 'to', '|', '||'}:
+            return
+        else:
+            raise ParseError("failed while parsing NameThingMore at %s" % token, token)
+
+def parse_Parentheses(scanner, parent):
+    node = TreeNode('Parentheses')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == '(':
+        scanner.match(value = '(')
+        parse_ExprList(scanner, node)
+        scanner.match(value = ')')
+    else:
+        raise ParseError("failed while parsing Parentheses at %s" % token, token)
+
+def parse_SquareBraces(scanner, parent):
+    node = TreeNode('SquareBraces')
+    parent.children.append(node)
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == '[':
+        scanner.match(value = '[')
+        parse_Expression(scanner, node)
+        parse_OptSlice(scanner, node)
+        scanner.match(value = ']')
+    else:
+        raise ParseError("failed while parsing SquareBraces at %s" % token, token)
+
+def parse_OptSlice(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenValue == '...':
+        scanner.match(value = '...')
+        parse_Expression(scanner, node)
+    elif tokenValue == ']':
+        pass
+    else:
+        raise ParseError("failed while parsing OptSlice at %s" % token, token)
+
+def parse_ExprList(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType in {'boolean', 'character', 'integer', 'name', 'string'} or tokenValue in {'(', '-', '/', 'not', 'random'}:
+        parse_Expression(scanner, node)
+        parse_ExprListMore(scanner, node)
+    elif tokenType == 'eol' or tokenValue in {')', '...', ';'}:
+        pass
+    else:
+        raise ParseError("failed while parsing ExprList at %s" % token, token)
+
+def parse_ExprListMore(scanner, parent):
+    node = parent
+    while True:
+        token = scanner.lookAhead()
+        tokenType = token.typeName
+        tokenValue = token.value
+        if tokenValue == ',':
+            scanner.match(value = ',')
+            parse_Expression(scanner, node)
+            continue
+        elif tokenType == 'eol' or tokenValue in {')', '...', ';'}:
+            return
+        else:
+            raise ParseError("failed while parsing ExprListMore at %s" % token, token)
+
+def parse_Literal(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType == 'integer':
+        node.children.append(scanner.match(type = 'integer'))
+    elif tokenType == 'boolean':
+        node.children.append(scanner.match(type = 'boolean'))
+    elif tokenType == 'character':
+        node.children.append(scanner.match(type = 'character'))
+    elif tokenType == 'string':
+        node.children.append(scanner.match(type = 'string'))
+    else:
+        raise ParseError("failed while parsing Literal at %s" % token, token)
+
+def parse_StatementEnd(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType == 'eol':
+        scanner.match(type = 'eol')
+    elif tokenValue == ';':
+        scanner.match(value = ';')
+    else:
+        raise ParseError("failed while parsing StatementEnd at %s" % token, token)
+
+def parse_HeaderEnd(scanner, parent):
+    node = parent
+    token = scanner.lookAhead()
+    tokenType = token.typeName
+    tokenValue = token.value
+    if tokenType == 'eol':
+        scanner.match(type = 'eol')
+    elif tokenValue == ':':
+        scanner.match(value = ':')
+    else:
+        raise ParseError("failed while parsing HeaderEnd at %s" % token, token)
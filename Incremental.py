@@ -0,0 +1,254 @@
+
+import BNF
+from AST import TreeNode
+from Scanner import CompactScanner
+from Tokens import TokenBuffer
+from Errors import ParseError
+
+# Incremental re-lexing and re-parsing for editors. An IncrementalProgram
+# keeps its tokens in a TokenBuffer and remembers, for every Block in the
+# parse tree, which tokens each of its statements came from. After an edit,
+# only the tokens near the edit are relexed, and only the statements of the
+# innermost Block that contains the changed tokens are reparsed. Token
+# offsets and statement positions after the edit are still shifted, but that
+# is a pass over plain integers; the lexing and parsing work is proportional
+# to the size of the edit.
+
+blockNonterm = BNF.Nonterminal("Block")
+statementsNonterm = BNF.Nonterminal("Statements")
+statementNonterm = BNF.Nonterminal("Statement")
+statementEndNonterm = BNF.Nonterminal("StatementEnd")
+
+class BufferScanner(CompactScanner):
+    """CompactScanner over an existing TokenBuffer, starting at <index>.
+    Tokens handed to the parser do not keep a reference to the buffer,
+    since their indices go stale as soon as the buffer is edited."""
+    def __init__(self, tokens, index = 0):
+        self.tokens = tokens
+        self.index = index
+        self.current = self.tokens.token(index)
+
+    def match(self, type = None, value = None):
+        token = super().match(type, value)
+        token.buffer = None
+        token.index = None
+        return token
+
+class BlockRecord:
+    """Token positions of the statements of one Block node."""
+    def __init__(self, node, start):
+        self.node = node
+        # Index of the first token of the block, and of the first token
+        # after its last statement
+        self.start = start
+        self.end = start
+        self.statements = []
+
+    def shift(self, threshold, shift):
+        """Shifts all positions at or past <threshold> by <shift>."""
+        if self.start >= threshold:
+            self.start += shift
+        if self.end >= threshold:
+            self.end += shift
+        for statement in self.statements:
+            statement.shift(threshold, shift)
+
+class StatementRecord:
+    """Token positions of one statement (including its StatementEnd), the
+    number of children it added to its Block, and the records of the Blocks
+    nested inside it."""
+    def __init__(self, start, end, childCount, blocks):
+        self.start = start
+        self.end = end
+        self.childCount = childCount
+        self.blocks = blocks
+
+    def shift(self, threshold, shift):
+        if self.start >= threshold:
+            self.start += shift
+        if self.end >= threshold:
+            self.end += shift
+        for block in self.blocks:
+            block.shift(threshold, shift)
+
+def parseRecorded(nonterm, scanner, grammar, node, blocks):
+    """Works like TableParser.parseNonterm, adding the children of <nonterm>
+    to <node>, but parses Blocks with parseBlock() so that their statement
+    positions are recorded in <blocks>."""
+    if nonterm == blockNonterm:
+        blockNode, record = parseBlock(scanner, grammar)
+        node.addChild(blockNode)
+        blocks.append(record)
+        return
+    if grammar.nontermPermanent(nonterm):
+        childNode = TreeNode(str(nonterm))
+        node.addChild(childNode)
+        node = childNode
+    la = scanner.lookAhead()
+    prod = grammar.findProduction(nonterm, la)
+    for symbol in prod.rhsList:
+        if symbol.__class__ == BNF.Nonterminal:
+            parseRecorded(symbol, scanner, grammar, node, blocks)
+        elif symbol.__class__ == BNF.Terminal:
+            token = scanner.match(type = symbol.value)
+            if symbol.permanent:
+                node.addChild(token)
+        elif symbol.__class__ == BNF.Literal:
+            token = scanner.match(value = symbol.value)
+            if symbol.permanent:
+                node.addChild(token)
+
+def parseStatement(scanner, grammar):
+    """Parses one Statement and its StatementEnd if the lookahead starts
+    one. Returns (children, record), or None at the end of a block."""
+    la = scanner.lookAhead()
+    prod = grammar.findProduction(statementsNonterm, la)
+    if prod.rhsList == [ None ]:
+        # Statements ::= "" ends the block
+        return None
+    start = scanner.index
+    holder = TreeNode("(statement)")
+    blocks = []
+    parseRecorded(statementNonterm, scanner, grammar, holder, blocks)
+    parseRecorded(statementEndNonterm, scanner, grammar, holder, blocks)
+    record = StatementRecord(start, scanner.index, len(holder.children),
+                             blocks)
+    return holder.children, record
+
+def parseBlock(scanner, grammar):
+    """Parses a Block, returning its node and its BlockRecord."""
+    node = TreeNode(str(blockNonterm))
+    record = BlockRecord(node, scanner.index)
+    while True:
+        result = parseStatement(scanner, grammar)
+        if result is None:
+            break
+        children, statement = result
+        node.children.extend(children)
+        record.statements.append(statement)
+    record.end = scanner.index
+    return node, record
+
+class IncrementalProgram:
+    """A parsed Zephyr program that can be updated by text edits."""
+    def __init__(self, code, grammar):
+        self.grammar = grammar
+        self.tokens = TokenBuffer(code)
+        self.fullParse()
+
+    @property
+    def code(self):
+        return self.tokens.source
+
+    def fullParse(self):
+        """Parses the whole program from scratch."""
+        self.tree = None
+        self.blocks = None
+        scanner = BufferScanner(self.tokens)
+        holder = TreeNode("(program)")
+        blocks = []
+        parseRecorded(self.grammar.startSymbol, scanner, self.grammar,
+                      holder, blocks)
+        # The start symbol is permanent, so its node is the only child
+        self.tree = holder.children[0]
+        self.blocks = blocks
+        return self.tree
+
+    def edit(self, start, end, newText):
+        """Replaces code[start:end] with <newText>, then relexes and reparses
+        only what the edit affects. Returns the updated parse tree. Raises
+        ParseError if the edited program no longer parses; the next edit
+        will then reparse it from scratch."""
+        first, oldStop, newStop = self.tokens.edit(start, end, newText)
+        if self.tree is None:
+            return self.fullParse()
+        if first == oldStop == newStop:
+            # Only trivia changed
+            return self.tree
+        path = self.enclosingBlocks(first, oldStop)
+        shift = newStop - oldStop
+        for record in reversed(path):
+            if self.reparseBlock(record, first, oldStop, newStop, shift):
+                return self.tree
+        return self.fullParse()
+
+    def enclosingBlocks(self, first, oldStop):
+        """Returns the BlockRecords that contain the old tokens
+        [first, oldStop), from the outermost to the innermost."""
+        path = []
+        blocks = self.blocks
+        while blocks:
+            for record in blocks:
+                if record.start <= first and oldStop <= record.end:
+                    path.append(record)
+                    break
+            else:
+                break
+            blocks = []
+            for statement in record.statements:
+                if statement.start <= first and oldStop <= statement.end:
+                    blocks = statement.blocks
+                    break
+        return path
+
+    def reparseBlock(self, record, first, oldStop, newStop, shift):
+        """Reparses the statements of <record> that overlap the edit, until
+        the new statements line up with the old ones again. Returns False,
+        leaving the tree untouched, if that doesn't happen inside the
+        block."""
+        statements = record.statements
+        # The first statement that ends after the last unchanged token
+        index = 0
+        while index < len(statements) and statements[index].end <= first:
+            index += 1
+        if index < len(statements):
+            startToken = statements[index].start
+        else:
+            startToken = record.end
+        scanner = BufferScanner(self.tokens, startToken)
+        newChildren = []
+        newStatements = []
+        # Statements from syncIndex on start past the edit and can be kept
+        syncIndex = index
+        while syncIndex < len(statements) \
+                and statements[syncIndex].start < oldStop:
+            syncIndex += 1
+        try:
+            while True:
+                if scanner.index >= newStop:
+                    while syncIndex < len(statements) and \
+                            statements[syncIndex].start + shift \
+                                                        < scanner.index:
+                        syncIndex += 1
+                    if syncIndex < len(statements) and \
+                            statements[syncIndex].start + shift \
+                                                        == scanner.index:
+                        # Back in step with the old statements
+                        break
+                result = parseStatement(scanner, self.grammar)
+                if result is None:
+                    if syncIndex == len(statements) \
+                            and record.end >= oldStop \
+                            and record.end + shift == scanner.index:
+                        # Reached the old end of the block
+                        break
+                    else:
+                        return False
+                children, statement = result
+                newChildren.extend(children)
+                newStatements.append(statement)
+        except ParseError:
+            return False
+        # Commit: shift everything after the edit, then splice in the new
+        # statements and their nodes
+        childStart = sum(statement.childCount
+                         for statement in statements[:index])
+        childStop = childStart + sum(statement.childCount
+                                     for statement
+                                     in statements[index:syncIndex])
+        for block in self.blocks:
+            block.shift(oldStop, shift)
+        statements[index:syncIndex] = newStatements
+        record.node.children[childStart:childStop] = newChildren
+        return True
+
@@ -0,0 +1,161 @@
+
+from AST import *
+from Execution import builtInClasses, literalValue
+from Resolution import resolveNames
+
+# Lowering from the parse tree to the program representation that the
+# engines run. Each statement and expression becomes an instance of its own
+# class from AST.py (Print, Set, BinOp, Name, ...), with its operands in
+# named fields; Expression wrappers, the "..." of print statements and
+# other punctuation are dropped, and the chain of steps in a NameThing
+# becomes nested Subscript, Section and Call nodes. Variable names are
+# resolved to slots as part of lowering, and literals become Consts.
+
+def lower(syntaxTree):
+    """Returns the lowered form of the parse tree <syntaxTree>. Constant
+    folding (Folding.py) should already have been done, if wanted."""
+    return lowerStatement(resolveNames(syntaxTree))
+
+def lowerStatement(node):
+    return statementLowerers[node.name](node)
+
+def lowerProgram(node):
+    return lowerStatement(node.children[0])
+
+def lowerBlock(node):
+    return Block(tuple(lowerStatement(child) for child in node.children))
+
+def lowerPrint(node):
+    items = []
+    newline = True
+    for child in node.children:
+        if child.name == "Symbol" and child.value == "...":
+            newline = False
+            break
+        items.append(lowerExpression(child))
+    return Print(tuple(items), newline)
+
+def lowerSet(node):
+    return Set(lowerExpression(node.children[0]),
+               lowerExpression(node.children[1]))
+
+def lowerInc(node):
+    return Inc(lowerExpression(node.children[0]))
+
+def lowerInput(node):
+    if len(node.children) > 1:
+        inputType = lowerExpression(node.children[1])
+    else:
+        inputType = None
+    return Input(lowerExpression(node.children[0]), inputType)
+
+def lowerWhile(node):
+    return While(lowerExpression(node.children[0]),
+                 lowerStatement(node.children[1]))
+
+def lowerFor(node):
+    var = lowerExpression(node.children[0])
+    body = lowerStatement(node.children[-1])
+    countable = var.__class__ == Name and not assignsTo(body, var.name)
+    return For(var, lowerExpression(node.children[1]),
+               lowerExpression(node.children[2]), body, countable)
+
+def lowerIf(node):
+    children = node.children
+    branches = []
+    orelse = None
+    index = 0
+    while index < len(children):
+        if index == len(children) - 1:
+            # The last child is the block of an else branch
+            orelse = lowerStatement(children[index])
+            break
+        branches.append((lowerExpression(children[index]),
+                         lowerStatement(children[index+1])))
+        index += 2
+    return If(tuple(branches), orelse)
+
+statementLowerers = {
+    "Program": lowerProgram,
+    "Block": lowerBlock,
+    "PrintStatement": lowerPrint,
+    "SetStatement": lowerSet,
+    "IncStatement": lowerInc,
+    "InputStatement": lowerInput,
+    "WhileStatement": lowerWhile,
+    "ForStatement": lowerFor,
+    "IfStatement": lowerIf
+    }
+
+def lowerExpression(node):
+    if node.name == "Expression":
+        children = node.children
+        if len(children) == 1:
+            return lowerExpression(children[0])
+        elif len(children) == 2:
+            return UnaryOp(children[0].value, lowerExpression(children[1]))
+        else:
+            return BinOp(children[1].value, lowerExpression(children[0]),
+                         lowerExpression(children[2]))
+    elif node.name == "NameThing":
+        return lowerNameThing(node)
+    elif node.name == "Const":
+        return node
+    elif node.name == "Keyword" and node.value == "random":
+        return Random()
+    elif node.name in builtInClasses:
+        # A literal token that wasn't folded
+        try:
+            return Const(literalValue(node))
+        except Exception:
+            return Literal(node)
+    raise ValueError("cannot lower %s node" % node.name)
+
+def lowerNameThing(node):
+    base = node.children[0]
+    if base.value in builtInClasses:
+        # A class is its own value
+        current = Const(builtInClasses[base.value])
+    else:
+        current = Name(base.value, base.slot)
+    for child in node.children[1:]:
+        arguments = tuple(lowerExpression(grandchild)
+                          for grandchild in child.children)
+        if child.name == "Parentheses":
+            current = Call(current, arguments)
+        elif len(arguments) == 1:
+            current = Subscript(current, arguments[0])
+        else:
+            current = Section(current, arguments[0], arguments[1])
+    return current
+
+def assignsTo(node, name):
+    """Whether any statement in the lowered <node> might assign to or
+    increment the variable <name>."""
+    nodeClass = node.__class__
+    if nodeClass == Block:
+        for statement in node.statements:
+            if assignsTo(statement, name):
+                return True
+        return False
+    elif nodeClass == Set or nodeClass == Inc or nodeClass == Input:
+        return targetName(node.target) == name
+    elif nodeClass == For:
+        return targetName(node.var) == name or assignsTo(node.body, name)
+    elif nodeClass == While:
+        return assignsTo(node.body, name)
+    elif nodeClass == If:
+        for condition, body in node.branches:
+            if assignsTo(body, name):
+                return True
+        return node.orelse is not None and assignsTo(node.orelse, name)
+    return False
+
+def targetName(node):
+    """Returns the variable name at the root of the target <node>, or
+    None."""
+    while node.__class__ in (Subscript, Section, Call):
+        node = node.base
+    if node.__class__ == Name:
+        return node.name
+    return None
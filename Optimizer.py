@@ -0,0 +1,487 @@
+
+from AST import *
+from Typing import inferTypes
+import sys
+
+# Optimization passes over lowered programs (see Lowering.py). Both passes
+# work on pure expressions: operators applied to variables, constants and
+# other pure expressions. Such an expression has no side effects, and its
+# value depends only on the variables it reads, so it can be computed once
+# and its value used again for as long as none of those variables is
+# assigned to. (Values are never changed in place; assigning to an array
+# item changes the item's own variable, not the variable holding the array.)
+#
+# "licm" (loop-invariant code motion) finds pure expressions inside a loop
+# that read no variable the loop assigns to, and wraps them in Hoisted
+# nodes. A Hoisted expression is still evaluated at its first use after the
+# loop is entered, so an error in it, or the variable IDs it hands out,
+# happen exactly where they would have; later uses take the kept value.
+#
+# "cse" (common subexpression elimination) finds pure expressions that are
+# computed again while an earlier computation is certain to have happened
+# with the same variable values, and makes the later ones Reuse the value
+# that a Share node kept.
+#
+# "types" infers which operations work on Integers or Booleans (see
+# Typing.py). It only marks nodes, so it runs last.
+
+passNames = ("licm", "cse", "types")
+
+# The passes that each engine runs unless --optimize says otherwise: the
+# ones that make it faster on the programs of the "optimizer" benchmark
+# (see Benchmarks.py). Except in the Python translation, keeping a shared
+# value in a temp and fetching it again costs about as much as computing it
+# again; the Python translation doesn't use the types.
+defaultPasses = {
+    "tree": ("licm", "types"),
+    "closure": ("licm", "types"),
+    "vm": ("licm", "types"),
+    "python": ("licm", "cse")
+    }
+
+def optimize(program, passes = passNames):
+    """Runs the passes named in <passes> over the lowered <program> and
+    returns the optimized program."""
+    optimizer = Optimizer()
+    for name in passNames:
+        if name in passes:
+            program = getattr(optimizer, name)(program)
+    return program
+
+class Optimizer:
+    def __init__(self):
+        # Temps are numbered across all the passes
+        self.tempCount = 0
+
+    def newTemp(self):
+        self.tempCount += 1
+        return self.tempCount
+
+    def types(self, program):
+        return inferTypes(program)
+
+    # Loop-invariant code motion
+
+    def licm(self, program):
+        return self.hoistStatements(program, False)[0]
+
+    def hoistStatements(self, node, inLoop):
+        """Returns the list of statements that replaces the statement
+        <node>. <inLoop> says whether <node> is inside a loop."""
+        nodeClass = node.__class__
+        if nodeClass == Block:
+            statements = []
+            for statement in node.statements:
+                statements.extend(self.hoistStatements(statement, inLoop))
+            return [Block(tuple(statements))]
+        elif nodeClass == If:
+            branches = tuple((condition,
+                              self.hoistStatements(body, inLoop)[0])
+                             for condition, body in node.branches)
+            orelse = node.orelse
+            if orelse is not None:
+                orelse = self.hoistStatements(orelse, inLoop)[0]
+            return [If(branches, orelse)]
+        elif nodeClass != While and nodeClass != For:
+            return [node]
+        written = writes(node)
+        temps = {}
+        hoist = lambda expression: self.hoist(expression, written, temps)
+        if nodeClass == While:
+            loop = While(hoist(node.condition),
+                         mapExpressions(node.body, hoist))
+        else:
+            # The loop variable and the start are evaluated only once
+            loop = For(node.var, node.start, hoist(node.finish),
+                       mapExpressions(node.body, hoist), node.countable)
+        loop.body = self.hoistStatements(loop.body, True)[0]
+        if temps and inLoop:
+            # The loop can be entered more than once, and the variables may
+            # have changed in between
+            return [Reset(tuple(sorted(temps.values()))), loop]
+        return [loop]
+
+    def hoist(self, node, written, temps):
+        """Returns <node> with each largest pure subexpression that reads
+        none of the slots in <written> made Hoisted. Duplicates share a
+        temp, recorded in <temps>."""
+        if isPure(node) and not (reads(node) & written):
+            key = expressionKey(node)
+            if key not in temps:
+                temps[key] = self.newTemp()
+            return Hoisted(node, temps[key])
+        elif node.__class__ == Hoisted:
+            # Already hoisted out of an enclosing loop
+            return node
+        return mapChildren(node,
+                           lambda child: self.hoist(child, written, temps))
+
+    # Common subexpression elimination
+
+    def cse(self, program):
+        # Temps that some Reuse node refers to
+        self.reused = set()
+        program = self.shareStatement(program, {})
+        # Drop the Shares that nothing reuses
+        return mapExpressions(program, self.unshare)
+
+    def shareStatement(self, node, available):
+        """Returns the statement <node> with common subexpressions shared.
+        <available> maps the key of each pure expression whose value is
+        known at this point to its temp and the slots it reads; it is
+        updated to what is known after the statement."""
+        nodeClass = node.__class__
+        if nodeClass == Block:
+            return Block(tuple(self.shareStatement(statement, available)
+                               for statement in node.statements))
+        elif nodeClass == Print:
+            return Print(tuple(self.share(item, available)
+                               for item in node.items),
+                         node.newline)
+        elif nodeClass == Set:
+            # The target is evaluated first, then the value, and then the
+            # variable is assigned
+            target = self.share(node.target, available)
+            node = Set(target, self.share(node.value, available))
+            kill(available, targetSlots(target))
+            return node
+        elif nodeClass == Inc:
+            node = Inc(self.share(node.target, available))
+            kill(available, targetSlots(node.target))
+            return node
+        elif nodeClass == Input:
+            target = self.share(node.target, available)
+            inputType = node.inputType
+            if inputType is not None:
+                inputType = self.share(inputType, available)
+            kill(available, targetSlots(target))
+            return Input(target, inputType)
+        elif nodeClass == While:
+            # The condition is evaluated again after each run of the body
+            kill(available, writes(node.body))
+            condition = self.share(node.condition, available)
+            body = self.shareStatement(node.body, dict(available))
+            # The loop ends right after the condition is evaluated
+            return While(condition, body)
+        elif nodeClass == For:
+            # The loop variable is evaluated again on each increment and
+            # test, so it is left alone
+            start = self.share(node.start, available)
+            kill(available, writes(node))
+            finish = self.share(node.finish, available)
+            body = self.shareStatement(node.body, dict(available))
+            return For(node.var, start, finish, body, node.countable)
+        elif nodeClass == If:
+            # Only the first condition is certain to be evaluated
+            branches = []
+            afterFirst = None
+            for condition, body in node.branches:
+                condition = self.share(condition, available)
+                if afterFirst is None:
+                    afterFirst = dict(available)
+                branches.append((condition,
+                                 self.shareStatement(body, dict(available))))
+            orelse = node.orelse
+            if orelse is not None:
+                orelse = self.shareStatement(orelse, dict(available))
+            available.clear()
+            available.update(afterFirst)
+            kill(available, writes(node))
+            return If(tuple(branches), orelse)
+        return node
+
+    def share(self, node, available):
+        """Returns the expression <node> with common subexpressions shared,
+        in the order they are evaluated, and updates <available>."""
+        if not isPure(node):
+            if node.__class__ == Hoisted:
+                # Evaluated only once per loop, so nothing inside it can be
+                # counted on
+                return node
+            return mapChildren(node,
+                               lambda child: self.share(child, available))
+        key = expressionKey(node)
+        if key in available:
+            temp = available[key][0]
+            self.reused.add(temp)
+            return Reuse(temp)
+        nodeReads = reads(node)
+        node = mapChildren(node, lambda child: self.share(child, available))
+        temp = self.newTemp()
+        available[key] = (temp, nodeReads)
+        return Share(node, temp)
+
+    def unshare(self, node):
+        if node.__class__ == Share and node.temp not in self.reused:
+            return self.unshare(node.expression)
+        return mapChildren(node, self.unshare)
+
+def isPure(node):
+    """Whether <node> is an operator applied to variables, constants and
+    other pure expressions."""
+    nodeClass = node.__class__
+    if nodeClass == BinOp:
+        return isPureOperand(node.lhs) and isPureOperand(node.rhs)
+    elif nodeClass == UnaryOp:
+        return isPureOperand(node.operand)
+    return False
+
+def isPureOperand(node):
+    return node.__class__ == Name or node.__class__ == Const or isPure(node)
+
+def expressionKey(node):
+    """Returns a hashable key that is the same for equal pure expressions."""
+    nodeClass = node.__class__
+    if nodeClass == Name:
+        return node.slot
+    elif nodeClass == Const:
+        return (node.value.__class__, repr(node.value))
+    elif nodeClass == BinOp:
+        return (node.operator, expressionKey(node.lhs),
+                expressionKey(node.rhs))
+    elif nodeClass == UnaryOp:
+        return (node.operator, expressionKey(node.operand))
+    elif nodeClass == Share or nodeClass == Hoisted:
+        return expressionKey(node.expression)
+
+def reads(node):
+    """Returns the set of slots of the variables that the expression <node>
+    reads."""
+    slots = set()
+    def visit(node):
+        if node.__class__ == Name:
+            slots.add(node.slot)
+        else:
+            mapChildren(node, visit)
+        return node
+    visit(node)
+    return slots
+
+def targetSlots(node):
+    """Returns the set of slots that assigning to the target <node> can
+    change: its slot if it is a plain variable, and none otherwise."""
+    if node.__class__ == Name:
+        return {node.slot}
+    return set()
+
+def writes(node):
+    """Returns the set of slots of the variables that the statement <node>
+    might assign to or increment."""
+    nodeClass = node.__class__
+    if nodeClass == Block:
+        slots = set()
+        for statement in node.statements:
+            slots |= writes(statement)
+        return slots
+    elif nodeClass == Set or nodeClass == Inc or nodeClass == Input:
+        return targetSlots(node.target)
+    elif nodeClass == For:
+        return targetSlots(node.var) | writes(node.body)
+    elif nodeClass == While:
+        return writes(node.body)
+    elif nodeClass == If:
+        slots = set()
+        for condition, body in node.branches:
+            slots |= writes(body)
+        if node.orelse is not None:
+            slots |= writes(node.orelse)
+        return slots
+    return set()
+
+def kill(available, slots):
+    """Removes from <available> the expressions that read any of <slots>."""
+    if slots:
+        for key in [ key for key, (temp, keyReads) in available.items()
+                     if keyReads & slots ]:
+            del available[key]
+
+def mapChildren(node, function):
+    """Returns the expression <node> with <function> applied to each of its
+    operands."""
+    nodeClass = node.__class__
+    if nodeClass == BinOp:
+        return BinOp(node.operator, function(node.lhs), function(node.rhs),
+                     node.operandType)
+    elif nodeClass == UnaryOp:
+        return UnaryOp(node.operator, function(node.operand),
+                       node.operandType)
+    elif nodeClass == Subscript:
+        return Subscript(function(node.base), function(node.index))
+    elif nodeClass == Section:
+        return Section(function(node.base), function(node.start),
+                       function(node.stop))
+    elif nodeClass == Call:
+        return Call(function(node.base),
+                    tuple(function(argument) for argument in node.arguments))
+    elif nodeClass == Share:
+        return Share(function(node.expression), node.temp)
+    elif nodeClass == Hoisted:
+        return Hoisted(function(node.expression), node.temp)
+    return node
+
+def mapExpressions(node, function):
+    """Returns the statement <node> with <function> applied to each of the
+    expressions in it, including those of nested statements."""
+    nodeClass = node.__class__
+    if nodeClass == Block:
+        return Block(tuple(mapExpressions(statement, function)
+                           for statement in node.statements))
+    elif nodeClass == Print:
+        return Print(tuple(function(item) for item in node.items),
+                     node.newline)
+    elif nodeClass == Set:
+        return Set(function(node.target), function(node.value))
+    elif nodeClass == Inc:
+        return Inc(function(node.target), node.targetType)
+    elif nodeClass == Input:
+        inputType = node.inputType
+        if inputType is not None:
+            inputType = function(inputType)
+        return Input(function(node.target), inputType)
+    elif nodeClass == While:
+        return While(function(node.condition),
+                     mapExpressions(node.body, function))
+    elif nodeClass == For:
+        # The loop variable is not an expression of its own here; see
+        # Optimizer.hoistStatements()
+        return For(node.var, function(node.start), function(node.finish),
+                   mapExpressions(node.body, function), node.countable)
+    elif nodeClass == If:
+        branches = tuple((function(condition),
+                          mapExpressions(body, function))
+                         for condition, body in node.branches)
+        orelse = node.orelse
+        if orelse is not None:
+            orelse = mapExpressions(orelse, function)
+        return If(branches, orelse)
+    return node
+
+# Debug dump of a lowered program, in something close to Zephyr syntax.
+# Temps appear as $1, $2, ...; ($1 := expr) is a Share, ($1 := once expr) is
+# a Hoisted expression, and "reset $1" is a Reset.
+
+def dumpProgram(program, file = None):
+    """Prints the lowered (and possibly optimized) <program>."""
+    if file is None:
+        file = sys.stdout
+    for line in formatStatement(program, 0):
+        print(line, file = file)
+
+def formatStatement(node, depth):
+    """Returns the lines of the statement <node>, indented <depth> levels."""
+    pad = "    " * depth
+    nodeClass = node.__class__
+    if nodeClass == Block:
+        lines = []
+        for statement in node.statements:
+            lines.extend(formatStatement(statement, depth))
+        return lines
+    elif nodeClass == Print:
+        items = ", ".join(formatExpression(item) for item in node.items)
+        return [pad + ("print " + items).rstrip()
+                + ("" if node.newline else "...")]
+    elif nodeClass == Set:
+        return [pad + "set %s to %s" % (formatExpression(node.target),
+                                        formatExpression(node.value))]
+    elif nodeClass == Inc:
+        line = pad + "inc " + formatExpression(node.target)
+        if node.targetType is not None:
+            line += "  # " + node.targetType.z_name
+        return [line]
+    elif nodeClass == Input:
+        line = pad + "input " + formatExpression(node.target)
+        if node.inputType is not None:
+            line += " as " + formatExpression(node.inputType)
+        return [line]
+    elif nodeClass == While:
+        return ([pad + "while " + formatExpression(node.condition)]
+                + formatStatement(node.body, depth + 1)
+                + [pad + "repeat"])
+    elif nodeClass == For:
+        header = "for %s from %s to %s" % (formatExpression(node.var),
+                                           formatExpression(node.start),
+                                           formatExpression(node.finish))
+        if node.countable:
+            header += "  # counted"
+        return ([pad + header] + formatStatement(node.body, depth + 1)
+                + [pad + "next"])
+    elif nodeClass == If:
+        lines = []
+        for index, (condition, body) in enumerate(node.branches):
+            keyword = "if " if index == 0 else "else if "
+            lines.append(pad + keyword + formatExpression(condition))
+            lines.extend(formatStatement(body, depth + 1))
+        if node.orelse is not None:
+            lines.append(pad + "else")
+            lines.extend(formatStatement(node.orelse, depth + 1))
+        lines.append(pad + "end if")
+        return lines
+    elif nodeClass == Reset:
+        return [pad + "reset " + ", ".join("$%d" % temp
+                                           for temp in node.temps)]
+    return [pad + "<%s>" % nodeClass.__name__]
+
+def formatExpression(node):
+    nodeClass = node.__class__
+    if nodeClass == Name:
+        return node.name
+    elif nodeClass == Const:
+        if isinstance(node.value, type):
+            return node.value.z_name
+        return repr(node.value)
+    elif nodeClass == BinOp:
+        return "(%s %s%s %s)" % (formatExpression(node.lhs), node.operator,
+                                 formatType(node.operandType),
+                                 formatExpression(node.rhs))
+    elif nodeClass == UnaryOp:
+        return "(%s%s %s)" % (node.operator, formatType(node.operandType),
+                              formatExpression(node.operand))
+    elif nodeClass == Subscript:
+        return "%s[%s]" % (formatExpression(node.base),
+                           formatExpression(node.index))
+    elif nodeClass == Section:
+        return "%s[%s...%s]" % (formatExpression(node.base),
+                                formatExpression(node.start),
+                                formatExpression(node.stop))
+    elif nodeClass == Call:
+        return "%s(%s)" % (formatExpression(node.base),
+                           ", ".join(formatExpression(argument)
+                                     for argument in node.arguments))
+    elif nodeClass == Random:
+        return "random"
+    elif nodeClass == Literal:
+        return node.token.value
+    elif nodeClass == Share:
+        return "($%d := %s)" % (node.temp, formatExpression(node.expression))
+    elif nodeClass == Reuse:
+        return "$%d" % node.temp
+    elif nodeClass == Hoisted:
+        return "($%d := once %s)" % (node.temp,
+                                     formatExpression(node.expression))
+    return "<%s>" % nodeClass.__name__
+
+def formatType(operandType):
+    """Returns the suffix of an operator marked with <operandType>."""
+    if operandType is None:
+        return ""
+    return ":" + operandType.z_name
+
+if __name__ == "__main__":
+    # Print a program after optimization
+    from Scanner import Scanner
+    from TableParser import parseIterative
+    from BNF import loadCachedGrammar
+    from Folding import foldConstants
+    from Lowering import lower
+    if len(sys.argv) < 2:
+        print("Usage: python Optimizer.py program.zeph [pass,pass...]")
+        sys.exit(1)
+    if len(sys.argv) > 2:
+        passes = sys.argv[2].split(",")
+    else:
+        passes = passNames
+    f = open(sys.argv[1], 'r')
+    code = f.read() + "\n"
+    f.close()
+    syntaxTree = parseIterative(Scanner(code), loadCachedGrammar("BNF.txt"))
+    dumpProgram(optimize(lower(foldConstants(syntaxTree)), passes))
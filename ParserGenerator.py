@@ -0,0 +1,195 @@
+
+import BNF
+from BNF import loadGrammar, loadCachedGrammar
+import hashlib
+import importlib
+import sys
+import os
+
+# The parser generator turns the LL(1) grammar into a Python module with one
+# recursive-descent function per nonterminal. Each function picks its
+# production with a chain of tests on the lookahead token's type and value,
+# in production order, so it makes exactly the choices Grammar.findProduction
+# would. It then matches tokens and calls other functions directly, adding
+# nodes straight to the parse tree. A nonterminal whose last production
+# symbol is itself (like Statements) loops instead of recursing.
+#
+# Run "python ParserGenerator.py" after changing the grammar to regenerate
+# the module. zephyr.py uses the generated parser only if it was built from
+# the current compiled grammar by the current version of the generator; the
+# module records a hash of both (see parserHash), so edits to BNF.py or to
+# this file that don't change the generated code don't make it stale.
+
+GENERATED_MODULE = "GeneratedParser"
+GRAMMAR_FILENAME = "BNF.txt"
+
+# Increase this whenever a change to this module changes the code it
+# generates
+GENERATOR_VERSION = 1
+
+def symbolKey(symbol):
+    """Returns a tuple describing the grammar symbol <symbol> (or None for
+    an epsilon)."""
+    if symbol is None:
+        return None
+    return (symbol.__class__.__name__, symbol.value, symbol.permanent)
+
+def parserHash(grammar):
+    """Returns a hex digest identifying the parser that this version of the
+    generator makes from the compiled <grammar>. It covers everything the
+    generated code depends on: the start symbol, the nonterminals and
+    whether they are permanent, and each production with its select set."""
+    description = [ GENERATOR_VERSION, symbolKey(grammar.startSymbol) ]
+    for nonterm in grammar.orderedNonterms():
+        description.append((symbolKey(nonterm),
+                            bool(grammar.nontermPermanent(nonterm)),
+                            tuple(grammar.nontermProdNums[nonterm])))
+    for prodNum, production in enumerate(grammar.productions):
+        description.append((symbolKey(production.nonterm),
+                            [ symbolKey(symbol)
+                              for symbol in production.rhsList ],
+                            sorted(symbolKey(symbol) for symbol
+                                   in grammar.selectSets[prodNum])))
+    return hashlib.sha256(repr(description).encode()).hexdigest()
+
+def functionName(nonterm):
+    """Returns the name of the generated function for <nonterm>."""
+    return "parse_" + "".join(char if char.isalnum() else "_"
+                              for char in nonterm.value)
+
+def productionTest(grammar, prodNum):
+    """Returns a Python expression (in terms of tokenType and tokenValue)
+    that is true when the lookahead selects production <prodNum>."""
+    types = sorted(symbol.value for symbol in grammar.selectSets[prodNum]
+                   if symbol.__class__ == BNF.Terminal)
+    values = sorted(symbol.value for symbol in grammar.selectSets[prodNum]
+                    if symbol.__class__ == BNF.Literal)
+    tests = []
+    for variable, items in (("tokenType", types), ("tokenValue", values)):
+        if len(items) == 1:
+            tests.append("%s == %r" % (variable, items[0]))
+        elif len(items) > 1:
+            tests.append("%s in {%s}" % (variable,
+                                        ", ".join(repr(item)
+                                                  for item in items)))
+    return " or ".join(tests) or "False"
+
+def generateFunction(grammar, nonterm):
+    """Returns the source of the parsing function for <nonterm>, which adds
+    its node (if <nonterm> is permanent) or its children to <parent>."""
+    lines = []
+    lines.append("def %s(scanner, parent):" % functionName(nonterm))
+    permanent = grammar.nontermPermanent(nonterm)
+    if permanent:
+        lines.append("    node = TreeNode(%r)" % nonterm.value)
+        lines.append("    parent.children.append(node)")
+    else:
+        lines.append("    node = parent")
+    prodNums = range(*grammar.nontermProdNums[nonterm])
+    loops = not permanent and any(
+        grammar.productions[prodNum].rhsList[-1] == nonterm
+        for prodNum in prodNums)
+    indent = "    "
+    if loops:
+        lines.append("    while True:")
+        indent = "        "
+    lines.append(indent + "token = scanner.lookAhead()")
+    lines.append(indent + "tokenType = token.typeName")
+    lines.append(indent + "tokenValue = token.value")
+    keyword = "if"
+    for prodNum in prodNums:
+        prod = grammar.productions[prodNum]
+        lines.append(indent + "%s %s:" % (keyword,
+                                          productionTest(grammar, prodNum)))
+        keyword = "elif"
+        body = []
+        rhsList = [ symbol for symbol in prod.rhsList if symbol is not None ]
+        tailLoop = loops and rhsList and rhsList[-1] == nonterm
+        if tailLoop:
+            rhsList = rhsList[:-1]
+        for symbol in rhsList:
+            if symbol.__class__ == BNF.Nonterminal:
+                body.append("%s(scanner, node)" % functionName(symbol))
+            else:
+                if symbol.__class__ == BNF.Terminal:
+                    call = "scanner.match(type = %r)" % symbol.value
+                else:
+                    call = "scanner.match(value = %r)" % symbol.value
+                if symbol.permanent:
+                    body.append("node.children.append(%s)" % call)
+                else:
+                    body.append(call)
+        if tailLoop:
+            body.append("continue")
+        elif loops:
+            body.append("return")
+        if not body:
+            body.append("pass")
+        lines.extend(indent + "    " + statement for statement in body)
+    lines.append(indent + "else:")
+    lines.append(indent + "    raise ParseError(\"failed while parsing %s"
+                          " at %%s\" %% token, token)" % nonterm.value)
+    return "\n".join(lines) + "\n"
+
+def generateParser(BNF_filename):
+    """Returns the source of a parser module for <BNF_filename>."""
+    grammar = loadGrammar(BNF_filename)
+    parts = []
+    parts.append("# Recursive-descent parser generated by ParserGenerator.py "
+                 "from %s.\n" % BNF_filename)
+    parts.append("# Do not edit; run \"python ParserGenerator.py\" to "
+                 "regenerate it.\n\n")
+    parts.append("from AST import TreeNode, TempNode\n")
+    parts.append("from Errors import ParseError\n")
+    parts.append("from TableParser import reportParseError\n\n")
+    parts.append("PARSER_HASH = %r\n\n" % parserHash(grammar))
+    startFunction = functionName(grammar.startSymbol)
+    parts.append("def parse(scanner, grammar = None):\n")
+    parts.append("    holder = TempNode()\n")
+    parts.append("    try:\n")
+    parts.append("        %s(scanner, holder)\n" % startFunction)
+    parts.append("    except ParseError as e:\n")
+    parts.append("        reportParseError(e)\n")
+    parts.append("        raise\n")
+    if grammar.nontermPermanent(grammar.startSymbol):
+        parts.append("    return holder.children[0]\n")
+    else:
+        parts.append("    return holder\n")
+    for nonterm in grammar.orderedNonterms():
+        parts.append("\n")
+        parts.append(generateFunction(grammar, nonterm))
+    return "".join(parts)
+
+def writeParser(BNF_filename = GRAMMAR_FILENAME):
+    """Generates the parser module next to this code."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    f = open(os.path.join(path, GENERATED_MODULE + ".py"), 'w')
+    f.write(generateParser(BNF_filename))
+    f.close()
+
+def loadGeneratedParser(BNF_filename = GRAMMAR_FILENAME, grammar = None,
+                        warn = False):
+    """Returns the generated parser module if it exists and is up to date
+    with the grammar (the compiled <grammar>, if given, or else the one for
+    <BNF_filename>); otherwise returns None. If <warn> is true, a module
+    that exists but is out of date is reported on standard error."""
+    try:
+        module = importlib.import_module(GENERATED_MODULE)
+    except ImportError:
+        return None
+    if grammar is None:
+        grammar = loadCachedGrammar(BNF_filename)
+    if getattr(module, "PARSER_HASH", None) != parserHash(grammar):
+        if warn:
+            print("Warning: %s.py is out of date with the grammar or the "
+                  "parser generator; run ParserGenerator.py to rebuild it" \
+                  % GENERATED_MODULE, file = sys.stderr)
+        return None
+    return module
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        writeParser(sys.argv[1])
+    else:
+        writeParser()
+    print("Wrote %s.py" % GENERATED_MODULE)
@@ -0,0 +1,178 @@
+
+from BNF import grammarHash, writeFileAtomically
+import hashlib
+import pickle
+import os
+
+# On-disk cache of parsed programs, along the lines of Python's __pycache__.
+# The lowered program made from foo.zeph is pickled to foo-<hash>.zephc in
+# the user's cache directory (see defaultCacheDir()), together with the hash
+# of the source code, the hash of the grammar, the optimization passes that
+# were run on it and the hash of the interpreter's code. A later run of the
+# same source on the same interpreter loads the program from there and
+# skips lexing, parsing and lowering entirely.
+# Anything wrong with a cache file (missing, stale, unreadable, unwritable)
+# just means parsing the program as usual.
+#
+# Loading a pickle can run any Python code, so the cache is never kept next
+# to the program, where whoever wrote the program could plant a file. It
+# lives in a directory of the user's own, and a cache file is only loaded if
+# it and its directory belong to the user and no one else can write to them.
+# The same goes for cached Python translations, which are run with exec().
+
+CACHE_EXTENSION = ".zephc"
+# Python translations made by Transpiler.py are cached as source, so that
+# they can be read
+SOURCE_EXTENSION = ".py"
+
+def defaultCacheDir():
+    """Returns the directory that program caches go in unless another one
+    is given: zephyr in $XDG_CACHE_HOME, or in ~/.cache."""
+    cacheHome = os.environ.get("XDG_CACHE_HOME") \
+                or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cacheHome, "zephyr")
+
+def isPrivate(path):
+    """Says whether the file or directory <path> exists, belongs to the user
+    running the interpreter, and can't be written by anyone else. Where
+    there are no user IDs (on Windows), it only has to exist."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    if hasattr(os, "getuid"):
+        return info.st_uid == os.getuid() and not info.st_mode & 0o022
+    return True
+
+def interpreterHash():
+    """Returns a hex digest of the interpreter's modules. Any change to
+    them can change the programs that are cached or what they do, so it
+    makes the cached ones stale."""
+    # We assume that all of the modules are in the same directory as this
+    # code
+    path = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".py"):
+            f = open(os.path.join(path, filename), 'rb')
+            digest.update(filename.encode("utf-8") + b"\0")
+            digest.update(f.read())
+            f.close()
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+def sourceHash(code):
+    """Returns a hex digest of the source <code>."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+class ProgramCache:
+    """The cache file for the program in <filename>. If <cacheDir> is given,
+    the cache file goes there instead of in defaultCacheDir(). <passes>
+    names the optimization passes (see Optimizer.py) the cached program has
+    been through."""
+    def __init__(self, filename, cacheDir = None, BNF_filename = "BNF.txt",
+                 passes = ()):
+        filename = os.path.abspath(filename)
+        baseName = os.path.splitext(os.path.basename(filename))[0]
+        if cacheDir is None:
+            cacheDir = defaultCacheDir()
+        self.cacheDir = os.path.abspath(cacheDir)
+        # Programs from different directories share the cache directory, so
+        # tell same-named ones apart by their location
+        location = hashlib.sha256(filename.encode("utf-8")).hexdigest()
+        baseName += "-" + location[:12]
+        self.cacheFilename = os.path.join(cacheDir,
+                                          baseName + CACHE_EXTENSION)
+        self.sourceFilename = os.path.join(cacheDir,
+                                           baseName + SOURCE_EXTENSION)
+        self.BNF_filename = BNF_filename
+        self.passes = ",".join(passes)
+        self._grammarHash = None
+        self._interpreterHash = None
+
+    def grammarHash(self):
+        if self._grammarHash is None:
+            self._grammarHash = grammarHash(self.BNF_filename)
+        return self._grammarHash
+
+    def interpreterHash(self):
+        if self._interpreterHash is None:
+            self._interpreterHash = interpreterHash()
+        return self._interpreterHash
+
+    def key(self, code):
+        """Returns the key that a cached program for <code> must match."""
+        return (self.interpreterHash(), self.grammarHash(), sourceHash(code),
+                self.passes or "-")
+
+    def load(self, code):
+        """Returns the cached lowered program for <code>, or None if there
+        isn't an up-to-date one."""
+        if not (isPrivate(self.cacheDir) and isPrivate(self.cacheFilename)):
+            return None
+        try:
+            f = open(self.cacheFilename, 'rb')
+            try:
+                # The key comes first, so that a stale program, which
+                # the current code may not be able to make sense of, isn't
+                # loaded at all
+                if pickle.load(f) != self.key(code):
+                    return None
+                return pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            return None
+
+    def store(self, code, program):
+        """Saves the lowered program for <code>. Failing to write the cache
+        is not an error."""
+        try:
+            data = pickle.dumps(self.key(code), pickle.HIGHEST_PROTOCOL) \
+                   + pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+            self.makeCacheDir()
+            writeFileAtomically(self.cacheFilename, data, private = True)
+        except (OSError, pickle.PicklingError, RecursionError):
+            pass
+
+    def makeCacheDir(self):
+        """Creates the cache directory if it doesn't exist yet, so that only
+        the user can use it."""
+        os.makedirs(self.cacheDir, mode = 0o700, exist_ok = True)
+
+    def sourceHeader(self, code, version):
+        """Returns the first line of a cached translation of <code> made by
+        translator version <version>."""
+        key = self.key(code) + (version,)
+        return "# Cache key: %s\n" % " ".join(str(part) for part in key)
+
+    def loadSource(self, code, version):
+        """Returns the cached Python translation of <code>, or None if there
+        isn't an up-to-date one. The translation gets run, and anyone can
+        work out the header it needs, so a file that someone else could
+        have written is never used."""
+        if not (isPrivate(self.cacheDir) and isPrivate(self.sourceFilename)):
+            return None
+        try:
+            f = open(self.sourceFilename, 'r')
+            try:
+                header = f.readline()
+                source = f.read()
+            finally:
+                f.close()
+        except Exception:
+            return None
+        if header != self.sourceHeader(code, version):
+            return None
+        return source
+
+    def storeSource(self, code, source, version):
+        """Saves the Python translation of <code>. Failing to write the
+        cache is not an error."""
+        data = self.sourceHeader(code, version) + source
+        try:
+            self.makeCacheDir()
+            writeFileAtomically(self.sourceFilename, data.encode("utf-8"),
+                                private = True)
+        except OSError:
+            pass
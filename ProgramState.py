@@ -5,6 +5,11 @@ class ProgramState:
     """Class containing the internal state of a program."""
     def __init__(self):
         self.symbols = {}
+        # Variable ID bound to each slot number (see Resolution.py), or -1
+        self.slots = []
+        # Values kept by the optimizer's Share and Hoisted nodes, by temp
+        # number (see Optimizer.py)
+        self.temps = {}
         self.variables = []
         self.memory = []
         self.reservedMemory = {}
@@ -41,6 +46,25 @@ class ProgramState:
             self.symbols[varname] = self.createVariable()
         return self.symbols[varname]
 
+    def getSlotVarId(self, slot, varname):
+        """Gets the ID for the variable in the given slot, which holds the
+        variable name <varname>. The first time, binds the slot to the ID
+        from getVarId(); after that, no name lookup is needed."""
+        try:
+            varId = self.slots[slot]
+            if varId != -1:
+                return varId
+        except IndexError:
+            self.reserveSlots(slot + 1)
+        varId = self.getVarId(varname)
+        self.slots[slot] = varId
+        return varId
+
+    def reserveSlots(self, number):
+        """Makes sure that slots 0 through <number>-1 exist."""
+        if number > len(self.slots):
+            self.slots.extend([-1] * (number - len(self.slots)))
+
     def createVariable(self, type = ZObject):
         """Creates a new (uninitialized) variable and returns its ID."""
         varId = len(self.variables)
@@ -106,12 +130,36 @@ class ProgramState:
             # The item isn't stored yet; store it
             self.reservedMemory[address] = item
         elif not reserved:
+            if item.__class__ == ZFraction:
+                # Keep stored fractions from growing (see BuiltInClasses.py)
+                item.reduce()
             # Shove the item in regular memory and get the virtual address
             realAddress = len(self.memory)
             self.memory.append(item)
             address = realAddress + self.reservedSize
         return address
 
+    def memorizeUnboxed(self, value):
+        """Does what memorize() does with an Integer or Boolean, given as a
+        plain Python int or bool. The Zephyr object is only made if the
+        value isn't already in reserved memory."""
+        if value.__class__ is bool:
+            address = 1 if value else 0
+            if address not in self.reservedMemory:
+                self.reservedMemory[address] = makeBoolean(value)
+            return address
+        if -256 <= value < 256:
+            if value >= 0:
+                address = value * 2 + 2
+            else:
+                address = -value * 2 + 1
+            if address not in self.reservedMemory:
+                self.reservedMemory[address] = makeInteger(value)
+            return address
+        realAddress = len(self.memory)
+        self.memory.append(makeInteger(value))
+        return realAddress + self.reservedSize
+
     def recall(self, address):
         """Returns the item at the given virtual address.
         If the address is -1, raises ValueError; if there is no item at
@@ -0,0 +1,31 @@
+
+from AST import TreeNode, ResolvedName
+from Execution import builtInClasses
+
+# Name resolution, run once on the parse tree after parsing. Every variable
+# name in the program gets a fixed slot number, and the Name token at the
+# start of each NameThing is replaced by a ResolvedName that carries it. At
+# run time, the engines look up variables by slot (ProgramState.slots is a
+# plain list) instead of hashing the name into the symbol table each time.
+#
+# A slot is bound to its variable ID the first time it is used, so variable
+# IDs are still handed out in the order the program first touches them, and
+# the symbol table (which -d prints) is the same as without resolution.
+
+def resolveNames(node, slots = None):
+    """Annotates the tree rooted at <node> with slot numbers. <slots> maps
+    each name already seen to its slot. Returns the root."""
+    if slots is None:
+        slots = {}
+    if node.__class__ != TreeNode:
+        return node
+    if node.name == "NameThing":
+        base = node.children[0]
+        name = base.value
+        if base.name == "Name" and name not in builtInClasses:
+            if name not in slots:
+                slots[name] = len(slots)
+            node.children[0] = ResolvedName(name, slots[name])
+    for child in node.children:
+        resolveNames(child, slots)
+    return node
@@ -1,7 +1,11 @@
 
-from Tokens import tokenize
+from Tokens import tokenize, TokenBuffer
 import Tokens
 from Errors import ParseError
+from collections import deque
+
+# Token types that the parser never sees
+triviaNames = ("Space", "SingleComment", "MultiComment")
 
 class Scanner:
     def __init__(self, codeString):
@@ -16,8 +20,7 @@ class Scanner:
         done = False
         while not done:
             token = self.tokenList[self.index]
-            if token.name != "Space" and token.name != "SingleComment" \
-                                    and token.name != "MultiComment":
+            if token.name not in triviaNames:
                 done = True
             else:
                 self.index += 1
@@ -40,7 +43,98 @@ class Scanner:
             if value is not None:
                 errMessage += " value %s" % value
             raise ParseError(errMessage, token)
-    
+
+
+class StreamingScanner:
+    """Scanner that pulls tokens from tokenize() only as the parser asks for
+    them. Trivia tokens are dropped as they come out of the tokenizer, and
+    at most <bufferSize> meaningful tokens are held at any one time, so
+    memory use does not grow with the length of the source."""
+    def __init__(self, codeString, bufferSize = 1):
+        self.tokenStream = self.meaningfulTokens(codeString)
+        self.bufferSize = bufferSize
+        self.buffer = deque()
+        self.fill()
+
+    def meaningfulTokens(self, codeString):
+        """Generator that yields the non-trivia tokens of <codeString>,
+        followed by an explicit EOF token."""
+        for token in tokenize(codeString):
+            if token.name not in triviaNames:
+                yield token
+        yield Tokens.EOF()
+
+    def fill(self):
+        """Tops up the lookahead buffer from the token stream."""
+        while len(self.buffer) < self.bufferSize:
+            try:
+                self.buffer.append(next(self.tokenStream))
+            except StopIteration:
+                break
+
+    def lookAhead(self, offset = 0):
+        """Returns the token <offset> places past the current one (which
+        must be less than the buffer size). Past the end of the code, the
+        EOF token is returned."""
+        if offset < len(self.buffer):
+            return self.buffer[offset]
+        else:
+            return self.buffer[-1]
+
+    def match(self, type = None, value = None):
+        token = self.buffer[0]
+        if token.compatible(type, value):
+            # Advance to the next meaningful token, keeping the EOF token
+            # once the stream is exhausted
+            if len(self.buffer) > 1 or token.name != "EOF":
+                self.buffer.popleft()
+                self.fill()
+            # Return the stored token
+            return token
+        else:
+            errMessage = "Token %s did not match against" % token
+            if type is not None:
+                errMessage += " type %s" % type
+            if value is not None:
+                errMessage += " value %s" % value
+            raise ParseError(errMessage, token)
+
+class CompactScanner:
+    """Scanner backed by a TokenBuffer. The meaningful tokens are held as
+    kind IDs and source offsets; a Token object is built only for the
+    current token, and it can report its line and column."""
+    def __init__(self, codeString):
+        self.tokens = TokenBuffer(codeString)
+        self.index = 0
+        self.current = self.tokens.token(0)
+
+    def lookAhead(self):
+        return self.current
+
+    def match(self, type = None, value = None):
+        token = self.current
+        if token.compatible(type, value):
+            # Advance to the next meaningful token (the buffer holds no
+            # trivia), staying on the final EOF token
+            if self.index < len(self.tokens) - 1:
+                self.index += 1
+                self.current = self.tokens.token(self.index)
+            # Return the stored token
+            return token
+        else:
+            errMessage = "Token %s did not match against" % token
+            if type is not None:
+                errMessage += " type %s" % type
+            if value is not None:
+                errMessage += " value %s" % value
+            raise ParseError(errMessage, token)
+
+scannerClasses = {
+    "list": Scanner,
+    "stream": StreamingScanner,
+    "compact": CompactScanner
+    }
+
 def testScanner(filename = None):
     if filename != None:
         # Read code from file
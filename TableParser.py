@@ -7,14 +7,56 @@ def parse(scanner, grammar):
     try:
         return parseNonterm(grammar.startSymbol, scanner, grammar)
     except ParseError as e:
-        if e.token is not None:
-            print("Encountered syntax error: was not expecting %s" \
-                  % repr(e.token.value))
-        else:
-            print("Encountered syntax error")
+        reportParseError(e)
         raise
 
+def reportParseError(e):
+    """Prints a syntax error message for the ParseError <e>."""
+    if e.token is not None and e.token.line is not None:
+        print("Encountered syntax error on line %d: was not expecting %s" \
+              % (e.token.line, repr(e.token.value)))
+    elif e.token is not None:
+        print("Encountered syntax error: was not expecting %s" \
+              % repr(e.token.value))
+    else:
+        print("Encountered syntax error")
+
 def parseNonterm(nonterm, scanner, grammar):
+    root = TempNode()
+    buildNonterm(nonterm, scanner, grammar, root)
+    if grammar.nontermPermanent(nonterm):
+        return root.children[0]
+    else:
+        return root
+
+def buildNonterm(nonterm, scanner, grammar, parent):
+    """Parses <nonterm> and adds the result to <parent>. A permanent
+    nonterminal adds its own node; any other nonterminal adds its children
+    directly to <parent>, so no TempNode is built and no child lists are
+    copied."""
+    if grammar.nontermPermanent(nonterm):
+        node = TreeNode(str(nonterm))
+        parent.children.append(node)
+    else:
+        node = parent
+    la = scanner.lookAhead()
+    prod = grammar.findProduction(nonterm, la)
+    for symbol in prod.rhsList:
+        if symbol.__class__ == BNF.Nonterminal:
+            buildNonterm(symbol, scanner, grammar, node)
+        elif symbol.__class__ == BNF.Terminal:
+            token = scanner.match(type = symbol.value)
+            if symbol.permanent:
+                node.children.append(token)
+        elif symbol.__class__ == BNF.Literal:
+            token = scanner.match(value = symbol.value)
+            if symbol.permanent:
+                node.children.append(token)
+
+def parseNontermWithTempNodes(nonterm, scanner, grammar):
+    """The original tree builder: every nonterminal gets a node, and the
+    children of TempNodes are copied into their parents. Kept for
+    comparison with buildNonterm."""
     if grammar.nontermPermanent(nonterm):
         node = TreeNode(str(nonterm))
     else:
@@ -23,7 +65,7 @@ def parseNonterm(nonterm, scanner, grammar):
     prod = grammar.findProduction(nonterm, la)
     for symbol in prod.rhsList:
         if symbol.__class__ == BNF.Nonterminal:
-            childNode = parseNonterm(symbol, scanner, grammar)
+            childNode = parseNontermWithTempNodes(symbol, scanner, grammar)
             node.addChild(childNode)
         elif symbol.__class__ == BNF.Terminal:
             token = scanner.match(type = symbol.value)
@@ -35,4 +77,50 @@ def parseNonterm(nonterm, scanner, grammar):
                 node.addChild(token)
     return node
 
+def parseIterative(scanner, grammar):
+    try:
+        return parseNontermIterative(grammar.startSymbol, scanner, grammar)
+    except ParseError as e:
+        reportParseError(e)
+        raise
 
+def parseNontermIterative(nonterm, scanner, grammar):
+    """Builds the same tree as parseNonterm with an explicit stack instead
+    of recursion (a classic LL(1) pushdown automaton), so the Python stack
+    depth stays constant however long the program is.
+    The stack holds grammar symbols still to be parsed. When a permanent
+    nonterminal is expanded, its node becomes the parent for the symbols
+    of its production, and the previous parent is pushed beneath them so
+    that it is restored once they are done. Children of other nonterminals
+    go straight into the current parent, just as a TempNode's would."""
+    root = TempNode()
+    node = root
+    stack = [ nonterm ]
+    while stack:
+        symbol = stack.pop()
+        if symbol.__class__ == BNF.Nonterminal:
+            if grammar.nontermPermanent(symbol):
+                childNode = TreeNode(str(symbol))
+                node.addChild(childNode)
+                stack.append(node)
+                node = childNode
+            la = scanner.lookAhead()
+            prod = grammar.findProduction(symbol, la)
+            for rhsSymbol in reversed(prod.rhsList):
+                if rhsSymbol is not None:
+                    stack.append(rhsSymbol)
+        elif symbol.__class__ == BNF.Terminal:
+            token = scanner.match(type = symbol.value)
+            if symbol.permanent:
+                node.addChild(token)
+        elif symbol.__class__ == BNF.Literal:
+            token = scanner.match(value = symbol.value)
+            if symbol.permanent:
+                node.addChild(token)
+        else:
+            # A parent node saved when a permanent nonterminal was expanded
+            node = symbol
+    if grammar.nontermPermanent(nonterm):
+        return root.children[0]
+    else:
+        return root
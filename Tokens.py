@@ -1,9 +1,21 @@
 
 import re
 from Errors import TokenError
+from operator import itemgetter
+from array import array
+from bisect import bisect_left, bisect_right
 import sys
 import os
 
+# The regex parser is used to work out which characters each token regex can
+# start with; its module name changed in Python 3.11
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
 REGEX_FILENAME = "Regexes.txt"
 
 def loadRegexes():
@@ -26,12 +38,28 @@ class Token:
     """Token base class."""
     priority = 1
     regex = None
+    # Whether the parser should skip tokens of this type
+    trivia = False
+    # Integer kind ID and lowercase type name; both are filled in below
+    kind = None
+    typeName = None
+    # A token read out of a TokenBuffer remembers where it came from, so that
+    # its line and column can be looked up when needed
+    buffer = None
+    index = None
     def __init__(self, value = None):
         self._name = self.__class__.__name__
         self._value = value
 
     def __str__(self):
         return "<%s:%s>" % (self._name, repr(self._value))
+
+    def __getstate__(self):
+        # Don't drag the whole TokenBuffer along when a parse tree is pickled
+        state = self.__dict__.copy()
+        state.pop("buffer", None)
+        state.pop("index", None)
+        return state
     
     @property
     def name(self):
@@ -41,8 +69,22 @@ class Token:
     def value(self):
         return self._value
 
+    @property
+    def line(self):
+        """The token's line number, or None if its position is unknown."""
+        if self.buffer is None:
+            return None
+        return self.buffer.lineCol(self.index)[0]
+
+    @property
+    def column(self):
+        """The token's column number, or None if its position is unknown."""
+        if self.buffer is None:
+            return None
+        return self.buffer.lineCol(self.index)[1]
+
     def hasType(self, type):
-        if type == self._name.lower():
+        if type == self.typeName:
             return True
         else:
             return False
@@ -73,15 +115,26 @@ class Integer(Token): pass
 class Boolean(Token): pass
 class Character(Token): pass
 class String(Token): pass
-class Space(Token): pass
-class SingleComment(Token): pass
-class MultiComment(Token): pass
+class Space(Token):
+    trivia = True
+class SingleComment(Token):
+    trivia = True
+class MultiComment(Token):
+    trivia = True
 class EOF(Token): pass
 class Unknown(Token):
     # Unknown is a catch-all, and, as such, must have the lowest priority
     priority = -1
 
 
+# Every token type, indexed by its integer kind ID
+tokenKinds = [ Symbol, Operator, EOL, Keyword, Name, Integer, Boolean,
+               Character, String, Space, SingleComment, MultiComment, EOF,
+               Unknown ]
+for kind, TokenClass in enumerate(tokenKinds):
+    TokenClass.kind = kind
+    TokenClass.typeName = TokenClass.__name__.lower()
+
 # Fill tokenClasses with all token types that are associated with regexes
 tokenClasses = []
 for tokenName, tokenRegex in tokenRegexes.items():
@@ -94,8 +147,11 @@ for tokenName, tokenRegex in tokenRegexes.items():
         tokenClasses.append(TokenClass)
 
 
-def tokenize(codeString):
-    """Generator function that yields tokens from <codeString>."""
+def tokenizeByClass(codeString):
+    """Generator function that yields tokens from <codeString>.
+    This is the original lexing engine: at each position, every token class's
+    regex is tried in turn. It is kept for checking the first-character
+    engine used by tokenize()."""
     global tokenClasses
     pos = 0
     while pos < len(codeString):
@@ -129,3 +185,364 @@ def tokenize(codeString):
             raise TokenError("could not match '%s'" % restOfLine)
 
 
+# The first-character lexer
+# For each ASCII character, we work out which token classes could possibly
+# match a string starting with that character. The regexes of those classes
+# are combined into a single master pattern in which each class sits inside
+# its own lookahead group, so one call to match() finds every candidate's
+# match at once. The candidates are ordered by descending priority (ties keep
+# the order of Regexes.txt), so the first of the longest matches is exactly
+# the one the longest-match/priority rule would pick.
+
+ASCII_CHARS = frozenset(range(128))
+
+categoryRegexes = {
+    sre_constants.CATEGORY_DIGIT: r"\d",
+    sre_constants.CATEGORY_NOT_DIGIT: r"\D",
+    sre_constants.CATEGORY_SPACE: r"\s",
+    sre_constants.CATEGORY_NOT_SPACE: r"\S",
+    sre_constants.CATEGORY_WORD: r"\w",
+    sre_constants.CATEGORY_NOT_WORD: r"\W"
+    }
+
+def charSetFirsts(items):
+    """Returns the set of ASCII codes matched by a character set [...]."""
+    result = set()
+    negate = False
+    for op, arg in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            result.add(arg)
+        elif op == sre_constants.RANGE:
+            result.update(range(arg[0], arg[1] + 1))
+        elif op == sre_constants.CATEGORY and arg in categoryRegexes:
+            catRegex = re.compile(categoryRegexes[arg])
+            result.update(code for code in ASCII_CHARS
+                          if catRegex.match(chr(code)))
+        else:
+            # Something we don't understand; assume it could be anything
+            return set(ASCII_CHARS)
+    if negate:
+        return set(ASCII_CHARS - result)
+    else:
+        return result
+
+def regexFirsts(parsed):
+    """Returns (firstSet, nullable) for a parsed regex sequence.
+    firstSet is the set of ASCII codes a match can start with; nullable is
+    True if the sequence can match the empty string. Anything not
+    understood is treated as matching anything, which is always safe."""
+    result = set()
+    for op, arg in parsed:
+        if op == sre_constants.LITERAL:
+            result.add(arg)
+            return result, False
+        elif op == sre_constants.NOT_LITERAL:
+            result.update(ASCII_CHARS - {arg})
+            return result, False
+        elif op == sre_constants.ANY:
+            result.update(ASCII_CHARS - {ord("\n")})
+            return result, False
+        elif op == sre_constants.IN:
+            result.update(charSetFirsts(arg))
+            return result, False
+        elif op == sre_constants.AT:
+            # Zero-width assertion ($, ^, etc.)
+            continue
+        elif op == sre_constants.SUBPATTERN:
+            itemFirsts, nullable = regexFirsts(arg[-1])
+        elif op == sre_constants.BRANCH:
+            itemFirsts = set()
+            nullable = False
+            for alternative in arg[1]:
+                altFirsts, altNullable = regexFirsts(alternative)
+                itemFirsts.update(altFirsts)
+                nullable = nullable or altNullable
+        elif op == sre_constants.MAX_REPEAT or op == sre_constants.MIN_REPEAT:
+            itemFirsts, nullable = regexFirsts(arg[2])
+            nullable = nullable or arg[0] == 0
+        else:
+            return set(ASCII_CHARS), True
+        result.update(itemFirsts)
+        if not nullable:
+            return result, False
+    return result, True
+
+def tokenClassFirsts(TokenClass):
+    """Returns the set of ASCII codes a TokenClass match can start with."""
+    regex = TokenClass.regex
+    firstSet, nullable = regexFirsts(sre_parse.parse(regex.pattern,
+                                                      regex.flags))
+    if nullable:
+        # An empty match is possible at any position
+        return set(ASCII_CHARS)
+    return firstSet
+
+def makeMatcher(candidates):
+    """Returns a function (codeString, pos) -> (TokenClass, end) that picks
+    the longest, highest-priority match among <candidates>, which must be
+    sorted by descending priority. If nothing matches, TokenClass is None."""
+    if len(candidates) == 1:
+        TokenClass = candidates[0]
+        regexMatch = TokenClass.regex.match
+        def matcher(codeString, pos):
+            matchObj = regexMatch(codeString, pos)
+            if matchObj is None:
+                return None, -1
+            return TokenClass, matchObj.end()
+        return matcher
+    pattern = ""
+    groupIndices = []
+    groupIndex = 1
+    for TokenClass in candidates:
+        pattern += "(?:(?=(%s))|)" % TokenClass.regex.pattern
+        groupIndices.append(groupIndex)
+        # Skip past any groups inside the class's own regex
+        groupIndex += 1 + TokenClass.regex.groups
+    masterMatch = re.compile(pattern, re.MULTILINE).match
+    getSpans = itemgetter(*groupIndices)
+    def matcher(codeString, pos):
+        # Unmatched groups have the span (-1, -1); matched ones all start at
+        # pos, so max() finds the first of the longest matches
+        spans = getSpans(masterMatch(codeString, pos).regs)
+        best = max(spans)
+        if best[1] == -1:
+            return None, -1
+        return candidates[spans.index(best)], best[1]
+    return matcher
+
+def makeMatcherTable():
+    """Builds the per-character matcher table for tokenize().
+    Returns (table, fallback): table[code] is the matcher for strings
+    starting with the ASCII character <code>; fallback handles everything
+    else."""
+    # sorted() is stable, so equal priorities keep their Regexes.txt order
+    candidates = sorted(tokenClasses, key = lambda TokenClass:
+                                                -TokenClass.priority)
+    firsts = { TokenClass: tokenClassFirsts(TokenClass)
+               for TokenClass in candidates }
+    matchers = {}
+    table = []
+    for code in range(len(ASCII_CHARS)):
+        charCandidates = tuple(TokenClass for TokenClass in candidates
+                               if code in firsts[TokenClass])
+        if charCandidates not in matchers:
+            matchers[charCandidates] = makeMatcher(charCandidates)
+        table.append(matchers[charCandidates])
+    fallback = makeMatcher(tuple(candidates))
+    return table, fallback
+
+matcherTable, fallbackMatcher = makeMatcherTable()
+
+# Characters that lex as Unknown on their own but can also open a longer
+# token, such as the quote of an unterminated String
+openerChars = set()
+for TokenClass in tokenClasses:
+    if TokenClass is not Unknown:
+        openerChars.update(tokenClassFirsts(TokenClass))
+
+
+def tokenSpans(codeString, pos = 0):
+    """Generator function that yields (TokenClass, start, end) for each token
+    in <codeString> from <pos> onward, without building Token objects.
+    <pos> must be a token boundary."""
+    table = matcherTable
+    tableSize = len(table)
+    while pos < len(codeString):
+        # Find the longest regex token match in codeString starting at pos,
+        # trying only the token classes that can start with this character
+        code = ord(codeString[pos])
+        if code < tableSize:
+            TokenClass, end = table[code](codeString, pos)
+        else:
+            TokenClass, end = fallbackMatcher(codeString, pos)
+        if TokenClass is not None:
+            yield TokenClass, pos, end
+            pos = end
+        else:
+            # No token matched the given code string
+            nlIndex = codeString.find('\n', pos)
+            restOfLine = codeString[pos:nlIndex]
+            raise TokenError("could not match '%s'" % restOfLine)
+
+def tokenize(codeString):
+    """Generator function that yields tokens from <codeString>."""
+    for TokenClass, start, end in tokenSpans(codeString):
+        yield TokenClass(codeString[start:end])
+
+
+class TokenBuffer:
+    """Compact storage for the tokens of a source string.
+    Each token is stored as an integer kind ID plus start and end offsets
+    into the source, kept in three parallel arrays. Token values are sliced
+    out of the source only when asked for, and line and column numbers are
+    found by bisecting an index of line starts that is built on first use.
+    Trivia tokens are left out unless <keepTrivia> is set. The buffer always
+    ends with an EOF token."""
+    lineBreakRegex = re.compile(r"\n\r?|\r\n?")
+    # Most token regexes look at most this many characters past the start
+    # of the token they match, so an edit can only change the tokens that
+    # start this close to it (see edit())
+    editMargin = 3
+
+    def __init__(self, codeString, keepTrivia = False):
+        self.source = codeString
+        self.keepTrivia = keepTrivia
+        self.kinds = array("B")
+        self.starts = array("l")
+        self.ends = array("l")
+        self._lineStarts = None
+        for TokenClass, start, end in tokenSpans(codeString):
+            if keepTrivia or not TokenClass.trivia:
+                self.kinds.append(TokenClass.kind)
+                self.starts.append(start)
+                self.ends.append(end)
+        self.kinds.append(EOF.kind)
+        self.starts.append(len(codeString))
+        self.ends.append(len(codeString))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def tokenClass(self, index):
+        return tokenKinds[self.kinds[index]]
+
+    def value(self, index):
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def token(self, index):
+        """Builds a Token object for the token at <index>."""
+        TokenClass = tokenKinds[self.kinds[index]]
+        if TokenClass is EOF:
+            token = EOF()
+        else:
+            token = TokenClass(self.source[self.starts[index]
+                                           :self.ends[index]])
+        token.buffer = self
+        token.index = index
+        return token
+
+    @property
+    def lineStarts(self):
+        """Offsets at which each line of the source begins."""
+        if self._lineStarts is None:
+            self._lineStarts = array("l", [0])
+            self._lineStarts.extend(match.end() for match in
+                                    self.lineBreakRegex.finditer(self.source))
+        return self._lineStarts
+
+    def restartIndex(self, editStart):
+        """Returns the index of a token from which relexing must begin to
+        take account of an edit at <editStart>."""
+        index = bisect_right(self.starts, editStart - self.editMargin) - 1
+        if index < 0:
+            return 0
+        # A String or MultiComment that was never closed lexes as an Unknown
+        # token for its opening character. Text inserted anywhere after it
+        # could close it, so relexing must start from the first such token.
+        unknownKind = bytes([Unknown.kind])
+        kindBytes = self.kinds.tobytes()
+        unknownIndex = kindBytes.find(unknownKind, 0, index)
+        while unknownIndex != -1:
+            if ord(self.source[self.starts[unknownIndex]]) in openerChars:
+                return unknownIndex
+            unknownIndex = kindBytes.find(unknownKind, unknownIndex + 1,
+                                          index)
+        return index
+
+    def edit(self, editStart, editEnd, newText):
+        """Replaces source[editStart:editEnd] with <newText> and relexes
+        only as much as needed. Relexing starts from restartIndex() and stops
+        as soon as a new token begins at an old token boundary past the
+        edit, since the rest of the source lexes exactly as before.
+        Returns (first, oldStop, newStop): old tokens [first, oldStop) were
+        replaced by new tokens [first, newStop), and the tokens after them
+        were shifted to match the new source."""
+        oldSource = self.source
+        newSource = oldSource[:editStart] + newText + oldSource[editEnd:]
+        delta = len(newText) - (editEnd - editStart)
+        editStop = editStart + len(newText)
+        first = self.restartIndex(editStart)
+        kinds = array("B")
+        starts = array("l")
+        ends = array("l")
+        # The final EOF token is never a boundary to resynchronize on
+        oldStop = len(self.kinds) - 1
+        if first == 0:
+            # Any leading trivia may have been edited too
+            restartPos = 0
+        else:
+            restartPos = self.starts[first]
+        for TokenClass, start, end in tokenSpans(newSource, restartPos):
+            if not self.keepTrivia and TokenClass.trivia:
+                continue
+            if start >= editStop:
+                oldIndex = bisect_left(self.starts, start - delta, first,
+                                       oldStop)
+                if oldIndex < oldStop \
+                        and self.starts[oldIndex] == start - delta:
+                    oldStop = oldIndex
+                    break
+            kinds.append(TokenClass.kind)
+            starts.append(start)
+            ends.append(end)
+        newStop = first + len(kinds)
+        # Splice the new tokens in and shift the ones after them
+        kinds.extend(self.kinds[oldStop:-1])
+        starts.extend(pos + delta for pos in self.starts[oldStop:-1])
+        ends.extend(pos + delta for pos in self.ends[oldStop:-1])
+        kinds.append(EOF.kind)
+        starts.append(len(newSource))
+        ends.append(len(newSource))
+        del self.kinds[first:]
+        del self.starts[first:]
+        del self.ends[first:]
+        self.kinds.extend(kinds)
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        self.source = newSource
+        self._lineStarts = None
+        return first, oldStop, newStop
+
+    def lineCol(self, index):
+        """Returns the (line, column) of the token at <index>, both counted
+        from 1."""
+        pos = self.starts[index]
+        line = bisect_right(self.lineStarts, pos)
+        return line, pos - self.lineStarts[line - 1] + 1
+
+
+def testTokenizers(filename = None):
+    """Checks that tokenize() and tokenizeByClass() agree on a file."""
+    if filename is not None:
+        f = open(filename, 'r')
+        code = f.read()
+        f.close()
+    else:
+        code = """
+set x to 14 + 3 # Single-line comment
+print (x - 4) * 2, '#', "#-", modulo mod andy, for_ever   #
+#-- Multiline comment
+    containing #- various stuff #--#
+`#-## Another multiline -#` ... .. ~
+"""
+    newTokens = [ (token.name, token.value) for token in tokenize(code) ]
+    oldTokens = [ (token.name, token.value)
+                  for token in tokenizeByClass(code) ]
+    if newTokens == oldTokens:
+        print("Token streams match (%d tokens)" % len(newTokens))
+    else:
+        for index, (new, old) in enumerate(zip(newTokens, oldTokens)):
+            if new != old:
+                print("Token %d differs: %s vs. %s" % (index, new, old))
+                break
+        else:
+            print("Token streams differ in length: %d vs. %d" \
+                  % (len(newTokens), len(oldTokens)))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        testTokenizers(sys.argv[1])
+    else:
+        testTokenizers()
@@ -0,0 +1,619 @@
+
+from BuiltInClasses import *
+from Errors import ZRuntimeError
+from ProgramState import isLValue
+from AST import Block, Print, Set, Inc, Input, While, For, If, BinOp, \
+                UnaryOp, Name, Subscript, Section, Call, Const, Random, \
+                Literal, Share, Reuse, Hoisted, Reset
+from Execution import builtInClasses, instantiate, subscript, section, \
+                      applyBinaryOperator, applyUnaryOperator
+from ClosureCompiler import executeCompiled
+from Utilities import removeFromFront, removeFromEnd
+from random import randrange
+import hashlib
+import os
+import sys
+
+# Translator from lowered programs to Python source. The program becomes one
+# Python function, program(state), that CPython compiles and runs itself.
+# The values of Zephyr variables stay in the ProgramState, since assignment
+# by reference, arrays of variables, and the -d output all depend on it;
+# everything else (expression results, loop conditions, literal values, and
+# the optimizer's temps) lives in Python locals and globals. Expressions are flattened into
+# assignments to temporaries, one operation each. Operators on Integers and
+# Booleans are done natively on the Python values, with a class check that
+# falls back to Execution.applyBinaryOperator for other types.
+#
+# The tree walker reports a ValueError raised anywhere inside getValue() as
+# an uninitialized variable, and lets it escape otherwise. The generated code
+# wraps each run of statements that the tree walker would run inside
+# getValue() in a try block that does the same.
+
+def transpilerHash():
+    """Returns a hex digest identifying this version of the translator."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    f = open(os.path.join(path, os.path.basename(__file__)), 'rb')
+    digest = hashlib.sha256(f.read()).hexdigest()
+    f.close()
+    return digest
+
+# Native versions of binary operators: the class both operands must have,
+# the Python expression for the result, and whether the right operand must
+# be nonzero
+nativeBinaryOps = {
+    '+': ("ZInteger", "makeInteger(%s.value + %s.value)", False),
+    '-': ("ZInteger", "makeInteger(%s.value - %s.value)", False),
+    '*': ("ZInteger", "makeInteger(%s.value * %s.value)", False),
+    '/': ("ZInteger", "divideIntegers(%s.value, %s.value)", True),
+    'mod': ("ZInteger", "makeInteger(%s.value %% %s.value)", True),
+    '<': ("ZInteger", "makeBoolean(%s.value < %s.value)", False),
+    '>': ("ZInteger", "makeBoolean(%s.value > %s.value)", False),
+    '<=': ("ZInteger", "makeBoolean(%s.value <= %s.value)", False),
+    '>=': ("ZInteger", "makeBoolean(%s.value >= %s.value)", False),
+    '=': ("ZInteger", "makeBoolean(%s.value == %s.value)", False),
+    r'\=': ("ZInteger", "makeBoolean(%s.value != %s.value)", False),
+    'and': ("ZBoolean", "makeBoolean(%s.value and %s.value)", False),
+    'or': ("ZBoolean", "makeBoolean(%s.value or %s.value)", False)
+    }
+
+nativeUnaryOps = {
+    '-': ("ZInteger", "makeInteger(-%s.value)"),
+    'not': ("ZBoolean", "makeBoolean(not %s.value)")
+    }
+
+class Transpiler:
+    """Translates a lowered program into the source of a Python module."""
+    def __init__(self):
+        # Lines of the module before program(), defining the constants
+        self.constantLines = []
+        self.constantNames = {}
+        # Python class name of each constant
+        self.constantClasses = {}
+        self.bodyLines = []
+        self.indent = 1
+        self.tempCount = 0
+        # (line, inValueRegion) pairs of the statement being translated
+        self.pending = []
+        # Temps of Hoisted nodes, which start out empty
+        self.hoistedTemps = set()
+
+    def translate(self, program):
+        self.statement(program)
+        self.flush()
+        lines = [ "# Generated from a Zephyr program by Transpiler.py",
+                  "" ]
+        lines.extend(self.constantLines)
+        lines.append("")
+        lines.append("def program(state):")
+        lines.append("    getSlotVarId = state.getSlotVarId")
+        lines.append("    getValue = state.getValue")
+        lines.append("    getVarAddress = state.getVarAddress")
+        lines.append("    setVarAddress = state.setVarAddress")
+        lines.append("    memorize = state.memorize")
+        lines.append("    write = stdout.write")
+        for temp in sorted(self.hoistedTemps):
+            lines.append("    %s = None" % self.keptName(temp))
+        lines.extend(self.bodyLines)
+        lines.append("")
+        return "\n".join(lines)
+
+    # Output
+
+    def emit(self, line, inValueRegion = False):
+        """Adds a line of straight-line code to the current statement."""
+        self.pending.append((line, inValueRegion))
+
+    def flush(self):
+        """Writes out the pending lines, wrapping the ones inside getValue()
+        in try blocks."""
+        pad = "    " * self.indent
+        index = 0
+        while index < len(self.pending):
+            line, inValueRegion = self.pending[index]
+            if not inValueRegion:
+                self.bodyLines.append(pad + line)
+                index += 1
+                continue
+            self.bodyLines.append(pad + "try:")
+            while index < len(self.pending) and self.pending[index][1]:
+                self.bodyLines.append(pad + "    " + self.pending[index][0])
+                index += 1
+            self.bodyLines.append(pad + "except ValueError:")
+            self.bodyLines.append(pad + "    uninitialized()")
+        self.pending = []
+
+    def line(self, line):
+        """Writes a control-flow line at the current indentation."""
+        self.flush()
+        self.bodyLines.append("    " * self.indent + line)
+
+    def nestedBlock(self, node):
+        """Translates the Block <node> one level further in."""
+        self.flush()
+        self.indent += 1
+        start = len(self.bodyLines)
+        self.statement(node)
+        self.flush()
+        if len(self.bodyLines) == start:
+            self.bodyLines.append("    " * self.indent + "pass")
+        self.indent -= 1
+
+    def temp(self):
+        self.tempCount += 1
+        return "t%d" % self.tempCount
+
+    def keptName(self, temp):
+        """Returns the name of the local for the optimizer's temp <temp>."""
+        return "c%d" % temp
+
+    def constant(self, value):
+        """Returns the name of a module-level constant holding <value>."""
+        if isinstance(value, type):
+            # A built-in class is its own value
+            return value.py_name
+        className = value.__class__.__name__
+        if className == "ZFraction":
+            arguments = "%d, %d" % (value.num, value.den)
+        elif className == "ZString":
+            # A folded concatenation can still be in pieces
+            arguments = repr(str(value))
+        else:
+            arguments = repr(value.value)
+        key = (className, arguments)
+        if key not in self.constantNames:
+            name = "k%d" % (len(self.constantNames) + 1)
+            self.constantNames[key] = name
+            self.constantLines.append("%s = %s(%s)" % (name, className,
+                                                       arguments))
+            self.constantClasses[name] = className
+        return self.constantNames[key]
+
+    def conditionTest(self, node):
+        """Translates the condition <node>, checks that it is a Boolean, and
+        returns the name holding it."""
+        condition = self.value(node)
+        self.emit("if %s.__class__ is not ZBoolean: nonBoolean(%s)"
+                  % (condition, condition))
+        return condition
+
+    # Statements
+
+    def statement(self, node):
+        if node.__class__ in statementMethods:
+            getattr(self, statementMethods[node.__class__])(node)
+        else:
+            self.emit("fail(%r)" % ("Trying to execute unrecognized entity: "
+                                    "%s" % node.__class__.__name__))
+
+    def block(self, node):
+        for statement in node.statements:
+            self.statement(statement)
+            self.flush()
+
+    def printStatement(self, node):
+        for item in node.items:
+            self.emit("printItem(%s)" % self.value(item))
+        if node.newline:
+            self.emit("write('\\n')")
+
+    def assignment(self, lhsNode, rhsNode):
+        lhs = self.entity(lhsNode)
+        if lhsNode.__class__ != Name:
+            self.emit("if not isLValue(%s): notAssignable()" % lhs)
+        rhs = self.entity(rhsNode)
+        if rhsNode.__class__ == Name:
+            # Assign by reference
+            self.emit("setVarAddress(%s, getVarAddress(%s))" % (lhs, rhs))
+        elif self.isValue(rhsNode):
+            # Assign by value
+            self.emit("setVarAddress(%s, memorize(%s))" % (lhs, rhs))
+        else:
+            self.emit("assign(state, %s, %s)" % (lhs, rhs))
+
+    def setStatement(self, node):
+        self.assignment(node.target, node.value)
+
+    def incStatement(self, node):
+        self.emit("increment(state, %s)" % self.entity(node.target))
+
+    def inputStatement(self, node):
+        lhs = self.entity(node.target)
+        self.emit("if not isLValue(%s): notAssignable()" % lhs)
+        if node.inputType is not None:
+            inputType = self.value(node.inputType)
+            self.emit("if not isinstance(%s, type): notAType(%s)"
+                      % (inputType, inputType))
+        else:
+            inputType = "ZString"
+        self.emit("inputInto(state, %s, %s)" % (lhs, inputType))
+
+    def loop(self, condition, block, updater = None):
+        self.line("while True:")
+        self.indent += 1
+        conditionName = self.conditionTest(condition)
+        self.line("if %s.value != True:" % conditionName)
+        self.line("    break")
+        self.indent -= 1
+        self.nestedBlock(block)
+        if updater is not None:
+            self.indent += 1
+            self.statement(updater)
+            self.flush()
+            self.indent -= 1
+
+    def whileStatement(self, node):
+        self.loop(node.condition, node.body)
+
+    def forStatement(self, node):
+        # Like the tree walker, update the loop variable with an assignment
+        # and an increment, and test it with an expression
+        self.assignment(node.var, node.start)
+        self.loop(BinOp("<=", node.var, node.finish), node.body,
+                  Inc(node.var))
+
+    def ifStatement(self, node):
+        depth = 0
+        for index, (condition, body) in enumerate(node.branches):
+            if index > 0:
+                # An else if branch nests inside the previous else
+                self.line("else:")
+                self.indent += 1
+                depth += 1
+            conditionName = self.conditionTest(condition)
+            self.line("if %s.value == True:" % conditionName)
+            self.nestedBlock(body)
+        if node.orelse is not None:
+            self.line("else:")
+            self.nestedBlock(node.orelse)
+        self.indent -= depth
+
+    def resetStatement(self, node):
+        # Forget the values of a loop's hoisted expressions
+        for temp in node.temps:
+            self.emit("%s = None" % self.keptName(temp))
+
+    # Expressions
+
+    def isValue(self, node):
+        """Whether <node> always evaluates to a Zephyr value."""
+        return node.__class__ in (BinOp, UnaryOp, Random, Const, Share, Reuse,
+                                  Hoisted)
+
+    def value(self, node):
+        """Translates code that computes what Execution.getValue() returns
+        for <node>, and returns the name that holds it."""
+        if node.__class__ == Const:
+            return self.constant(node.value)
+        if node.__class__ in (BinOp, UnaryOp, Share, Reuse, Hoisted):
+            # Operators always give values, not variable IDs
+            return self.entity(node, True)
+        result = self.temp()
+        if node.__class__ == Name:
+            self.emit("%s = getValue(%s)" % (result, self.varId(node)), True)
+        else:
+            entity = self.entity(node, True)
+            self.emit("%s = getValue(%s)" % (result, entity), True)
+        return result
+
+    def entity(self, node, inValueRegion = False):
+        """Translates code that computes what Execution.evaluate() returns
+        for <node>, and returns the name that holds it."""
+        nodeClass = node.__class__
+        if nodeClass == Name:
+            result = self.temp()
+            self.emit("%s = %s" % (result, self.varId(node)))
+            return result
+        elif nodeClass == Const:
+            return self.constant(node.value)
+        elif nodeClass == BinOp:
+            lhs = self.value(node.lhs)
+            rhs = self.value(node.rhs)
+            result = self.temp()
+            self.emit("%s = %s" % (result,
+                                   self.binaryOperation(node.operator,
+                                                        lhs, rhs)),
+                      inValueRegion)
+            return result
+        elif nodeClass == UnaryOp:
+            operand = self.value(node.operand)
+            result = self.temp()
+            self.emit("%s = %s" % (result,
+                                   self.unaryOperation(node.operator,
+                                                       operand)),
+                      inValueRegion)
+            return result
+        elif nodeClass == Reuse:
+            return self.keptName(node.temp)
+        elif nodeClass == Share:
+            value = self.entity(node.expression, inValueRegion)
+            result = self.keptName(node.temp)
+            self.emit("%s = %s" % (result, value))
+            return result
+        elif nodeClass == Hoisted:
+            # Evaluate the expression only if no value is kept yet
+            result = self.keptName(node.temp)
+            self.hoistedTemps.add(node.temp)
+            self.line("if %s is None:" % result)
+            self.indent += 1
+            value = self.entity(node.expression, inValueRegion)
+            self.emit("%s = %s" % (result, value))
+            self.flush()
+            self.indent -= 1
+            return result
+        elif nodeClass == Subscript or nodeClass == Section:
+            currValue = self.baseValue(node.base, inValueRegion)
+            self.emit("if isinstance(%s, type): notSubscriptable(%s)"
+                      % (currValue, currValue))
+            result = self.temp()
+            if nodeClass == Subscript:
+                index = self.value(node.index)
+                self.emit("%s = subscript(%s, %s)"
+                          % (result, currValue, index),
+                          inValueRegion)
+            else:
+                start = self.value(node.start)
+                stop = self.value(node.stop)
+                self.emit("%s = section(%s, %s, %s)"
+                          % (result, currValue, start, stop),
+                          inValueRegion)
+            return result
+        elif nodeClass == Call:
+            currValue = self.baseValue(node.base, inValueRegion)
+            self.emit("if not isinstance(%s, type): notInstantiable(%s)"
+                      % (currValue, currValue))
+            arguments = [ self.value(argument)
+                          for argument in node.arguments ]
+            result = self.temp()
+            self.emit("%s = instantiate(%s, [%s], state)"
+                      % (result, currValue, ", ".join(arguments)),
+                      inValueRegion)
+            return result
+        elif nodeClass == Random:
+            result = self.temp()
+            self.emit("%s = ZFraction(randrange(12252240), 12252240)"
+                      % result)
+            return result
+        elif nodeClass == Literal:
+            # The literal is invalid; let the error happen at run time
+            itemClass = builtInClasses[node.token.name]
+            tokenString = removeFromFront(node.token.value,
+                                          itemClass.tokenStart)
+            tokenString = removeFromEnd(tokenString, itemClass.tokenEnd)
+            result = self.temp()
+            self.emit("%s = %s(%r)" % (result, itemClass.py_name,
+                                       tokenString),
+                      inValueRegion)
+            return result
+        else:
+            self.emit("fail(%r)" % ("Trying to evaluate unrecognized "
+                                    "entity: %s" % nodeClass.__name__))
+            return "None"
+
+    def baseValue(self, node, inValueRegion):
+        """Translates code for the value of the entity that a subscript,
+        section or instantiation starts from, and returns its name."""
+        if node.__class__ == Const:
+            # A class is its own value
+            return self.constant(node.value)
+        current = self.entity(node, inValueRegion)
+        currValue = self.temp()
+        self.emit("%s = getValue(%s)" % (currValue, current), inValueRegion)
+        return currValue
+
+    def varId(self, node):
+        """Returns an expression for the variable ID of the Name <node>."""
+        return "getSlotVarId(%d, %r)" % (node.slot, node.name)
+
+    def operandClass(self, name):
+        """Returns the Python class name of <name> if it is a constant."""
+        return self.constantClasses.get(name)
+
+    def binaryOperation(self, operator, lhs, rhs):
+        generic = "binary(%r, %s, %s)" % (operator, lhs, rhs)
+        if operator not in nativeBinaryOps:
+            return generic
+        className, template, nonzero = nativeBinaryOps[operator]
+        tests = []
+        for operand in (lhs, rhs):
+            if self.operandClass(operand) is None:
+                tests.append("%s.__class__ is %s" % (operand, className))
+            elif self.operandClass(operand) != className:
+                return generic
+        if nonzero:
+            tests.append("%s.value != 0" % rhs)
+        native = template % (lhs, rhs)
+        if not tests:
+            return native
+        return "%s if %s else %s" % (native, " and ".join(tests), generic)
+
+    def unaryOperation(self, operator, operand):
+        generic = "unary(%r, %s)" % (operator, operand)
+        if operator not in nativeUnaryOps:
+            return generic
+        className, template = nativeUnaryOps[operator]
+        native = template % operand
+        if self.operandClass(operand) is None:
+            return "%s if %s.__class__ is %s else %s" % (native, operand,
+                                                         className, generic)
+        elif self.operandClass(operand) == className:
+            return native
+        return generic
+
+statementMethods = {
+    Block: "block",
+    Print: "printStatement",
+    Set: "setStatement",
+    Inc: "incStatement",
+    Input: "inputStatement",
+    While: "whileStatement",
+    For: "forStatement",
+    If: "ifStatement",
+    Reset: "resetStatement"
+    }
+
+def translate(program):
+    """Returns the Python source for the lowered <program>."""
+    return Transpiler().translate(program)
+
+# Run-time support for the generated code
+
+def uninitialized():
+    print("Trying to get the value of uninitialized variable")
+    raise ZRuntimeError
+
+def nonBoolean(condVal):
+    print("Given non-boolean as condition expression:", repr(condVal))
+    raise ZRuntimeError
+
+def notAssignable():
+    print("Trying to assign to value or reserved name")
+    raise ZRuntimeError
+
+def notAType(inputType):
+    print("Cannot input as %s because it is not a type" % inputType)
+    raise ZRuntimeError
+
+def notInstantiable(currValue):
+    print("Trying to instantiate object of type", getClassName(currValue))
+    raise ZRuntimeError
+
+def notSubscriptable(currValue):
+    print("Trying to subscript built-in class", currValue.z_name)
+    raise ZRuntimeError
+
+def fail(message):
+    print(message)
+    raise ZRuntimeError
+
+def printItem(value):
+    if hasattr(value, "z_output"):
+        # Call the value's z_output function
+        value.z_output()
+    else:
+        # Use the value's __str__ function instead
+        sys.stdout.write(str(value))
+    # Either way, print a space afterward
+    sys.stdout.write(" ")
+
+def assign(state, lhsEntity, rhsEntity):
+    if isLValue(rhsEntity):
+        # Assign by reference
+        address = state.getVarAddress(rhsEntity)
+    else:
+        # Assign by value
+        address = state.memorize(rhsEntity)
+    state.setVarAddress(lhsEntity, address)
+
+def increment(state, lhsEntity):
+    if not isLValue(lhsEntity):
+        print("Trying to increment value or reserved name")
+        raise ZRuntimeError
+    try:
+        oldValue = state.getValue(lhsEntity)
+    except ValueError:
+        print("Trying to increment uninitialized variable")
+        raise ZRuntimeError
+    try:
+        newValue = oldValue.z_inc()
+    except AttributeError:
+        # oldValue's class does not have a z_inc() function
+        print("Cannot increment %s" % oldValue.z_name)
+        raise ZRuntimeError
+    state.setVarAddress(lhsEntity, state.memorize(newValue))
+
+def inputInto(state, lhsEntity, inputType):
+    value = inputType(input())
+    state.setVarAddress(lhsEntity, state.memorize(value))
+
+runtimeNames = {
+    "ZInteger": ZInteger,
+    "ZFraction": ZFraction,
+    "ZBoolean": ZBoolean,
+    "ZCharacter": ZCharacter,
+    "ZString": ZString,
+    "ZArray": ZArray,
+    "makeInteger": makeInteger,
+    "makeBoolean": makeBoolean,
+    "divideIntegers": divideIntegers,
+    "isLValue": isLValue,
+    "binary": applyBinaryOperator,
+    "unary": applyUnaryOperator,
+    "instantiate": instantiate,
+    "subscript": subscript,
+    "section": section,
+    "randrange": randrange,
+    "uninitialized": uninitialized,
+    "nonBoolean": nonBoolean,
+    "notAssignable": notAssignable,
+    "notAType": notAType,
+    "notInstantiable": notInstantiable,
+    "notSubscriptable": notSubscriptable,
+    "fail": fail,
+    "printItem": printItem,
+    "assign": assign,
+    "increment": increment,
+    "inputInto": inputInto
+    }
+
+def compileSource(source):
+    """Compiles generated source to a Python code object. Raises
+    SyntaxError (or RecursionError) for programs nested too deeply for
+    Python."""
+    return compile(source, "<zephyr>", "exec")
+
+def runCode(code, state):
+    """Runs a compiled translation on <state>."""
+    namespace = dict(runtimeNames)
+    namespace["stdout"] = sys.stdout
+    exec(code, namespace)
+    namespace["program"](state)
+
+def executeTranspiled(program, state):
+    """Translates the lowered <program> to Python and runs it on <state>;
+    does the same thing as Execution.execute()."""
+    try:
+        code = compileSource(translate(program))
+    except (SyntaxError, RecursionError):
+        # Python limits how deeply blocks can nest; such programs run on
+        # the closure compiler instead
+        executeCompiled(program, state)
+    else:
+        runCode(code, state)
+
+def cachedExecutor(cache, code, program = None):
+    """Returns an executor (like executeTranspiled) for the program <code>
+    that uses the translation in the ProgramCache <cache>, making and saving
+    it from the lowered <program> if needed. Returns None if there is no
+    cached translation and no program."""
+    version = transpilerHash()
+    source = cache.loadSource(code, version)
+    if source is None:
+        if program is None:
+            return None
+        source = translate(program)
+        try:
+            compiled = compileSource(source)
+        except (SyntaxError, RecursionError):
+            return executeTranspiled
+        cache.storeSource(code, source, version)
+    else:
+        compiled = compileSource(source)
+    return lambda program, state: runCode(compiled, state)
+
+if __name__ == "__main__":
+    # Print the Python translation of a program
+    from Scanner import Scanner
+    from TableParser import parseIterative
+    from BNF import loadCachedGrammar
+    from Folding import foldConstants
+    from Lowering import lower
+    from Optimizer import optimize
+    if len(sys.argv) < 2:
+        print("Usage: python Transpiler.py program.zeph")
+        sys.exit(1)
+    f = open(sys.argv[1], 'r')
+    code = f.read() + "\n"
+    f.close()
+    syntaxTree = parseIterative(Scanner(code), loadCachedGrammar("BNF.txt"))
+    program = optimize(lower(foldConstants(syntaxTree)))
+    print(translate(program))
@@ -0,0 +1,295 @@
+
+from AST import *
+from BuiltInClasses import ZInteger, ZBoolean, makeInteger, makeBoolean, \
+                           divideIntegers
+from Errors import Deoptimization
+import operator
+
+# Flow-sensitive type inference over lowered programs, run as the "types"
+# pass of Optimizer.py. It follows which variables hold Integers or Booleans
+# at each point of the program, through assignments, branches and loops (a
+# loop is analyzed again until the types at its top stop changing), and
+# marks each BinOp, UnaryOp and Inc whose operands it expects to be Integers
+# or Booleans with that class. The closure compiler and the VM run marked
+# operations natively on the Python values inside the Zephyr objects; the
+# tree walker goes further and evaluates whole marked expressions on plain
+# Python ints and bools.
+#
+# The types are not a proof: dividing two Integers is assumed to give an
+# Integer, as it does for "n / 2" on an even n, and an uninitialized
+# variable has whatever type it gets later. So the native code checks the
+# classes of the operands it actually gets, and if they are not what the
+# types said (or the operation fails), it deoptimizes to the generic
+# operation, which gives the same result or error as without the types.
+
+# Class of the result of each operator whose operands are both of the given
+# class
+resultTypes = {
+    ZInteger: {
+        '+': ZInteger,
+        '-': ZInteger,
+        '*': ZInteger,
+        # A guess; the result is a Fraction unless the division is exact
+        '/': ZInteger,
+        'mod': ZInteger,
+        '<': ZBoolean,
+        '>': ZBoolean,
+        '<=': ZBoolean,
+        '>=': ZBoolean,
+        '=': ZBoolean,
+        r'\=': ZBoolean
+        },
+    ZBoolean: {
+        'and': ZBoolean,
+        'or': ZBoolean,
+        '=': ZBoolean,
+        r'\=': ZBoolean
+        }
+    }
+
+unaryResultTypes = {
+    ZInteger: { '-': ZInteger },
+    ZBoolean: { 'not': ZBoolean }
+    }
+
+# Native versions of the operators above, given operands of the right
+# class. They raise ZeroDivisionError where the generic operator would give
+# an error.
+nativeBinaryOps = {
+    (ZInteger, '+'): lambda lhs, rhs: makeInteger(lhs.value + rhs.value),
+    (ZInteger, '-'): lambda lhs, rhs: makeInteger(lhs.value - rhs.value),
+    (ZInteger, '*'): lambda lhs, rhs: makeInteger(lhs.value * rhs.value),
+    (ZInteger, '/'): lambda lhs, rhs: divideIntegers(lhs.value, rhs.value),
+    (ZInteger, 'mod'): lambda lhs, rhs: makeInteger(lhs.value % rhs.value),
+    (ZInteger, '<'): lambda lhs, rhs: makeBoolean(lhs.value < rhs.value),
+    (ZInteger, '>'): lambda lhs, rhs: makeBoolean(lhs.value > rhs.value),
+    (ZInteger, '<='): lambda lhs, rhs: makeBoolean(lhs.value <= rhs.value),
+    (ZInteger, '>='): lambda lhs, rhs: makeBoolean(lhs.value >= rhs.value),
+    (ZInteger, '='): lambda lhs, rhs: makeBoolean(lhs.value == rhs.value),
+    (ZInteger, r'\='): lambda lhs, rhs: makeBoolean(lhs.value != rhs.value),
+    (ZBoolean, 'and'): lambda lhs, rhs: makeBoolean(lhs.value and rhs.value),
+    (ZBoolean, 'or'): lambda lhs, rhs: makeBoolean(lhs.value or rhs.value),
+    (ZBoolean, '='): lambda lhs, rhs: makeBoolean(lhs.value == rhs.value),
+    (ZBoolean, r'\='): lambda lhs, rhs: makeBoolean(lhs.value != rhs.value)
+    }
+
+nativeUnaryOps = {
+    (ZInteger, '-'): lambda value: makeInteger(-value.value),
+    (ZBoolean, 'not'): lambda value: makeBoolean(not value.value)
+    }
+
+# The same operators on unboxed values: Python ints for Integers and bools
+# for Booleans (see Execution.unboxedValue()). Where the result would not be
+# an Integer or Boolean, or the generic operator would give an error, they
+# raise Deoptimization or ZeroDivisionError.
+def exactDivide(lhs, rhs):
+    quotient, remainder = divmod(lhs, rhs)
+    if remainder:
+        # The result is a Fraction
+        raise Deoptimization
+    return quotient
+
+unboxedBinaryOps = {
+    (ZInteger, '+'): operator.add,
+    (ZInteger, '-'): operator.sub,
+    (ZInteger, '*'): operator.mul,
+    (ZInteger, '/'): exactDivide,
+    (ZInteger, 'mod'): operator.mod,
+    (ZInteger, '<'): operator.lt,
+    (ZInteger, '>'): operator.gt,
+    (ZInteger, '<='): operator.le,
+    (ZInteger, '>='): operator.ge,
+    (ZInteger, '='): operator.eq,
+    (ZInteger, r'\='): operator.ne,
+    (ZBoolean, 'and'): lambda lhs, rhs: lhs and rhs,
+    (ZBoolean, 'or'): lambda lhs, rhs: lhs or rhs,
+    (ZBoolean, '='): operator.eq,
+    (ZBoolean, r'\='): operator.ne
+    }
+
+unboxedUnaryOps = {
+    (ZInteger, '-'): operator.neg,
+    (ZBoolean, 'not'): operator.not_
+    }
+
+# Python class of the unboxed values of each class
+unboxedClasses = { ZInteger: int, ZBoolean: bool }
+
+def inferTypes(program):
+    """Marks the operations in the lowered <program> with the classes of the
+    operands they can expect. Returns the program."""
+    TypeInference().statement(program, {})
+    return program
+
+def valueType(node):
+    """Returns the class that the marked expression <node> is expected to
+    give (ZInteger or ZBoolean), or None."""
+    nodeClass = node.__class__
+    if nodeClass == Const:
+        if node.value.__class__ in (ZInteger, ZBoolean):
+            return node.value.__class__
+    elif nodeClass == BinOp and node.operandType is not None:
+        return resultTypes[node.operandType][node.operator]
+    elif nodeClass == UnaryOp and node.operandType is not None:
+        return unaryResultTypes[node.operandType][node.operator]
+    elif nodeClass == Share or nodeClass == Hoisted:
+        return valueType(node.expression)
+    return None
+
+def join(env1, env2):
+    """Returns the types of variables after a point where paths with the
+    types <env1> and <env2> meet. A variable missing from one of them has
+    not been assigned on that path, so reading it there is an error and
+    its type on the other path stands."""
+    joined = dict(env1)
+    for slot, slotType in env2.items():
+        if slot not in joined:
+            joined[slot] = slotType
+        elif joined[slot] != slotType:
+            joined[slot] = None
+    return joined
+
+class TypeInference:
+    """Walks a lowered program in execution order with a dict (env) mapping
+    each assigned slot to the class it holds (ZInteger or ZBoolean), or
+    None if that isn't known."""
+    def __init__(self):
+        # Type of the value kept in each temp (see Optimizer.py)
+        self.temps = {}
+
+    def statement(self, node, env):
+        """Marks the statement <node>, given the types <env> before it, and
+        updates <env> to the types after it."""
+        nodeClass = node.__class__
+        if nodeClass == Block:
+            for statement in node.statements:
+                self.statement(statement, env)
+        elif nodeClass == Print:
+            for item in node.items:
+                self.expression(item, env)
+        elif nodeClass == Set:
+            self.expression(node.target, env)
+            valueClass = self.expression(node.value, env)
+            if node.target.__class__ == Name:
+                env[node.target.slot] = valueClass
+        elif nodeClass == Inc:
+            self.expression(node.target, env)
+            node.targetType = None
+            if node.target.__class__ == Name:
+                if env.get(node.target.slot) == ZInteger:
+                    # Incrementing an Integer gives an Integer
+                    node.targetType = ZInteger
+                else:
+                    env[node.target.slot] = None
+        elif nodeClass == Input:
+            self.expression(node.target, env)
+            inputClass = None
+            if node.inputType is not None:
+                self.expression(node.inputType, env)
+                if node.inputType.__class__ == Const \
+                   and node.inputType.value in (ZInteger, ZBoolean):
+                    inputClass = node.inputType.value
+            if node.target.__class__ == Name:
+                env[node.target.slot] = inputClass
+        elif nodeClass == If:
+            exits = []
+            for condition, body in node.branches:
+                self.expression(condition, env)
+                branchEnv = dict(env)
+                self.statement(body, branchEnv)
+                exits.append(branchEnv)
+            if node.orelse is not None:
+                branchEnv = dict(env)
+                self.statement(node.orelse, branchEnv)
+                exits.append(branchEnv)
+            else:
+                exits.append(dict(env))
+            joined = exits[0]
+            for branchEnv in exits[1:]:
+                joined = join(joined, branchEnv)
+            env.clear()
+            env.update(joined)
+        elif nodeClass == While:
+            head = dict(env)
+            while True:
+                self.expression(node.condition, head)
+                bodyEnv = dict(head)
+                self.statement(node.body, bodyEnv)
+                # The body runs again with the types it leaves behind
+                newHead = join(head, bodyEnv)
+                if newHead == head:
+                    break
+                head = newHead
+            # The loop ends right after the condition
+            env.clear()
+            env.update(head)
+        elif nodeClass == For:
+            self.expression(node.var, env)
+            startClass = self.expression(node.start, env)
+            var = node.var
+            if var.__class__ == Name:
+                env[var.slot] = startClass
+            head = dict(env)
+            while True:
+                self.expression(node.finish, head)
+                bodyEnv = dict(head)
+                self.statement(node.body, bodyEnv)
+                if var.__class__ == Name and bodyEnv.get(var.slot) != ZInteger:
+                    # The increment at the end of the body
+                    bodyEnv[var.slot] = None
+                newHead = join(head, bodyEnv)
+                if newHead == head:
+                    break
+                head = newHead
+            env.clear()
+            env.update(head)
+
+    def expression(self, node, env):
+        """Marks the expression <node>, given the types <env>, and returns
+        the class its value is expected to have, or None."""
+        nodeClass = node.__class__
+        if nodeClass == Name:
+            return env.get(node.slot)
+        elif nodeClass == Const:
+            if node.value.__class__ in (ZInteger, ZBoolean):
+                return node.value.__class__
+            return None
+        elif nodeClass == BinOp:
+            lhsClass = self.expression(node.lhs, env)
+            rhsClass = self.expression(node.rhs, env)
+            node.operandType = None
+            if lhsClass is not None and lhsClass == rhsClass \
+               and node.operator in resultTypes[lhsClass]:
+                node.operandType = lhsClass
+                return resultTypes[lhsClass][node.operator]
+            return None
+        elif nodeClass == UnaryOp:
+            operandClass = self.expression(node.operand, env)
+            node.operandType = None
+            if operandClass is not None \
+               and node.operator in unaryResultTypes[operandClass]:
+                node.operandType = operandClass
+                return unaryResultTypes[operandClass][node.operator]
+            return None
+        elif nodeClass == Share or nodeClass == Hoisted:
+            valueClass = self.expression(node.expression, env)
+            self.temps[node.temp] = valueClass
+            return valueClass
+        elif nodeClass == Reuse:
+            return self.temps.get(node.temp)
+        elif nodeClass == Subscript:
+            self.expression(node.base, env)
+            self.expression(node.index, env)
+        elif nodeClass == Section:
+            self.expression(node.base, env)
+            self.expression(node.start, env)
+            self.expression(node.stop, env)
+        elif nodeClass == Call:
+            self.expression(node.base, env)
+            for argument in node.arguments:
+                self.expression(argument, env)
+            if node.base.__class__ == Const \
+               and node.base.value in (ZInteger, ZBoolean):
+                # A constructor gives an instance of its class
+                return node.base.value
+        return None
@@ -1,15 +1,47 @@
 
 # Utility functions
 
+# Options that are given as --name=value
+valueOptions = ("scanner", "parser", "engine", "optimize", "cache-dir")
+
 def processCmdLineArgs():
+    """Returns a dict of the options given on the command line. Prints a
+    message and exits if an option isn't known or is missing its value."""
     import sys
     options = { "filename": None,
-                "debug": False }
+                "debug": False,
+                "scanner": "stream",
+                "parser": "auto",
+                "engine": "tree",
+                "cache": True,
+                "cache-dir": None,
+                "optimize": None,
+                "dump": False }
     for item in sys.argv[1:]:
         if item == "-d":
             options["debug"] = True
+        elif item == "--no-cache":
+            options["cache"] = False
+        elif item == "--dump":
+            options["dump"] = True
+        elif item.startswith("--") and "=" in item:
+            # Long option of the form --name=value
+            name, value = item[2:].split("=", 1)
+            if name not in valueOptions:
+                print("Unknown option \"--%s\"; choose from %s" \
+                      % (name, ", ".join("--%s=" % option
+                                         for option in valueOptions)))
+                sys.exit(1)
+            if value == "":
+                print("Missing value for \"--%s\"" % name)
+                sys.exit(1)
+            options[name] = value
         elif item[0] != "-":
             options["filename"] = item
+        else:
+            print("Unknown option \"%s\"; choose from -d, --dump, " \
+                  "--no-cache, or --name=value" % item)
+            sys.exit(1)
     return options
 
 def gcd(num1, num2):
@@ -27,23 +59,11 @@ def gcd(num1, num2):
         return sign * r_gcd(abs(num1), abs(num2))
 
 def r_gcd(num1, num2):
-    """Recursive helper function for gcd.
+    """Helper function for gcd (Euclid's algorithm).
     Assumes that num1 and num2 are both > 0."""
-    if num1 == num2:
-        # gcd(x, x) == x
-        return num1
-    elif num1 > num2:
-        bigger = num1
-        smaller = num2
-    else:
-        # num2 > num1
-        bigger = num2
-        smaller = num1
-    new = bigger % smaller
-    if new == 0:
-        return smaller
-    else:
-        return r_gcd(smaller, new)
+    while num2 != 0:
+        num1, num2 = num2, num1 % num2
+    return num1
 
 def removeFromFront(string, substring):
     if substring and string.startswith(substring):
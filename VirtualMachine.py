@@ -0,0 +1,204 @@
+
+from BuiltInClasses import *
+from Errors import ZRuntimeError
+from ProgramState import isLValue
+from Execution import literalValue, instantiate, subscript, section, \
+                      applyBinaryOperator, applyUnaryOperator
+from Bytecode import *
+from sys import stdout
+from random import randrange
+
+# Stack-based virtual machine for the bytecode made by Bytecode.py. It has
+# the same effects on the ProgramState, and prints the same output and error
+# messages, as the tree walker in Execution.py.
+
+def executeBytecode(program, state):
+    """Compiles the lowered <program> to bytecode and runs it on <state>;
+    does the same thing as Execution.execute()."""
+    run(compileProgram(program), state)
+
+def run(codeObject, state):
+    """Runs the instructions of <codeObject> on <state>."""
+    code = codeObject.code
+    constants = codeObject.constants
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    getValue = state.getValue
+    getSlotVarId = state.getSlotVarId
+    slotNames = codeObject.slotNames
+    state.reserveSlots(len(slotNames))
+    slots = state.slots
+    temps = state.temps
+    pc = 0
+    try:
+        # The opcodes are tested roughly in order of how often they run
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+            if op == LOAD_SLOT_VALUE:
+                varId = slots[arg]
+                if varId == -1:
+                    varId = getSlotVarId(arg, slotNames[arg])
+                push(getValue(varId))
+            elif op == LOAD_CONST:
+                push(constants[arg])
+            elif op == BINARY_OP:
+                rhs = pop()
+                stack[-1] = applyBinaryOperator(constants[arg], stack[-1],
+                                                rhs)
+            elif op == NATIVE_BINARY_OP:
+                operator, operandType, native = constants[arg]
+                rhs = pop()
+                lhs = stack[-1]
+                result = None
+                if lhs.__class__ is operandType \
+                   and rhs.__class__ is operandType:
+                    try:
+                        result = native(lhs, rhs)
+                    except ZeroDivisionError:
+                        # Let the generic operator report it
+                        pass
+                if result is None:
+                    # Deoptimize
+                    result = applyBinaryOperator(operator, lhs, rhs)
+                stack[-1] = result
+            elif op == JUMP_IF_FALSE:
+                condVal = pop()
+                if condVal.__class__ != ZBoolean:
+                    print("Given non-boolean as condition expression:", \
+                          repr(condVal))
+                    raise ZRuntimeError
+                if condVal.value != True:
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == LOAD_TEMP:
+                # The temps of the optimization passes are used inside loops
+                push(temps.get(arg))
+            elif op == STORE_TEMP:
+                temps[arg] = stack[-1]
+            elif op == JUMP_IF_SET:
+                if stack[-1] is not None:
+                    pc = arg
+                else:
+                    pop()
+            elif op == LOAD_SLOT:
+                varId = slots[arg]
+                if varId == -1:
+                    varId = getSlotVarId(arg, slotNames[arg])
+                push(varId)
+            elif op == CHECK_ASSIGN:
+                if not isLValue(stack[-1]):
+                    print("Trying to assign to value or reserved name")
+                    raise ZRuntimeError
+            elif op == STORE:
+                rhsEntity = pop()
+                lhsEntity = pop()
+                if isLValue(rhsEntity):
+                    # Assign by reference
+                    address = state.getVarAddress(rhsEntity)
+                else:
+                    # Assign by value
+                    address = state.memorize(rhsEntity)
+                state.setVarAddress(lhsEntity, address)
+            elif op == INC:
+                lhsEntity = pop()
+                if not isLValue(lhsEntity):
+                    print("Trying to increment value or reserved name")
+                    raise ZRuntimeError
+                try:
+                    oldValue = getValue(lhsEntity)
+                except ValueError:
+                    print("Trying to increment uninitialized variable")
+                    raise ZRuntimeError
+                try:
+                    newValue = oldValue.z_inc()
+                except AttributeError:
+                    # oldValue's class does not have a z_inc() function
+                    print("Cannot increment %s" % oldValue.z_name)
+                    raise ZRuntimeError
+                address = state.memorize(newValue)
+                state.setVarAddress(lhsEntity, address)
+            elif op == GET_VALUE:
+                stack[-1] = getValue(stack[-1])
+            elif op == PRINT_ITEM:
+                value = pop()
+                if hasattr(value, "z_output"):
+                    # Call the value's z_output function
+                    value.z_output()
+                else:
+                    # Use the value's __str__ function instead
+                    stdout.write(str(value))
+                # Either way, print a space afterward
+                stdout.write(" ")
+            elif op == PRINT_NEWLINE:
+                stdout.write("\n")
+            elif op == UNARY_OP:
+                stack[-1] = applyUnaryOperator(constants[arg], stack[-1])
+            elif op == NATIVE_UNARY_OP:
+                operator, operandType, native = constants[arg]
+                if stack[-1].__class__ is operandType:
+                    stack[-1] = native(stack[-1])
+                else:
+                    # Deoptimize
+                    stack[-1] = applyUnaryOperator(operator, stack[-1])
+            elif op == CHECK_NOT_CLASS:
+                if isinstance(stack[-1], type):
+                    print("Trying to subscript built-in class", \
+                          stack[-1].z_name)
+                    raise ZRuntimeError
+            elif op == SUBSCRIPT:
+                index = pop()
+                stack[-1] = subscript(stack[-1], index)
+            elif op == SECTION:
+                stop = pop()
+                start = pop()
+                stack[-1] = section(stack[-1], start, stop)
+            elif op == CHECK_CLASS:
+                if not isinstance(stack[-1], type):
+                    print("Trying to instantiate object of type", \
+                          getClassName(stack[-1]))
+                    raise ZRuntimeError
+            elif op == INSTANTIATE:
+                if arg:
+                    arguments = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    arguments = []
+                stack[-1] = instantiate(stack[-1], arguments, state)
+            elif op == RANDOM:
+                # Generate a random Fraction in [0,1)
+                denom = 12252240
+                numer = randrange(denom)
+                push(ZFraction(numer, denom))
+            elif op == LITERAL:
+                push(literalValue(constants[arg]))
+            elif op == CHECK_INPUT_TYPE:
+                if not isinstance(stack[-1], type):
+                    print("Cannot input as %s because it is not a type" \
+                          % stack[-1])
+                    raise ZRuntimeError
+            elif op == INPUT:
+                inputType = pop()
+                lhsEntity = pop()
+                value = inputType(input())
+                address = state.memorize(value)
+                state.setVarAddress(lhsEntity, address)
+            elif op == CLEAR_TEMP:
+                temps.pop(arg, None)
+            elif op == ERROR:
+                print(constants[arg])
+                raise ZRuntimeError
+            elif op == HALT:
+                return
+            else:
+                print("Unknown opcode %d at %d" % (op, pc - 2))
+                raise ZRuntimeError
+    except ValueError:
+        if codeObject.inValueRegion(pc - 2):
+            # The tree walker would have caught this in getValue()
+            print("Trying to get the value of uninitialized variable")
+            raise ZRuntimeError
+        raise
@@ -1,20 +1,89 @@
 
-from BNF import Grammar
-from Scanner import Scanner
-from TableParser import parse
-from Execution import runProgram
+from BNF import loadCachedGrammar
+from Scanner import scannerClasses
+from TableParser import parse, parseIterative
+from ParserGenerator import loadGeneratedParser
+from ProgramCache import ProgramCache
+from Folding import foldConstants
+from Lowering import lower
+from Optimizer import optimize, passNames, defaultPasses, dumpProgram
+from Execution import runProgram, execute
+from ClosureCompiler import executeCompiled
+from VirtualMachine import executeBytecode
+from Transpiler import executeTranspiled, cachedExecutor
 from Utilities import processCmdLineArgs
 import sys
 
 defaultFile = "Programs/helloWorld.zeph"
 defaultDebug = False
 
+parserTypes = ("auto", "generated", "iterative", "table")
+engines = {
+    "tree": execute,
+    "closure": executeCompiled,
+    "vm": executeBytecode,
+    "python": executeTranspiled
+    }
+
+def chooseParser(parserType, grammarFile):
+    """Returns the parse function for <parserType> and the grammar to pass
+    to it."""
+    parseFunction = None
+    grammar = loadCachedGrammar(grammarFile)
+    if parserType == "auto" or parserType == "generated":
+        # Use the generated parser if it is up to date with the grammar; it
+        # only needs the grammar tables for that check
+        generatedParser = loadGeneratedParser(grammarFile, grammar,
+                                              warn = parserType == "auto")
+        if generatedParser is not None:
+            parseFunction = generatedParser.parse
+        elif parserType == "generated":
+            print("The generated parser is missing or out of date; run " \
+                  "ParserGenerator.py to rebuild it")
+            sys.exit(1)
+    elif parserType == "table":
+        parseFunction = parse
+    if parseFunction is None:
+        # The iterative parser handles programs of any length
+        parseFunction = parseIterative
+    return parseFunction, grammar
+
 if __name__ == "__main__":
     options = processCmdLineArgs()
     filename = options["filename"]
     debug = options["debug"]
+    scannerType = options["scanner"]
+    parserType = options["parser"]
+    engine = options["engine"]
+    cacheEnabled = options["cache"]
+    cacheDir = options["cache-dir"]
+    dump = options["dump"]
     grammarFile = "BNF.txt"
-    grammar = Grammar(grammarFile)
+    if scannerType not in scannerClasses:
+        print("Unknown scanner \"%s\"; choose from %s" \
+              % (scannerType, ", ".join(sorted(scannerClasses))))
+        sys.exit(1)
+    if parserType not in parserTypes:
+        print("Unknown parser \"%s\"; choose from %s" \
+              % (parserType, ", ".join(parserTypes)))
+        sys.exit(1)
+    if engine not in engines:
+        print("Unknown engine \"%s\"; choose from %s" \
+              % (engine, ", ".join(sorted(engines))))
+        sys.exit(1)
+    if options["optimize"] is None:
+        # The passes that pay off on this engine
+        passes = defaultPasses[engine]
+    elif options["optimize"] == "none":
+        passes = ()
+    else:
+        passes = tuple(name for name in passNames
+                       if name in options["optimize"].split(","))
+        for name in options["optimize"].split(","):
+            if name not in passNames:
+                print("Unknown optimization \"%s\"; choose from %s, or none" \
+                      % (name, ", ".join(passNames)))
+                sys.exit(1)
     if filename is None:
         # If no code filename was given on the command line, see if a default
         # is specified
@@ -51,12 +120,36 @@ if __name__ == "__main__":
         code = 'print "Welcome to Zephyr!"'
     # The code must be terminated with a newline to parse correctly
     code += "\n"
-    scanner = Scanner(code)
-    try:
-        syntaxTree = parse(scanner, grammar)
-    except:
-        # A better error message should be printed where the error is raised,
-        # right?  TODO investigate
-        print("Execution terminated.")
-    else:
-        runProgram(syntaxTree, debug = debug)
+    program = None
+    cache = None
+    executor = None
+    if cacheEnabled and filename is not None:
+        # An unchanged program can skip lexing and parsing altogether
+        cache = ProgramCache(filename, cacheDir, grammarFile, passes)
+        if engine == "python" and not dump:
+            # A cached translation doesn't need the tree at all
+            executor = cachedExecutor(cache, code)
+        if executor is None:
+            program = cache.load(code)
+    if executor is None and program is None:
+        parseFunction, grammar = chooseParser(parserType, grammarFile)
+        scanner = scannerClasses[scannerType](code)
+        try:
+            syntaxTree = parseFunction(scanner, grammar)
+        except:
+            # A better error message should be printed where the error is
+            # raised, right?  TODO investigate
+            print("Execution terminated.")
+            sys.exit()
+        program = optimize(lower(foldConstants(syntaxTree)), passes)
+        if cache is not None:
+            cache.store(code, program)
+    if dump:
+        # Show the program as the engine will run it
+        dumpProgram(program)
+    if executor is None:
+        if engine == "python" and cache is not None:
+            executor = cachedExecutor(cache, code, program)
+        else:
+            executor = engines[engine]
+    runProgram(program, debug = debug, executor = executor)